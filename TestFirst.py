@@ -1,6 +1,10 @@
 import unittest
-from datetime import datetime
+from datetime import date, datetime
 import dateutil.relativedelta
+from gedcom_model import Individual, Family, date_ordinal, years_between
+from gedcom_parser import load_gedcom
+from gedcom_rules import Tree, run_rules
+from gedcom_duplicates import find_duplicates
 from m2b3_gedcom_code import process_gedcom_line, populate_living_married_table, populate_living_singles_over_30_table, individual_ids, error_messages, individuals, name_birth_dict
 
 #US03
@@ -32,19 +36,16 @@ def birthAfterDeathOfMom(individual, mom):
     else:
         return True
 
+# the date the expected US27 ages below were worked out on
+AS_OF = date(2023, 12, 1).toordinal()
+
 #US27
-def calculate_current_age(birth_date):
-    birth_date_obj = datetime.strptime(birth_date, "%d %b %Y")
-    today = datetime.now()
-    current_age = today.year - birth_date_obj.year - ((today.month, today.day) < (birth_date_obj.month, birth_date_obj.day))
-    return current_age
+def calculate_current_age(birth_date, as_of=AS_OF):
+    return years_between(date_ordinal(birth_date), as_of)
 
 #US29
 def calculate_age_at_death(birth_date, death_date):
-    birth_date_obj = datetime.strptime(birth_date, "%d %b %Y")
-    death_date_obj = datetime.strptime(death_date, "%d %b %Y")
-    age_at_death = death_date_obj.year - birth_date_obj.year - ((death_date_obj.month, death_date_obj.day) < (birth_date_obj.month, birth_date_obj.day))
-    return age_at_death
+    return years_between(date_ordinal(birth_date), date_ordinal(death_date))
 
 #US17
 def marriedToDescendants(patriarch, matriarch, individual, individuals):
@@ -78,6 +79,19 @@ def correctRole(family):
         return True
 
 
+def make_individual(id, **fields):
+    individual = Individual(id)
+    for field, value in fields.items():
+        setattr(individual, field, value)
+    return individual
+
+def make_family(id, **fields):
+    family = Family(id)
+    for field, value in fields.items():
+        setattr(family, field, value)
+    return family
+
+
 class TestUserStories(unittest.TestCase):
 
     def setUp(self):
@@ -96,25 +110,14 @@ class TestUserStories(unittest.TestCase):
         self.assertIn("ERROR: INDIVIDUAL: US22: @I123: Individual ID is not unique", error_messages)
 
     def test_us23_same_name_and_birthdate(self):
-        name_birth_dict = {('Raj /Palival/', '21 FEB 1998'): ['@I1@', '@I13@']}
+        lines = ["0 @I1@ INDI", "1 NAME Raj /Palival/", "1 BIRT", "2 DATE 21 FEB 1998",
+                 "0 @I13@ INDI", "1 NAME Raj /Palival/", "1 BIRT", "2 DATE 21 FEB 1998"]
+        people, families = load_gedcom(lines)
 
-        individuals['@I1@'] = {"name": "Raj /Palival/", "birth_date": "21 FEB 1998"}
-        individuals['@I13@'] = {"name": "Raj /Palival/", "birth_date": "21 FEB 1998", "death_date": None}
+        self.assertEqual(find_duplicates(people), [(1.0, '@I1@', '@I13@')])
+        messages = [message for story, message in run_rules(Tree(people, families), ['US23'])]
+        self.assertEqual(messages, ["ERROR: INDIVIDUAL: US23: @I13@ and @I1@: Have the same name and birth date Raj /Palival/ - 21 FEB 1998"])
 
-        processed_pairs = set()
-
-        for name_birth_key, individual_ids in name_birth_dict.items():
-            name, birth_date = name_birth_key
-            for i in range(len(individual_ids)):
-                for j in range(i + 1, len(individual_ids)):
-                    pair = (individual_ids[i], individual_ids[j])
-                    if pair not in processed_pairs:
-                        error_msg = f"ERROR: INDIVIDUAL: US23: {individual_ids[i]} and {individual_ids[j]}: Have the same name and birth date {name} - {birth_date}"
-                        error_messages.append(error_msg)
-                        processed_pairs.add(pair)
-
-        self.assertIn("ERROR: INDIVIDUAL: US23: @I1@ and @I13@: Have the same name and birth date Raj /Palival/ - 21 FEB 1998", error_messages)
-    
     def test_us02True(self):
         test1 = {"Birthday": datetime(1998, 6, 12), "Wedding Day": datetime(1999, 6, 12)}
         self.assertTrue(birthBeforeMarriage(test1))
@@ -140,13 +143,13 @@ class TestUserStories(unittest.TestCase):
         test_birth_date_2 = "12 Jan 2000"
         test_birth_date_3 = "01 Mar 1985"
 
-        # Calculating current age based on today's date
+        # Calculating current age on the fixed as-of date
         current_age_1 = calculate_current_age(test_birth_date_1)
         current_age_2 = calculate_current_age(test_birth_date_2)
         current_age_3 = calculate_current_age(test_birth_date_3)
 
         # Assert statements to check if the calculated ages are as expected
-        self.assertEqual(current_age_1, 32)  # Adjust the expected age according to current date
+        self.assertEqual(current_age_1, 32)
         self.assertEqual(current_age_2, 23)
         self.assertEqual(current_age_3, 38)
 
@@ -179,11 +182,11 @@ class TestUserStories(unittest.TestCase):
     def test_us30_living_married_people(self):
         # Mock data
         test_individuals = {
-            "@I1@": {"name": "John Doe", "spouse": "@I2@", "death_date": None},
-            "@I2@": {"name": "Jane Smith", "spouse": "@I1@", "death_date": None}
+            "@I1@": make_individual("@I1@", name="John Doe", fams=["@F1@"]),
+            "@I2@": make_individual("@I2@", name="Jane Smith", fams=["@F1@"])
         }
         test_families = {
-            "@F1@": {"husband_id": "@I1@", "wife_id": "@I2@", "marriage_date": "10 JAN 1990"}
+            "@F1@": make_family("@F1@", husband="@I1@", wife="@I2@", marriage_date="10 JAN 1990")
         }
         # Expected result
         expected_result = [
@@ -199,15 +202,15 @@ class TestUserStories(unittest.TestCase):
     def test_us31_living_singles_over_30(self):
         # Mock data
         test_individuals = {
-            "@I3@": {"name": "Alice Johnson", "birth_date": "15 FEB 1985", "age": 35, "spouse": None, "death_date": None},
-            "@I4@": {"name": "Bob White", "birth_date": "22 MAR 1980", "age": 40, "spouse": None, "death_date": None}
+            "@I3@": make_individual("@I3@", name="Alice Johnson", birth_date="15 FEB 1985", age=35),
+            "@I4@": make_individual("@I4@", name="Bob White", birth_date="22 MAR 1980", age=40)
         }
         # Expected result
         expected_result = [
             ["@I3@", "Alice Johnson", "15 FEB 1985", 35],
             ["@I4@", "Bob White", "22 MAR 1980", 40]
         ]
-        result_table = populate_living_singles_over_30_table(test_individuals)
+        result_table = populate_living_singles_over_30_table(test_individuals, {})
         
         # Convert table rows to list of lists for comparison
         result_rows = [list(row) for row in result_table._rows]
@@ -0,0 +1,171 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from gedcom_model import today_ordinal, as_of_ordinal
+from gedcom_cache import load_tree
+from gedcom_parser import load_gedcom
+from gedcom_report import WRITERS, TextWriter, write_tables
+from gedcom_rules import RULES, Tree, rule_fields, run_rules
+from gedcom_tables import report_tables
+
+# Batch validation of many GEDCOM files.
+#
+#   python gedcom_batch.py submissions/ 'late/*.ged' --output-dir reports --workers 8
+#
+# Every file is parsed and checked in a worker process; at most --workers
+# files are in flight at once. Each file gets its own report in the output
+# directory, and the error counts of all files are added up per user story
+# into summary.json, which is also printed. A file that cannot be read, or
+# whose checks or report fail, is recorded with the reason in the summary
+# and the batch goes on with the others. With --errors-only the reports
+# hold just the errors, and only the record fields the checked stories read
+# are parsed. With --cache-dir parsed files are kept as snapshots and
+# unchanged files are read back from them instead.
+
+REPORT_EXTENSIONS = {'csv': '.csv', 'jsonl': '.jsonl', 'text': '.txt'}
+
+
+def expand_paths(patterns):
+    """GEDCOM files named by patterns: files, directories (searched recursively) or globs."""
+    found = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, '**', '*.ged'), recursive=True))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+        for path in matches:
+            found.setdefault(os.path.normpath(path), None)
+    return list(found)
+
+
+def report_names(paths, extension):
+    """A distinct report file name for every input path."""
+    names = []
+    used = set()
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name = stem + extension
+        count = 1
+        while name in used:
+            count += 1
+            name = f"{stem}-{count}{extension}"
+        used.add(name)
+        names.append(name)
+    return names
+
+
+def validate_file(job):
+    """Worker entry point: check one file and write its report.
+
+    Returns (path, {story: error count}, problem, failed) where problem is
+    None or the reason the file has no report, and failed is True if the
+    file was read but checking it or writing its report failed. A failure
+    only costs that file its report, never the rest of the batch.
+    """
+    path, report_path, report_format, stories, as_of, errors_only, cache_dir = job
+    try:
+        if cache_dir:
+            tree = load_tree(path, as_of, cache_dir)[0]
+        else:
+            tree = Tree(*load_gedcom(path, as_of, rule_fields(stories) if errors_only else None), as_of)
+    except Exception as error:
+        return path, {}, f"{type(error).__name__}: {error}", False
+
+    try:
+        counts = check_file(tree, report_path, report_format, stories, errors_only)
+    except Exception as error:
+        # no half-written report is left behind
+        if os.path.exists(report_path):
+            os.remove(report_path)
+        return path, {}, f"{type(error).__name__}: {error}", True
+    return path, counts, None, False
+
+
+def check_file(tree, report_path, report_format, stories, errors_only):
+    """Run the rules over tree, write its report and return {story: error count}."""
+    individuals, families = tree.individuals, tree.families
+    errors = run_rules(tree, stories)
+    counts = {}
+    for story, message in errors:
+        counts[story] = counts.get(story, 0) + 1
+
+    with open(report_path, 'w', newline='') as report:
+        tables = [('Errors', ['Story', 'Error'], errors)]
+        if not errors_only:
+            tables = [*report_tables(individuals, families), *tables]
+        write_tables(WRITERS[report_format](report), tables)
+    return counts
+
+
+def validate_files(paths, output_dir, report_format='text', stories=None, as_of=None, workers=None, errors_only=False,
+                   cache_dir=None):
+    """Validate every path in a process pool and return the aggregated summary."""
+    if as_of is None:
+        as_of = today_ordinal()
+    if stories is None:
+        stories = list(RULES)
+    os.makedirs(output_dir, exist_ok=True)
+    names = report_names(paths, REPORT_EXTENSIONS[report_format])
+    jobs = [(path, os.path.join(output_dir, name), report_format, stories, as_of, errors_only, cache_dir)
+            for path, name in zip(paths, names)]
+
+    totals = dict.fromkeys(stories, 0)
+    files = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # results come back in input order, so the summary does not depend on timing
+        for (path, counts, problem, failed), name in zip(pool.map(validate_file, jobs), names):
+            for story, count in counts.items():
+                totals[story] = totals.get(story, 0) + count
+            files.append({'file': path, 'report': None if problem else name, 'errors': sum(counts.values()), 'problem': problem,
+                          'failed': failed})
+
+    return {
+        'files': len(files),
+        'files_with_errors': sum(1 for entry in files if entry['errors']),
+        'unreadable_files': sum(1 for entry in files if entry['problem'] and not entry['failed']),
+        'failed_files': sum(1 for entry in files if entry['failed']),
+        'errors_per_story': totals,
+        'results': files,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate GEDCOM files in bulk and summarize the errors per user story")
+    parser.add_argument("paths", nargs="+", help="GEDCOM files, directories or glob patterns")
+    parser.add_argument("--output-dir", default="reports", help="directory for the per-file reports and summary.json")
+    parser.add_argument("--format", choices=list(WRITERS), default="text", help="per-file report format")
+    parser.add_argument("--workers", type=int, default=None, help="files validated at once (default: one per CPU)")
+    parser.add_argument("--stories", nargs="+", choices=list(RULES), default=None, help="user stories to check (default: all)")
+    parser.add_argument("--as-of", type=as_of_ordinal, default=today_ordinal(), metavar="YYYY-MM-DD",
+                        help="date that ages and future dates are measured against (default: today)")
+    parser.add_argument("--errors-only", action="store_true",
+                        help="leave the individual and family tables out of the reports and parse only what the stories need")
+    parser.add_argument("--cache-dir", default=None, metavar="DIR",
+                        help="keep snapshots of the parsed files in DIR and reuse them while a file is unchanged")
+    args = parser.parse_args(argv)
+
+    paths = expand_paths(args.paths)
+    if not paths:
+        parser.error("no GEDCOM files found")
+
+    summary = validate_files(paths, args.output_dir, args.format, args.stories, args.as_of, args.workers, args.errors_only,
+                             args.cache_dir)
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w') as summary_file:
+        json.dump(summary, summary_file, indent=2)
+
+    print(f"{summary['files']} files, {summary['files_with_errors']} with errors, {summary['unreadable_files']} unreadable, "
+          f"{summary['failed_files']} failed")
+    write_tables(TextWriter(sys.stdout), [('Errors per user story', ['Story', 'Errors'], summary['errors_per_story'].items())])
+    for entry in summary['results']:
+        if entry['problem']:
+            print(f"{entry['file']}: {entry['problem']}")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
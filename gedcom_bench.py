@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from gedcom_parser import load_gedcom
+from gedcom_report import TextWriter, write_tables
+from gedcom_rules import RULES, Tree, run_rules
+from gedcom_synth import write_gedcom, INJECTIONS
+from gedcom_tables import report_tables
+
+# Benchmarks of parsing, every rule and report rendering on synthetic trees.
+#
+#   python gedcom_bench.py --sizes 1000 10000 100000 --output bench.json
+#
+# For each size a seeded tree with a few violations of every story is
+# written to a temporary file, then each stage is timed on its own. With
+# --memory the peak traced allocation of each stage is recorded as well;
+# tracing slows Python down, so compare timings only between runs with the
+# same setting.
+
+AS_OF = date(2023, 12, 1).toordinal()
+
+
+def measure(function, memory):
+    """(result, seconds, peak bytes or None) of calling function."""
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = function()
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+    finally:
+        if memory:
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def render_report(individuals, families):
+    with open(os.devnull, 'w') as devnull:
+        write_tables(TextWriter(devnull), report_tables(individuals, families))
+
+
+def build_indexes(tree):
+    tree.relationships
+    tree.lineage
+    tree.kinship
+    return tree
+
+
+def benchmark_size(size, directory, seed=0, memory=False):
+    """[stage result] for one tree size."""
+    path = os.path.join(directory, f"synthetic-{size}.ged")
+    stages = []
+
+    def record(stage, function, records):
+        result, seconds, peak = measure(function, memory)
+        stages.append({
+            'size': size,
+            'stage': stage,
+            'seconds': seconds,
+            'records_per_second': records / seconds if seconds else None,
+            'peak_bytes': peak,
+        })
+        return result
+
+    violations = dict.fromkeys(INJECTIONS, max(1, size // 10000))
+    record('generate', lambda: write_gedcom(path, size, seed, violations), size)
+    individuals, families = record('parse', lambda: load_gedcom(path, AS_OF), size)
+    os.remove(path)
+
+    records = len(individuals) + len(families)
+    tree = record('indexes', lambda: build_indexes(Tree(individuals, families, AS_OF)), records)
+    for story in RULES:
+        record(f'rule {story}', lambda: run_rules(tree, [story]), records)
+    record('all rules', lambda: run_rules(tree), records)
+    record('report', lambda: render_report(individuals, families), records)
+    return stages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time parsing, rules and reports on synthetic GEDCOM trees")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="individuals per tree (default: 1000 10000 100000; up to 10**7 needs several GB of RAM)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memory", action="store_true", help="also record the peak traced memory of each stage")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            results.extend(benchmark_size(size, directory, args.seed, args.memory))
+
+    rows = ([result['size'], result['stage'], f"{result['seconds']:.4f}",
+             f"{result['records_per_second']:.0f}" if result['records_per_second'] else '',
+             result['peak_bytes'] if result['peak_bytes'] is not None else '']
+            for result in results)
+    write_tables(TextWriter(sys.stdout), [('Benchmarks', ['Size', 'Stage', 'Seconds', 'Records/s', 'Peak bytes'], rows)])
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
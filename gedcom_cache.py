@@ -0,0 +1,108 @@
+import contextlib
+import gc
+import hashlib
+import os
+import pickle
+import tempfile
+from gedcom_model import today_ordinal, years_between
+from gedcom_parser import PARSER_VERSION, load_gedcom
+from gedcom_rules import Tree
+
+# On-disk snapshots of parsed trees.
+#
+# A snapshot holds the individuals, families and the family, relationship and
+# lineage indexes of one GEDCOM file in a single pickle. It is named after
+# the SHA-256 of the file's bytes, the parser version and the snapshot
+# version, so an edited file, a newer parser or a changed model never picks
+# up a stale snapshot; outdated ones are just no longer read. A snapshot
+# that cannot be read for any reason is a cache miss and is deleted. Ages
+# of living people depend on the as-of date and are recomputed on load, so
+# one snapshot serves every as-of date.
+#
+# Unpickling can run arbitrary code: keep the cache in a directory only you
+# can write to.
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'gedcom')
+
+# Tree indexes stored with the records; the kinship index fills itself in
+# lazily per query and is not worth keeping.
+SNAPSHOT_INDEXES = ('relationships', 'lineage')
+
+# Bump when a pickled class changes (Individual, Family and the index
+# classes' attributes), which the parser version does not cover.
+SNAPSHOT_VERSION = 2
+
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_path(path, cache_dir=DEFAULT_CACHE_DIR):
+    """Where the snapshot of the GEDCOM file at path is kept."""
+    return os.path.join(cache_dir, f"{file_digest(path)}-v{PARSER_VERSION}-s{SNAPSHOT_VERSION}.pickle")
+
+
+def load_tree(path, as_of=None, cache_dir=DEFAULT_CACHE_DIR):
+    """(Tree, True if it was read from a snapshot) of the GEDCOM file at path.
+
+    A file without a usable snapshot is parsed and its snapshot written.
+    """
+    as_of = as_of if as_of is not None else today_ordinal()
+    snapshot = snapshot_path(path, cache_dir)
+    try:
+        with open(snapshot, 'rb') as cached:
+            individuals, families, index, indexes = read_snapshot(cached)
+    except Exception:
+        # missing, truncated, or naming classes and attributes that have
+        # since changed: unpickling raises far more than UnpicklingError
+        with contextlib.suppress(OSError):
+            os.remove(snapshot)
+        tree = Tree(*load_gedcom(path, as_of), as_of)
+        save_snapshot(tree, snapshot)
+        return tree, False
+
+    refresh_ages(individuals, as_of)
+    tree = Tree(individuals, families, as_of, index)
+    # fills the cached_property slots so the indexes are not built again
+    tree.__dict__.update(indexes)
+    return tree, True
+
+
+def read_snapshot(cached):
+    # the collector would walk the half-built object graph again and again
+    # while hundreds of thousands of records are unpickled
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.load(cached)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def save_snapshot(tree, snapshot):
+    """Write tree and its snapshot indexes to the snapshot path, atomically."""
+    indexes = {name: getattr(tree, name) for name in SNAPSHOT_INDEXES}
+    directory = os.path.dirname(snapshot) or '.'
+    os.makedirs(directory, exist_ok=True)
+    handle, partial = tempfile.mkstemp(dir=directory, suffix='.partial')
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            pickle.dump((tree.individuals, tree.families, tree.index, indexes), output, pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, snapshot)
+    except BaseException:
+        os.remove(partial)
+        raise
+
+
+def refresh_ages(individuals, as_of):
+    """Ages of living individuals taken on the as_of day ordinal."""
+    for individual in individuals.values():
+        if individual.alive and individual.birth is not None:
+            individual.age = years_between(individual.birth, as_of)
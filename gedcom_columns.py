@@ -0,0 +1,65 @@
+try:
+    import numpy
+except ImportError:  # the vectorized backend is optional
+    numpy = None
+
+# Column store for the vectorized date rules.
+#
+# Event dates are held as int32 day ordinal arrays, one row per individual
+# (or family) in tree order, each with a boolean mask marking the rows that
+# have the date. Kernels compare whole columns at once and return a boolean
+# array of the rows that break the rule; run_rules then only calls the
+# Python check for those rows to build the error messages. Ages are the
+# records' own, taken when they were parsed (or refreshed from a snapshot),
+# so both modes compare the same numbers.
+
+
+class DateColumns:
+    """int32 ordinal columns with presence masks for a Tree."""
+
+    def __init__(self, individuals, families):
+        if numpy is None:
+            raise ImportError("numpy is required for the vectorized rule backend")
+        self.individual_ids = list(individuals)
+        self.family_ids = list(families)
+        self.birth, self.has_birth = ordinal_column(individual.birth for individual in individuals.values())
+        self.death, self.has_death = ordinal_column(individual.death for individual in individuals.values())
+        self.alive = numpy.fromiter((individual.alive for individual in individuals.values()), dtype=bool, count=len(individuals))
+        ages = [individual.age for individual in individuals.values()]
+        self.age = numpy.array([age if age is not None else 0 for age in ages], dtype=numpy.int32)
+        self.has_age = numpy.array([age is not None for age in ages], dtype=bool)
+        self.married, self.has_marriage = ordinal_column(family.married for family in families.values())
+        self.divorced, self.has_divorce = ordinal_column(family.divorced for family in families.values())
+
+    def violating_ids(self, mask, scope='individual'):
+        ids = self.individual_ids if scope == 'individual' else self.family_ids
+        return [ids[row] for row in numpy.flatnonzero(mask)]
+
+
+def ordinal_column(ordinals):
+    """(int32 ordinals with 0 for missing, bool mask of present values)."""
+    values = [ordinal if ordinal is not None else 0 for ordinal in ordinals]
+    column = numpy.array(values, dtype=numpy.int32)
+    return column, column != 0
+
+
+# Kernels: kernel(columns, tree) -> bool array of rows breaking the rule.
+
+def individual_dates_after_today(columns, tree):
+    """US01: birth or death after the tree's today."""
+    return (columns.has_birth & (columns.birth > tree.today)) | (columns.has_death & (columns.death > tree.today))
+
+
+def family_dates_after_today(columns, tree):
+    """US01: marriage or divorce after the tree's today."""
+    return (columns.has_marriage & (columns.married > tree.today)) | (columns.has_divorce & (columns.divorced > tree.today))
+
+
+def death_before_birth(columns, tree):
+    """US03: death recorded before birth."""
+    return columns.has_birth & columns.has_death & (columns.death < columns.birth)
+
+
+def older_than_150(columns, tree):
+    """US07: more than 150 years old at death or on the day ages were taken."""
+    return columns.has_age & (columns.age > 150)
@@ -0,0 +1,121 @@
+from datetime import date
+
+# GEDCOM date values as ranges of proleptic Gregorian day ordinals.
+#
+# A DATE value may be an exact day ("12 JUN 1998"), a month or a year
+# ("JUN 1998", "1998"), a qualified date ("ABT 1850", "BEF 1900",
+# "AFT 3 MAR 1901") or a period ("BET 1850 AND 1860", "FROM 1900 TO 1910").
+# Each one is reduced to (earliest, latest): the first and last day it can
+# fall on, with None for an open end. Values this parser cannot place on the
+# Gregorian calendar give None instead of raising, so one odd date does not
+# stop a whole file from loading.
+
+MONTHS = {
+    'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
+    'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12,
+}
+
+# the qualifier only says how sure the date is, not which days it covers
+APPROXIMATE = {'ABT', 'CAL', 'EST', 'INT'}
+
+# the days datetime.date can represent
+FIRST_DAY = date.min.toordinal()
+LAST_DAY = date.max.toordinal()
+
+
+def parse_date(text):
+    """(earliest, latest) day ordinals of a GEDCOM DATE value, or None."""
+    tokens = text.upper().split()
+    if tokens and tokens[0] == '@#DGREGORIAN@':
+        tokens = tokens[1:]
+    if not tokens or tokens[0].startswith('@#'):
+        return None
+
+    qualifier = tokens[0]
+    if qualifier in APPROXIMATE:
+        if qualifier == 'INT':
+            # INT 1 JAN 1900 (as written in the register)
+            tokens = tokens[:next((i for i, token in enumerate(tokens) if token.startswith('(')), len(tokens))]
+        return day_range(tokens[1:])
+    if qualifier == 'BEF':
+        found = day_range(tokens[1:])
+        # nothing falls before 1 JAN 1 or after 31 DEC 9999 on this calendar
+        return (None, found[0] - 1) if found and found[0] > FIRST_DAY else None
+    if qualifier == 'AFT':
+        found = day_range(tokens[1:])
+        return (found[1] + 1, None) if found and found[1] < LAST_DAY else None
+    if qualifier == 'BET':
+        return period(tokens[1:], 'AND', required=True)
+    if qualifier == 'FROM':
+        return period(tokens[1:], 'TO', required=False)
+    if qualifier == 'TO':
+        found = day_range(tokens[1:])
+        return (None, found[1]) if found else None
+    return day_range(tokens)
+
+
+def period(tokens, separator, required):
+    """Range from the start of the first date to the end of the second."""
+    if separator in tokens:
+        split = tokens.index(separator)
+        start = day_range(tokens[:split])
+        end = day_range(tokens[split + 1:])
+        if start is None or end is None:
+            return None
+        return start[0], end[1]
+    if required:
+        return None
+    start = day_range(tokens)
+    return (start[0], None) if start else None
+
+
+def day_range(tokens):
+    """(first, last) day ordinals of [[day] month] year tokens, or None."""
+    if not 1 <= len(tokens) <= 3:
+        return None
+    year = parse_year(tokens[-1])
+    if year is None:
+        return None
+    try:
+        if len(tokens) == 1:
+            return date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal()
+        month = MONTHS.get(tokens[-2])
+        if month is None:
+            return None
+        if len(tokens) == 2:
+            first = date(year, month, 1).toordinal()
+            if month == 12:
+                return first, date(year, 12, 31).toordinal()
+            return first, date(year, month + 1, 1).toordinal() - 1
+        if not tokens[0].isdigit():
+            return None
+        day = date(year, month, int(tokens[0])).toordinal()
+        return day, day
+    except ValueError:
+        # day out of range for the month, or a year outside 1..9999
+        return None
+
+
+def parse_year(token):
+    # a dual year such as 1749/50 is the later year on the Gregorian calendar
+    first, slash, second = token.partition('/')
+    if not first.isdigit():
+        return None
+    year = int(first)
+    if slash:
+        if not second.isdigit():
+            return None
+        year += 1
+    return year
+
+
+def date_day(text):
+    """The single day ordinal used to compare a date, or None.
+
+    An exact date is its own day; ranges compare on their first day, or on
+    their last day when only that is known (BEF, TO).
+    """
+    found = parse_date(text)
+    if found is None:
+        return None
+    return found[0] if found[0] is not None else found[1]
@@ -0,0 +1,163 @@
+from datetime import date
+from difflib import SequenceMatcher
+
+# Likely duplicate individuals (US23) without comparing every pair.
+#
+# Individuals with a birth date are put in blocks by two keys: the Soundex
+# code of the surname with the given name's initial and the birth year, and
+# the Soundex code of the given name with the exact birth date. Only people
+# sharing a block are compared, so "Raj /Paliwal/" is still paired with
+# "Raj /Palival/" born the same day even though their surnames code
+# differently. A block bigger than max_block is not compared all-pairs; its
+# members are sorted by name and each is compared with the next window
+# records only.
+#
+# A pair's score mixes name similarity with how close the birth dates are,
+# and pairs scoring at least the threshold are joined into clusters. Most
+# candidate pairs are born too far apart, or have names too different in
+# length, to reach the threshold whatever their letters; those are dropped
+# before the names are compared with SequenceMatcher.
+
+SOUNDEX_CODES = {}
+for letters, code in [('BFPV', '1'), ('CGJKQSXZ', '2'), ('DT', '3'), ('L', '4'), ('MN', '5'), ('R', '6')]:
+    for letter in letters:
+        SOUNDEX_CODES[letter] = code
+
+THRESHOLD = 0.9
+NAME_WEIGHT = 0.7
+# birth dates further apart than this are no more alike than unrelated ones;
+# a mistyped day stays within a month
+DATE_DAYS = 30
+# blocks bigger than this are compared with each member's next WINDOW names only
+MAX_BLOCK = 50
+WINDOW = 10
+
+
+def soundex(text):
+    """Four character American Soundex code of text, '' if it has no letters."""
+    letters = [letter for letter in text.upper() if letter.isalpha()]
+    if not letters:
+        return ''
+    code = letters[0]
+    previous = SOUNDEX_CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # H and W do not separate letters with the same code, vowels do
+        if letter not in 'HW':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def full_name(individual):
+    return f"{individual.given or ''} {individual.surname or ''}".strip().lower()
+
+
+def blocking_keys(individual):
+    year = date.fromordinal(individual.birth).year
+    yield 'surname', soundex(individual.surname or ''), (individual.given or '')[:1].upper(), year
+    yield 'given', soundex(individual.given or ''), individual.birth
+
+
+def name_similarity(first, second):
+    return SequenceMatcher(None, (first or '').lower(), (second or '').lower()).ratio()
+
+
+def length_bound(first, second):
+    """Upper bound of name_similarity from the lengths alone, as SequenceMatcher.real_quick_ratio."""
+    first_length, second_length = len(first or ''), len(second or '')
+    total = first_length + second_length
+    return 2 * min(first_length, second_length) / total if total else 1.0
+
+
+def birth_similarity(first, second):
+    return max(0.0, 1 - abs(first.birth - second.birth) / DATE_DAYS)
+
+
+def similarity(first, second):
+    """Score from 0 to 1 of two individuals being the same person.
+
+    Given names and surnames are compared separately so a shared surname
+    alone does not make two relatives look alike.
+    """
+    name = (name_similarity(first.given, second.given) + name_similarity(first.surname, second.surname)) / 2
+    return NAME_WEIGHT * name + (1 - NAME_WEIGHT) * birth_similarity(first, second)
+
+
+def can_reach(first, second, threshold):
+    """False if the pair scores below threshold even with the best names its lengths allow."""
+    needed = (threshold - (1 - NAME_WEIGHT) * birth_similarity(first, second)) / NAME_WEIGHT
+    if needed > 1:
+        return False
+    bound = (length_bound(first.given, second.given) + length_bound(first.surname, second.surname)) / 2
+    return bound >= needed
+
+
+def candidate_pairs(individuals, max_block=MAX_BLOCK, window=WINDOW):
+    """(earlier position, later position) pairs of individuals sharing a block."""
+    people = [individual for individual in individuals.values() if individual.birth is not None]
+    positions = {individual.id: position for position, individual in enumerate(individuals.values())}
+    blocks = {}
+    for individual in people:
+        for key in blocking_keys(individual):
+            blocks.setdefault(key, []).append(individual)
+
+    pairs = set()
+    for members in blocks.values():
+        if len(members) <= max_block:
+            for position, first in enumerate(members):
+                for second in members[position + 1:]:
+                    pairs.add(ordered(positions[first.id], positions[second.id]))
+        else:
+            members = sorted(members, key=lambda member: (full_name(member), member.birth))
+            for position, first in enumerate(members):
+                for second in members[position + 1:position + 1 + window]:
+                    pairs.add(ordered(positions[first.id], positions[second.id]))
+    return pairs
+
+
+def ordered(first, second):
+    return (first, second) if first < second else (second, first)
+
+
+def find_duplicates(individuals, threshold=THRESHOLD, max_block=MAX_BLOCK, window=WINDOW):
+    """[(score, earlier ID, later ID)] of likely duplicates, in file order of the later ID.
+
+    IDs are in the order of the individuals dict.
+    """
+    records = list(individuals.values())
+    found = []
+    for first, second in candidate_pairs(individuals, max_block, window):
+        if not can_reach(records[first], records[second], threshold):
+            continue
+        score = similarity(records[first], records[second])
+        if score >= threshold:
+            found.append((second, first, score))
+    found.sort()
+    return [(score, records[first].id, records[second].id) for second, first, score in found]
+
+
+def duplicate_clusters(duplicates):
+    """[(best score, [IDs])] of the groups linked by duplicates, best first."""
+    parent = {}
+
+    def root(individual_id):
+        while parent.setdefault(individual_id, individual_id) != individual_id:
+            parent[individual_id] = parent[parent[individual_id]]
+            individual_id = parent[individual_id]
+        return individual_id
+
+    for score, first_id, second_id in duplicates:
+        parent[root(second_id)] = root(first_id)
+
+    clusters = {}
+    for score, first_id, second_id in duplicates:
+        cluster = clusters.setdefault(root(first_id), [score, {}])
+        cluster[0] = max(cluster[0], score)
+        cluster[1].update(dict.fromkeys((first_id, second_id)))
+    ranked = [(best, list(members)) for best, members in clusters.values()]
+    ranked.sort(key=lambda cluster: -cluster[0])
+    return ranked
@@ -0,0 +1,324 @@
+import hashlib
+from bisect import bisect_left, bisect_right
+from gedcom_model import Individual, Family, today_ordinal
+from gedcom_parser import RecordBuilder
+from gedcom_reader import split_records, split_record
+from gedcom_rules import WHOLE_TREE_FIELDS, Tree, scoped, select_rules, family_errors
+
+# Incremental revalidation of a GEDCOM file that is edited between runs.
+#
+# An IncrementalValidator keeps the bytes of the file it last read, where
+# each level 0 record starts, a digest of every INDI and FAM record and the
+# errors every rule found on every record. update() compares the new bytes
+# with the old ones from both ends; records lying wholly in the unchanged
+# head or tail are kept as they are, and only the records in between are cut
+# out, digested and, if their digest changed, parsed. Each rule then runs
+# again only where its inputs may have changed:
+#
+#   individual rules     on changed individuals; rules reading the
+#                        relationship index also on the members of families
+#                        whose links changed
+#   family and marriage  on changed families and on the families of changed
+#   rules                or removed individuals; rules reading the lineage or
+#                        kinship index on every family with a spouse
+#                        descending from the members of a family whose links
+#                        changed, in the old or the new tree
+#   global rules         whenever anything changed
+#
+# The tree indexes are reused until a family's links change. Files with a
+# repeated record ID are scanned whole every time. Errors come out in the
+# same order as run_rules over the whole file.
+
+RECORD_TYPES = {b'INDI': Individual, b'FAM': Family}
+
+BLOCK_SIZE = 1 << 13
+
+
+def common_prefix(first, second):
+    """Length of a prefix first and second share, in whole blocks."""
+    limit = min(len(first), len(second))
+    length = 0
+    while length + BLOCK_SIZE <= limit and first[length:length + BLOCK_SIZE] == second[length:length + BLOCK_SIZE]:
+        length += BLOCK_SIZE
+    return length
+
+
+def common_suffix(first, second, limit):
+    """Length, at most limit, of a suffix first and second share, in whole blocks."""
+    length = 0
+    while (length + BLOCK_SIZE <= limit
+           and first[len(first) - length - BLOCK_SIZE:len(first) - length] == second[len(second) - length - BLOCK_SIZE:len(second) - length]):
+        length += BLOCK_SIZE
+    return length
+
+
+def record_digest(record):
+    return hashlib.blake2b(record, digest_size=16).digest()
+
+
+def parse_record(record, as_of):
+    builder = RecordBuilder(as_of)
+    for fields in split_record(record):
+        builder.feed(*fields)
+    return builder.close()
+
+
+def family_links(family):
+    return (family.husband, family.wife, tuple(family.children)) if family is not None else None
+
+
+def family_members(family):
+    return [member for member in (family.husband, family.wife, *family.children) if member]
+
+
+def descendants(index, people):
+    """people and all their descendants in index."""
+    found = set(people)
+    stack = list(people)
+    while stack:
+        for family_id in index.fams(stack.pop()):
+            for child_id in index.children(family_id):
+                if child_id not in found:
+                    found.add(child_id)
+                    stack.append(child_id)
+    return found
+
+
+def individual_rule_errors(tree, individual, positioned_rules):
+    """[(position, story, message)] of the individual rules on one individual."""
+    return [(position, current.story, message)
+            for position, current in positioned_rules
+            for message in current.check(tree, individual)]
+
+
+def replace_errors(results, record_id, positioned_rules, found):
+    """Swap the errors stored for record_id from positioned_rules for found."""
+    positions = {position for position, current in positioned_rules}
+    kept = [error for error in results.get(record_id, ()) if error[0] not in positions]
+    # stable sort keeps each rule's messages in the order it yielded them
+    merged = sorted(kept + found, key=lambda error: error[0])
+    if merged:
+        results[record_id] = merged
+    else:
+        results.pop(record_id, None)
+
+
+def split_by_index(positioned_rules):
+    """(rules reading only records, rules reading a whole tree index)."""
+    local = [(position, current) for position, current in positioned_rules if not WHOLE_TREE_FIELDS & set(current.fields)]
+    indexed = [(position, current) for position, current in positioned_rules if WHOLE_TREE_FIELDS & set(current.fields)]
+    return local, indexed
+
+
+def rules_for(record_id, local_ids, local_rules, indexed_ids, indexed_rules):
+    rules = (local_rules if record_id in local_ids else []) + (indexed_rules if record_id in indexed_ids else [])
+    return sorted(rules, key=lambda item: item[0])
+
+
+class RepeatedRecord(Exception):
+    """A rescanned record has the ID of a record outside the rescanned range."""
+
+
+class IncrementalValidator:
+    """Re-checks a GEDCOM file after edits, looking only at what changed.
+
+    Ages of living people are taken on the as_of day ordinal (today if None)
+    for every update. The last file read is held in memory.
+    """
+
+    def __init__(self, stories=None, as_of=None):
+        self.as_of = as_of if as_of is not None else today_ordinal()
+        selected = select_rules(stories)
+        self.individual_rules = split_by_index(list(enumerate(scoped(selected, 'individual'))))
+        self.family_rules = split_by_index(list(enumerate(scoped(selected, 'family') + scoped(selected, 'marriage'))))
+        self.global_rules = scoped(selected, 'global')
+        self.tree = None
+        self.data = b''
+        # offset and (record type or None, xref) of every level 0 record of data
+        self.starts = []
+        self.entries = []
+        # {record type: {xref: (digest, record)}}
+        self.known = {Individual: {}, Family: {}}
+        self.repeated = False
+        self.individual_results = {}
+        self.family_results = {}
+        self.global_results = []
+        self.last_update = None
+
+    def update(self, path):
+        """[(story, message)] for the file at path, as run_rules would return them.
+
+        last_update is set to the counts of added, changed and removed
+        records and of the records that were checked again.
+        """
+        with open(path, 'rb') as gedcomfile:
+            data = gedcomfile.read()
+        first, last = self.unchanged_records(data)
+        try:
+            scan = self.scan(data, first, last)
+        except RepeatedRecord:
+            first, last = 0, len(self.starts)
+            scan = self.scan(data, first, last)
+        starts, entries, known, parsed, previous, repeated = scan
+
+        old_tree = self.tree
+        old_xrefs = {entry for entry in self.entries[first:last] if entry[0] is not None}
+        removed = {Individual: {}, Family: {}}
+        for record_type, xref in old_xrefs - {entry for entry in entries if entry[0] is not None}:
+            record = self.known[record_type].pop(xref)[1]
+            removed[record_type][record.id] = record
+        for record_type in known:
+            self.known[record_type].update(known[record_type])
+
+        same_order = old_tree is not None and entries == self.entries[first:last] and not (self.repeated or repeated)
+        shift = len(data) - len(self.data)
+        tail_starts = self.starts[last:] if not shift else [start + shift for start in self.starts[last:]]
+        self.starts = self.starts[:first] + starts + tail_starts
+        self.entries = self.entries[:first] + entries + self.entries[last:]
+        self.data = data
+        self.repeated = repeated
+        if same_order:
+            # the same records in the same order: swap the rescanned ones in place
+            individuals, families = old_tree.individuals, old_tree.families
+            for record_type, records in ((Individual, individuals), (Family, families)):
+                for digest, record in known[record_type].values():
+                    records[record.id] = record
+        else:
+            individuals, families = self.records()
+
+        old_families = {record_id: record for record_id, (xref, record) in previous[Family].items() if record is not None}
+        old_families.update(removed[Family])
+        relinked = {family_id for family_id in old_families.keys() | parsed[Family]
+                    if family_links(old_families.get(family_id)) != family_links(families.get(family_id))}
+
+        if old_tree is not None and not relinked:
+            tree = Tree(individuals, families, self.as_of, old_tree.index)
+            tree.__dict__.update({name: value for name, value in vars(old_tree).items() if name in WHOLE_TREE_FIELDS})
+        else:
+            tree = Tree(individuals, families, self.as_of)
+        indexes = [tree.index] if old_tree is None else [old_tree.index, tree.index]
+        self.tree = tree
+
+        touched = set()
+        for family_id in relinked:
+            for family in (old_families.get(family_id), families.get(family_id)):
+                if family is not None:
+                    touched.update(family_members(family))
+        linked_families = set(parsed[Family])
+        for individual_id in parsed[Individual] | removed[Individual].keys():
+            for index in indexes:
+                linked_families.update(index.fams(individual_id))
+                linked_families.update(index.famc(individual_id))
+        downstream = set()
+        for index in indexes:
+            downstream |= descendants(index, touched)
+        downstream_families = {family_id for person in downstream for family_id in tree.index.fams(person)}
+
+        for individual_id in removed[Individual]:
+            self.individual_results.pop(individual_id, None)
+        for family_id in removed[Family]:
+            self.family_results.pop(family_id, None)
+
+        local_rules, indexed_rules = self.individual_rules
+        checked_individuals = (parsed[Individual] | touched) & individuals.keys()
+        for individual_id in checked_individuals:
+            rules = rules_for(individual_id, parsed[Individual], local_rules, checked_individuals, indexed_rules)
+            if rules:
+                found = individual_rule_errors(tree, individuals[individual_id], rules)
+                replace_errors(self.individual_results, individual_id, rules, found)
+
+        local_rules, indexed_rules = self.family_rules
+        checked_families = (linked_families | downstream_families) & families.keys()
+        for family_id in checked_families:
+            rules = rules_for(family_id, linked_families, local_rules, downstream_families, indexed_rules)
+            if rules:
+                found = family_errors(tree, families[family_id], rules)
+                replace_errors(self.family_results, family_id, rules, found)
+
+        if parsed[Individual] or parsed[Family] or removed[Individual] or removed[Family]:
+            self.global_results = [(current.story, message) for current in self.global_rules for message in current.check(tree)]
+
+        changed = sum(1 for record_type in previous for xref, record in previous[record_type].values() if record is not None)
+        self.last_update = {
+            'added': len(parsed[Individual]) + len(parsed[Family]) - changed,
+            'changed': changed,
+            'removed': len(removed[Individual]) + len(removed[Family]),
+            'individuals_checked': len(checked_individuals),
+            'families_checked': len(checked_families),
+        }
+        return self.errors()
+
+    def unchanged_records(self, data):
+        """(first, last): the records before first and from last on are the same bytes in data."""
+        if self.repeated or not self.starts:
+            return 0, len(self.starts)
+        head = common_prefix(self.data, data)
+        tail = common_suffix(self.data, data, min(len(self.data), len(data)) - head)
+        # a kept head record must end, and a kept tail record start, inside
+        # the unchanged bytes
+        first = max(bisect_left(self.starts, head) - 1, 0)
+        last = max(bisect_right(self.starts, len(self.data) - tail), first)
+        return first, last
+
+    def scan(self, data, first, last):
+        """Cut out, digest and parse where needed the records that replace records first to last.
+
+        Returns (starts, entries, {record type: {xref: (digest, record)}},
+        {record type: IDs parsed}, {record type: {ID parsed: (xref, record
+        it replaces or None)}}, whether an ID was repeated).
+        """
+        start = self.starts[first] if first else 0
+        end = self.starts[last] + len(data) - len(self.data) if last < len(self.starts) else len(data)
+        whole_file = first == 0 and last == len(self.starts)
+        rescanned = {entry for entry in self.entries[first:last] if entry[0] is not None}
+
+        starts = []
+        entries = []
+        known = {Individual: {}, Family: {}}
+        parsed = {Individual: set(), Family: set()}
+        previous = {Individual: {}, Family: {}}
+        repeated = False
+        for offset, xref, tag, text in split_records(data, start, end):
+            record_type = RECORD_TYPES.get(tag) if xref is not None else None
+            starts.append(offset)
+            entries.append((record_type, xref))
+            if record_type is None:
+                continue
+            digest = record_digest(text)
+            if xref in known[record_type]:
+                # a repeated ID is one record whose last copy wins, as in load_gedcom
+                repeated = True
+                digest = record_digest(known[record_type][xref][0] + digest)
+            elif not whole_file and xref in self.known[record_type] and (record_type, xref) not in rescanned:
+                raise RepeatedRecord(xref)
+            old = self.known[record_type].get(xref)
+            if old is not None and old[0] == digest:
+                record = old[1]
+                parsed[record_type].discard(record.id)
+                previous[record_type].pop(record.id, None)
+            else:
+                record = parse_record(text, self.as_of)
+                parsed[record_type].add(record.id)
+                previous[record_type][record.id] = (xref, old[1] if old is not None else None)
+            known[record_type][xref] = digest, record
+        return starts, entries, known, parsed, previous, repeated
+
+    def records(self):
+        """(individuals, families) in file order; a repeated ID keeps its first place."""
+        records = {Individual: {}, Family: {}}
+        for record_type, xref in self.entries:
+            if record_type is not None:
+                record = self.known[record_type][xref][1]
+                records[record_type][record.id] = record
+        return records[Individual], records[Family]
+
+    def errors(self):
+        """The current [(story, message)] in run_rules order."""
+        errors = []
+        for results, records in ((self.individual_results, self.tree.individuals), (self.family_results, self.tree.families)):
+            for record_id in records:
+                found = results.get(record_id)
+                if found:
+                    errors.extend((story, message) for position, story, message in found)
+        errors.extend(self.global_results)
+        return errors
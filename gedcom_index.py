@@ -0,0 +1,98 @@
+# Adjacency indexes between individuals and families.
+#
+# Built once from the family records (HUSB, WIFE and CHIL are taken as the
+# authoritative links) so rules can go from a person to their families and
+# back without scanning every family.
+
+
+class FamilyIndex:
+    """individual -> FAMS/FAMC family IDs and family -> spouses/children."""
+
+    def __init__(self, families):
+        self.spouse_families = {}
+        self.child_families = {}
+        self.family_spouses = {}
+        self.family_children = {}
+
+        for family_id, family in families.items():
+            spouses = tuple(spouse_id for spouse_id in (family.husband, family.wife) if spouse_id)
+            self.family_spouses[family_id] = spouses
+            self.family_children[family_id] = tuple(family.children)
+            for spouse_id in spouses:
+                self.spouse_families.setdefault(spouse_id, []).append(family_id)
+            for child_id in family.children:
+                self.child_families.setdefault(child_id, []).append(family_id)
+
+    def fams(self, individual_id):
+        """Families the individual is a spouse in."""
+        return self.spouse_families.get(individual_id, ())
+
+    def famc(self, individual_id):
+        """Families the individual is a child in."""
+        return self.child_families.get(individual_id, ())
+
+    def spouses(self, family_id):
+        return self.family_spouses.get(family_id, ())
+
+    def children(self, family_id):
+        return self.family_children.get(family_id, ())
+
+    def partners(self, individual_id):
+        """(family ID, spouse ID) for every family the individual is a spouse in.
+
+        The spouse ID is None when the family has no other partner.
+        """
+        for family_id in self.fams(individual_id):
+            spouse_id = None
+            for other_id in self.spouses(family_id):
+                if other_id != individual_id:
+                    spouse_id = other_id
+            yield family_id, spouse_id
+
+    def children_of(self, individual_id):
+        """Children of the individual across all their families."""
+        return [child_id for family_id in self.fams(individual_id) for child_id in self.children(family_id)]
+
+    def parents_of(self, individual_id):
+        """Parents of the individual across all families they are a child in."""
+        return [parent_id for family_id in self.famc(individual_id) for parent_id in self.spouses(family_id)]
+
+    def is_married(self, individual_id):
+        return individual_id in self.spouse_families
+
+
+class Relationships:
+    """Spouse links and sibling sets computed in one pass over a FamilyIndex.
+
+    Dicts with None values are used as insertion-ordered sets so lookups are
+    O(1) and listings come out in file order.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.spouse_sets = {}
+        self.child_sets = {}
+
+        for family_id, spouses in index.family_spouses.items():
+            for spouse_id in spouses:
+                linked = self.spouse_sets.setdefault(spouse_id, {})
+                for other_id in spouses:
+                    if other_id != spouse_id:
+                        linked[other_id] = None
+            self.child_sets[family_id] = dict.fromkeys(index.children(family_id))
+
+    def spouses(self, individual_id):
+        return list(self.spouse_sets.get(individual_id, ()))
+
+    def siblings(self, individual_id):
+        """Siblings and half-siblings of the individual."""
+        found = {}
+        for family_id in self.index.famc(individual_id):
+            found.update(self.child_sets[family_id])
+        found.pop(individual_id, None)
+        return list(found)
+
+    def are_siblings(self, first_id, second_id):
+        if first_id == second_id:
+            return False
+        return any(second_id in self.child_sets[family_id] for family_id in self.index.famc(first_id))
@@ -0,0 +1,211 @@
+from bisect import bisect_right
+
+# Ancestor/descendant reachability over the parent -> child graph.
+#
+# Every individual gets a postorder number from an iterative depth-first walk
+# down the family tree, so a child always finishes before its parents. The
+# descendants of a person are then described by a short sorted list of
+# postorder intervals: the person's own DFS subtree plus the merged intervals
+# of all their children. "Is X a descendant of Y" becomes a lookup of X's
+# number in Y's interval list, with no walk over the tree and no recursion,
+# however many generations deep the pedigree is.
+#
+# The lists stay short while descendants sit in few DFS subtrees. With
+# pedigree collapse (cousin marriages, repeated intermarriage between a few
+# lines) a person's descendants are scattered over the numbering and the
+# list can grow towards one interval per descendant; a random 20 generation
+# by 2000 person DAG once produced 9.4M intervals. Past max_intervals a
+# person's descendants are kept instead as a bitset over the postorder
+# numbers (a Python int), which costs one bit per person numbered before
+# them, so no person costs more than the smaller of the two.
+
+
+# past this many intervals a person's descendants are kept as a bitset
+MAX_INTERVALS = 64
+
+
+class LineageIndex:
+    """Descendant intervals built once from a FamilyIndex."""
+
+    def __init__(self, index, max_intervals=MAX_INTERVALS):
+        self.max_intervals = max_intervals
+        self.children = {}
+        for family_id, spouses in index.family_spouses.items():
+            family_children = index.children(family_id)
+            for parent_id in spouses:
+                self.children.setdefault(parent_id, []).extend(family_children)
+
+        self.post = {}
+        self.intervals = {}
+        self.bits = {}
+        self._label()
+
+    def _label(self):
+        low = {}
+        finished = []
+        in_progress = set()
+
+        people = list(self.children)
+        for kids in self.children.values():
+            people.extend(kids)
+
+        for root in people:
+            if root in self.post:
+                continue
+            low[root] = len(finished)
+            in_progress.add(root)
+            stack = [(root, iter(self.children.get(root, ())))]
+            while stack:
+                node, pending = stack[-1]
+                for child in pending:
+                    # children already finished keep their numbers, and a
+                    # child still in progress would be a cycle in bad data
+                    if child not in self.post and child not in in_progress:
+                        low[child] = len(finished)
+                        in_progress.add(child)
+                        stack.append((child, iter(self.children.get(child, ()))))
+                        break
+                else:
+                    stack.pop()
+                    in_progress.discard(node)
+                    self.post[node] = len(finished)
+                    finished.append(node)
+
+        # increasing postorder visits children before their parents
+        for node in finished:
+            spans = [(low[node], self.post[node])]
+            bits = 0
+            for child in self.children.get(node, ()):
+                if child in self.bits:
+                    bits |= self.bits[child]
+                elif child in self.intervals:
+                    starts, ends = self.intervals[child]
+                    spans.extend(zip(starts, ends))
+            starts, ends = merge_intervals(spans)
+            if bits or len(starts) > self.max_intervals:
+                for start, end in zip(starts, ends):
+                    bits |= ((1 << (end - start + 1)) - 1) << start
+                self.bits[node] = bits
+            else:
+                self.intervals[node] = (starts, ends)
+
+    def is_descendant(self, descendant_id, ancestor_id):
+        """True if descendant_id is a child, grandchild, ... of ancestor_id."""
+        if descendant_id == ancestor_id:
+            return False
+        position = self.post.get(descendant_id)
+        if position is None:
+            return False
+        if ancestor_id in self.bits:
+            return bool(self.bits[ancestor_id] >> position & 1)
+        intervals = self.intervals.get(ancestor_id)
+        if intervals is None:
+            return False
+        starts, ends = intervals
+        i = bisect_right(starts, position) - 1
+        return i >= 0 and position <= ends[i]
+
+    def is_ancestor(self, ancestor_id, descendant_id):
+        return self.is_descendant(descendant_id, ancestor_id)
+
+
+def merge_intervals(spans):
+    """Merge (start, end) spans into sorted, non-overlapping start and end lists."""
+    spans.sort()
+    starts = []
+    ends = []
+    for start, end in spans:
+        if ends and start <= ends[-1] + 1:
+            if end > ends[-1]:
+                ends[-1] = end
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+class KinshipIndex:
+    """Nearest common ancestor queries for cousin and aunt/uncle checks.
+
+    A child has two parents, so the parent graph is not a tree and a
+    single Euler tour cannot cover it. Instead each person's ancestors up to
+    max_generations back are kept as {ancestor: generations}, built from the
+    parents' maps and memoized, so every query compares two small bounded
+    maps no matter how large the tree is.
+    """
+
+    def __init__(self, index, max_generations=2):
+        self.index = index
+        self.max_generations = max_generations
+        self.ancestor_maps = {}
+
+    def ancestors(self, individual_id):
+        """{ancestor ID: generations back} up to max_generations."""
+        if individual_id not in self.ancestor_maps:
+            for person in self._unmapped_ancestry(individual_id):
+                self.ancestor_maps[person] = self._merge_parents(person)
+        return self.ancestor_maps[individual_id]
+
+    def _unmapped_ancestry(self, individual_id):
+        """People that still need a map, each listed after all of their parents."""
+        order = []
+        seen = {individual_id}
+        stack = [(individual_id, iter(self.index.parents_of(individual_id)))]
+        while stack:
+            person, parents = stack[-1]
+            for parent in parents:
+                if parent not in seen and parent not in self.ancestor_maps:
+                    seen.add(parent)
+                    stack.append((parent, iter(self.index.parents_of(parent))))
+                    break
+            else:
+                stack.pop()
+                order.append(person)
+        return order
+
+    def _merge_parents(self, person):
+        found = {}
+        parents = self.index.parents_of(person)
+        for parent in parents:
+            found[parent] = 1
+        for parent in parents:
+            # a parent missing a map here is part of a cycle in bad data
+            for ancestor, generations in self.ancestor_maps.get(parent, {}).items():
+                if generations < self.max_generations and found.get(ancestor, self.max_generations + 1) > generations + 1:
+                    found[ancestor] = generations + 1
+        return found
+
+    def kinship(self, first_id, second_id):
+        """Generations from each person up to their nearest common ancestor.
+
+        Returns (first generations, second generations), e.g. (1, 1) for
+        siblings, (2, 2) for first cousins and (1, 2) when first_id is the
+        aunt or uncle of second_id. A person counts as their own ancestor at
+        generation 0, so (0, n) means first_id is an ancestor of second_id.
+        Returns None when no common ancestor is within max_generations.
+        """
+        first = dict(self.ancestors(first_id))
+        first[first_id] = 0
+        second = dict(self.ancestors(second_id))
+        second[second_id] = 0
+        if len(first) > len(second):
+            first, second = second, first
+            swapped = True
+        else:
+            swapped = False
+
+        nearest = None
+        for ancestor, generations in first.items():
+            other = second.get(ancestor)
+            if other is not None and (nearest is None or generations + other < sum(nearest)):
+                nearest = (generations, other)
+        if nearest is not None and swapped:
+            nearest = (nearest[1], nearest[0])
+        return nearest
+
+    def are_first_cousins(self, first_id, second_id):
+        return self.kinship(first_id, second_id) == (2, 2)
+
+    def is_aunt_or_uncle(self, elder_id, younger_id):
+        """True if elder_id is a sibling (or half-sibling) of a parent of younger_id."""
+        return self.kinship(elder_id, younger_id) == (1, 2)
@@ -0,0 +1,93 @@
+from datetime import date
+from gedcom_dates import date_day
+
+# Shared record model for Gedcom_All_Sprints.py and m2b3_gedcom_code.py.
+#
+# Records use __slots__ so an individual costs a fixed handful of pointers
+# instead of a dict. Missing values are None, flags are real booleans and
+# dates are kept as proleptic Gregorian day ordinals next to the original
+# GEDCOM date text used for display.
+
+
+class Individual:
+    __slots__ = ('id', 'name', 'given', 'surname', 'sex', 'birth', 'death',
+                 'birth_date', 'death_date', 'alive', 'age', 'famc', 'fams')
+
+    def __init__(self, id):
+        self.id = id
+        self.name = ''
+        self.given = None
+        self.surname = None
+        self.sex = None
+        self.birth = None
+        self.death = None
+        self.birth_date = None
+        self.death_date = None
+        self.alive = True
+        self.age = None
+        self.famc = []
+        self.fams = []
+
+    def __repr__(self):
+        return f"Individual({self.id!r}, {self.name!r})"
+
+
+class Family:
+    __slots__ = ('id', 'husband', 'wife', 'children', 'married', 'divorced',
+                 'marriage_date', 'divorce_date')
+
+    def __init__(self, id):
+        self.id = id
+        self.husband = None
+        self.wife = None
+        self.children = []
+        self.married = None
+        self.divorced = None
+        self.marriage_date = None
+        self.divorce_date = None
+
+    def __repr__(self):
+        return f"Family({self.id!r}, {self.husband!r}, {self.wife!r})"
+
+
+def date_ordinal(date_str):
+    """Comparison day ordinal of a GEDCOM date value, or None if it has none.
+
+    Partial and qualified dates ("ABT 1850", "BEF 1900") are accepted; see
+    gedcom_dates.date_day.
+    """
+    return date_day(date_str)
+
+
+def years_between(start, end):
+    """Whole years from the start ordinal to the end ordinal."""
+    start_date = date.fromordinal(start)
+    end_date = date.fromordinal(end)
+    return end_date.year - start_date.year - ((end_date.month, end_date.day) < (start_date.month, start_date.day))
+
+
+def iso_date(ordinal):
+    return date.fromordinal(ordinal).isoformat() if ordinal is not None else None
+
+
+def today_ordinal():
+    return date.today().toordinal()
+
+
+def as_of_ordinal(text):
+    """Day ordinal of a YYYY-MM-DD as-of date given on the command line."""
+    return date.fromisoformat(text).toordinal()
+
+
+def split_name(name):
+    """Given name and surname of a "Given /Surname/" NAME value."""
+    given, _, rest = name.partition('/')
+    surname = rest.partition('/')[0]
+    return given.strip() or None, surname.strip() or None
+
+
+def months_between(start, end):
+    """Whole months from the start ordinal to the end ordinal."""
+    start_date = date.fromordinal(start)
+    end_date = date.fromordinal(end)
+    return (end_date.year - start_date.year) * 12 + end_date.month - start_date.month - (end_date.day < start_date.day)
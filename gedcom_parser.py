@@ -0,0 +1,174 @@
+from gedcom_model import Individual, Family, date_ordinal, years_between, split_name, today_ordinal
+from gedcom_reader import iter_gedcom, decode
+
+# Streaming record parser building the shared Individual/Family model from
+# the (level, xref, tag, value) lines produced by gedcom_reader.
+
+# Bumped whenever the records built from the same file change (new fields,
+# different date handling), so cached snapshots of older parses are not used.
+PARSER_VERSION = 1
+
+# Date lines belong to the last level 1 event seen, so the event is tracked
+# while walking the record instead of searching the record for the next line.
+EVENT_FIELDS = {
+    Individual: {b'BIRT': ('birth', 'birth_date'), b'DEAT': ('death', 'death_date')},
+    Family: {b'MARR': ('married', 'marriage_date'), b'DIV': ('divorced', 'divorce_date')},
+}
+
+# The record fields filled from each level 1 tag and the lines under it. A
+# builder asked for some fields only reads the tags that fill one of them
+# and skips every other subtree without decoding it.
+TAG_FIELDS = {
+    Individual: {
+        b'NAME': ('name', 'given', 'surname'),
+        b'SEX': ('sex',),
+        b'BIRT': ('birth', 'birth_date', 'age'),
+        b'DEAT': ('death', 'death_date', 'alive', 'age'),
+        b'FAMS': ('fams',),
+        b'FAMC': ('famc',),
+    },
+    Family: {
+        b'HUSB': ('husband',),
+        b'WIFE': ('wife',),
+        b'CHIL': ('children',),
+        b'MARR': ('married', 'marriage_date'),
+        b'DIV': ('divorced', 'divorce_date'),
+    },
+}
+
+
+class RecordBuilder:
+    """Builds one Individual or Family at a time from split GEDCOM lines.
+
+    feed() returns the record completed by a new level 0 line, and close()
+    returns the last one. The record being built is available as current as
+    soon as its level 0 line has been fed. Ages of living people are taken
+    on the as_of day ordinal (today if None), fixed for the whole run.
+
+    fields, if given, names the Individual and Family attributes to fill;
+    the others keep their defaults.
+    """
+
+    def __init__(self, as_of=None, fields=None):
+        self.current = None
+        self.event = None
+        self.skipping = False
+        self.as_of = as_of if as_of is not None else today_ordinal()
+        self.tags = wanted_tags(fields)
+
+    def feed(self, level, xref, tag, value):
+        if level == 0:
+            finished = self.close()
+            if xref is not None and tag == b'INDI':
+                self.current = Individual(decode(xref))
+            elif xref is not None and tag == b'FAM':
+                self.current = Family(decode(xref))
+            return finished
+
+        record = self.current
+        if record is None:
+            return None
+
+        if level == 1:
+            self.skipping = self.tags is not None and tag not in self.tags[type(record)]
+            if self.skipping:
+                self.event = None
+                return None
+            self.event = EVENT_FIELDS[type(record)].get(tag)
+            if type(record) is Individual:
+                if tag == b'NAME':
+                    record.name = decode(value)
+                elif tag == b'SEX':
+                    record.sex = decode(value) or None
+                elif tag == b'DEAT':
+                    record.alive = False
+                elif tag == b'FAMS':
+                    record.fams.append(decode(value))
+                elif tag == b'FAMC':
+                    record.famc.append(decode(value))
+            else:
+                if tag == b'HUSB':
+                    record.husband = decode(value)
+                elif tag == b'WIFE':
+                    record.wife = decode(value)
+                elif tag == b'CHIL':
+                    record.children.append(decode(value))
+        elif self.skipping:
+            return None
+        elif level == 2:
+            if tag == b'DATE' and self.event:
+                ordinal_field, text_field = self.event
+                date_str = decode(value)
+                setattr(record, text_field, date_str)
+                setattr(record, ordinal_field, date_ordinal(date_str))
+            elif tag == b'GIVN':
+                record.given = decode(value)
+            elif tag == b'SURN':
+                record.surname = decode(value)
+        return None
+
+    def close(self):
+        record = self.current
+        self.current = None
+        self.event = None
+        self.skipping = False
+        if type(record) is Individual:
+            finish_individual(record, self.as_of)
+        return record
+
+
+def wanted_tags(fields):
+    """{record type: level 1 tags to read} for fields, or None to read all."""
+    if fields is None:
+        return None
+    fields = set(fields)
+    unknown = fields - set(Individual.__slots__) - set(Family.__slots__)
+    if unknown:
+        raise ValueError(f"no record field named {', '.join(sorted(unknown))}")
+    return {
+        record_type: {tag for tag, filled in tag_fields.items() if fields.intersection(filled)}
+        for record_type, tag_fields in TAG_FIELDS.items()
+    }
+
+
+def finish_individual(individual, as_of):
+    given, surname = split_name(individual.name)
+    if individual.given is None:
+        individual.given = given
+    if individual.surname is None:
+        individual.surname = surname
+    if individual.birth is not None:
+        if individual.death is not None:
+            individual.age = years_between(individual.birth, individual.death)
+        elif individual.alive:
+            individual.age = years_between(individual.birth, as_of)
+
+
+def iter_records(source, as_of=None, fields=None):
+    """Yield Individual and Family records in one pass over source.
+
+    source is a file path, read through the memory-mapped reader, or an
+    iterable of text lines. Only the record currently being read is held in
+    memory. With fields only those attributes are parsed (see
+    gedcom_rules.rule_fields).
+    """
+    builder = RecordBuilder(as_of, fields)
+    for fields in iter_gedcom(source):
+        record = builder.feed(*fields)
+        if record is not None:
+            yield record
+    record = builder.close()
+    if record is not None:
+        yield record
+
+
+def load_gedcom(source, as_of=None, fields=None):
+    """Parse source into (individuals, families) dicts keyed by record ID."""
+    individuals = {}
+    families = {}
+    for record in iter_records(source, as_of, fields):
+        if type(record) is Individual:
+            individuals[record.id] = record
+        else:
+            families[record.id] = record
+    return individuals, families
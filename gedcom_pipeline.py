@@ -0,0 +1,148 @@
+import queue
+import threading
+from gedcom_parser import RecordBuilder
+from gedcom_reader import LineSplitter
+from gedcom_stream import StreamValidator
+
+# Pipelined parse and validation over bounded queues.
+#
+#   read thread      file blocks           -> queue of queue_size blocks
+#   parse thread     lines, records        -> queue of queue_size record batches
+#   calling thread   StreamValidator rules
+#
+# Blocks are read with plain read() calls, which release the GIL while they
+# wait on storage, so on slow or network storage the reading overlaps the
+# parsing and checking of the records before. Records are checked as soon as
+# their rules can be decided (see gedcom_stream), so per-record and family
+# rules run while the rest of the file is still being read. A full queue
+# blocks the stage feeding it, which keeps memory bounded to a few blocks
+# and batches however large the file is.
+
+BLOCK_SIZE = 1 << 20
+QUEUE_SIZE = 4
+BATCH_SIZE = 512
+
+# put by a stage after its last item
+DONE = object()
+
+
+def read_blocks(source, block_size=BLOCK_SIZE):
+    """Yield the bytes of source, a file path or a binary file object, in blocks."""
+    if isinstance(source, str):
+        with open(source, 'rb') as gedcomfile:
+            yield from read_blocks(gedcomfile, block_size)
+        return
+    while True:
+        block = source.read(block_size)
+        if not block:
+            return
+        yield block
+
+
+def parse_blocks(blocks, as_of=None, batch_size=BATCH_SIZE):
+    """Yield lists of up to batch_size records built from byte blocks."""
+    splitter = LineSplitter()
+    builder = RecordBuilder(as_of)
+    batch = []
+    for block in blocks:
+        for fields in splitter.feed(block):
+            record = builder.feed(*fields)
+            if record is not None:
+                batch.append(record)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+    for fields in splitter.close():
+        record = builder.feed(*fields)
+        if record is not None:
+            batch.append(record)
+    record = builder.close()
+    if record is not None:
+        batch.append(record)
+    if batch:
+        yield batch
+
+
+class Pipeline:
+    """Threads running generator stages connected by bounded queues.
+
+    An exception in a stage ends the stages after it and is raised again
+    from the consuming thread. stop() makes every stage give up at its next
+    put, so no thread stays blocked on a full queue.
+    """
+
+    def __init__(self):
+        self.stopping = threading.Event()
+        self.failures = []
+        self.threads = []
+
+    def stage(self, items, queue_size=QUEUE_SIZE):
+        """Run the iterable items in a new thread; return a generator of what it produces."""
+        output = queue.Queue(queue_size)
+        thread = threading.Thread(target=self.produce, args=(items, output), daemon=True)
+        self.threads.append(thread)
+        thread.start()
+        return self.consume(output)
+
+    def produce(self, items, output):
+        try:
+            for item in items:
+                if not self.put(output, item):
+                    return
+        except BaseException as error:
+            self.failures.append(error)
+        self.put(output, DONE)
+
+    def put(self, output, item):
+        while not self.stopping.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def consume(self, output):
+        while True:
+            try:
+                item = output.get(timeout=0.1)
+            except queue.Empty:
+                if self.stopping.is_set():
+                    return
+                continue
+            if item is DONE:
+                if self.failures:
+                    raise self.failures[0]
+                return
+            yield item
+
+    def stop(self):
+        self.stopping.set()
+        for thread in self.threads:
+            thread.join()
+
+
+def pipelined_records(source, as_of=None, block_size=BLOCK_SIZE, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE):
+    """Yield the records of source, read and parsed ahead by background threads."""
+    pipeline = Pipeline()
+    try:
+        blocks = pipeline.stage(read_blocks(source, block_size), queue_size)
+        for batch in pipeline.stage(parse_blocks(blocks, as_of, batch_size), queue_size):
+            yield from batch
+    finally:
+        pipeline.stop()
+
+
+def run_pipeline(source, stories=None, as_of=None, **sizes):
+    """Parse and validate source with the stages overlapping; return (tree, [(story, message)]).
+
+    sizes are block_size, queue_size and batch_size for pipelined_records.
+    The errors are those of gedcom_stream.StreamValidator, the same as
+    run_rules on the whole file and in the same order, whatever order the
+    records are in (with US22 errors first if stories is None).
+    """
+    validator = StreamValidator(stories, as_of)
+    for record in pipelined_records(source, validator.tree.today, **sizes):
+        validator.add(record)
+    validator.finish()
+    return validator.tree, validator.in_rule_order()
@@ -0,0 +1,139 @@
+import mmap
+import re
+
+# Byte-level GEDCOM reader shared by Gedcom_All_Sprints.py and m2b3_gedcom_code.py.
+#
+# Lines are split on the raw bytes into (level, xref, tag, value). Only the
+# level is converted; xref, tag and value stay as bytes so callers decode just
+# the payloads they actually use (names, dates, pointers).
+
+ENCODING = 'utf-8'
+
+BOM = b'\xef\xbb\xbf'
+
+# level, optional xref and tag of a level 0 line, as split_gedcom_line reads them
+LEVEL_0_LINE = re.compile(rb'^(?:\xef\xbb\xbf)?(0) +(?:(@[^ \r\n]*) +)?([^ \r\n]*)', re.MULTILINE)
+
+
+def split_gedcom_line(raw):
+    """Split one GEDCOM line (bytes, without the newline) into its fields.
+
+    Returns (level, xref, tag, value) where level is an int, xref is the
+    record pointer of a level 0 line or None, and tag/value are bytes.
+    Returns None for blank or malformed lines.
+    """
+    raw = raw.strip()
+    first = raw.find(b' ')
+    if first < 0 or not raw[:first].isdigit():
+        return None
+    level = int(raw[:first])
+
+    rest = raw[first + 1:].lstrip()
+    xref = None
+    if rest[:1] == b'@':
+        end = rest.find(b' ')
+        if end < 0:
+            return level, None, rest, b''
+        xref = rest[:end]
+        rest = rest[end + 1:].lstrip()
+
+    space = rest.find(b' ')
+    if space < 0:
+        return level, xref, rest, b''
+    return level, xref, rest[:space], rest[space + 1:]
+
+
+def decode(value):
+    return value.decode(ENCODING, 'replace').strip()
+
+
+def iter_gedcom_lines(path):
+    """Yield the split fields of every line of the GEDCOM file at path.
+
+    The file is memory-mapped and scanned for newlines directly, so no text
+    line objects are created and the file is never read into memory as a
+    whole.
+    """
+    with open(path, 'rb') as gedcomfile:
+        try:
+            data = mmap.mmap(gedcomfile.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files cannot be mapped
+            return
+        with data:
+            start = len(BOM) if data[:len(BOM)] == BOM else 0
+            size = len(data)
+            while start < size:
+                end = data.find(b'\n', start)
+                if end < 0:
+                    end = size
+                fields = split_gedcom_line(data[start:end])
+                if fields is not None:
+                    yield fields
+                start = end + 1
+
+
+def split_records(data, start=0, end=None):
+    """Yield (offset, xref, tag, record bytes) for the level 0 records in data[start:end].
+
+    xref is None for records without one (HEAD, TRLR). A record runs from
+    its level 0 line up to the next one; the level 0 lines are found by a
+    regular expression, so the lines in between are not split. start must
+    be the beginning of a line.
+    """
+    end = len(data) if end is None else end
+    previous = None
+    for match in LEVEL_0_LINE.finditer(data, start, end):
+        if previous is not None:
+            yield previous.start(1), previous.group(2), previous.group(3), data[previous.start(1):match.start(1)]
+        previous = match
+    if previous is not None:
+        yield previous.start(1), previous.group(2), previous.group(3), data[previous.start(1):end]
+
+
+def split_record(record):
+    """Yield the split fields of every line of a record from split_records."""
+    for raw in record.split(b'\n'):
+        fields = split_gedcom_line(raw)
+        if fields is not None:
+            yield fields
+
+
+class LineSplitter:
+    """Splits a byte stream cut into blocks at arbitrary points into GEDCOM lines.
+
+    feed() returns the split fields of the lines a block completes, close()
+    those of a last line without a newline.
+    """
+
+    def __init__(self):
+        self.rest = b''
+        self.first = True
+
+    def feed(self, block):
+        *lines, self.rest = (self.rest + block).split(b'\n')
+        if self.first and lines:
+            lines[0] = lines[0].removeprefix(BOM)
+            self.first = False
+        return [fields for fields in map(split_gedcom_line, lines) if fields is not None]
+
+    def close(self):
+        rest = self.rest.removeprefix(BOM) if self.first else self.rest
+        self.rest = b''
+        fields = split_gedcom_line(rest)
+        return [] if fields is None else [fields]
+
+
+def iter_gedcom_text(lines):
+    """Yield the split fields of already decoded text lines."""
+    for line in lines:
+        fields = split_gedcom_line(line.lstrip('\ufeff').encode(ENCODING))
+        if fields is not None:
+            yield fields
+
+
+def iter_gedcom(source):
+    """Read fields from a file path or from an iterable of text lines."""
+    if isinstance(source, str):
+        return iter_gedcom_lines(source)
+    return iter_gedcom_text(source)
@@ -0,0 +1,139 @@
+import csv
+import json
+
+# Streaming report writers.
+#
+# A report is a sequence of tables. Each writer is told when a table starts
+# and then receives its rows one at a time and writes them straight to the
+# output stream, so no table is held in memory:
+#
+#   writer = WRITERS[format](stream)
+#   writer.table("Individuals", field_names)
+#   for row in rows:
+#       writer.row(row)
+#   writer.close()
+#
+# The text writer needs column widths before it can print anything, so it
+# buffers the first sample_size rows of a table, sizes the columns on those
+# and streams the rest; a later, wider value just pushes its row out of line.
+
+
+class CsvWriter:
+    """One CSV section per table: the title, the header and the rows."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.writer(stream, lineterminator='\n')
+        self.tables = 0
+
+    def table(self, title, field_names):
+        if self.tables:
+            self.stream.write('\n')
+        self.tables += 1
+        self.writer.writerow([title])
+        self.writer.writerow(field_names)
+
+    def row(self, values):
+        self.writer.writerow(['' if value is None else value for value in values])
+
+    def close(self):
+        self.stream.flush()
+
+
+class JsonlWriter:
+    """One JSON object per row, keyed by field name, tagged with its table."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.title = None
+        self.field_names = ()
+
+    def table(self, title, field_names):
+        self.title = title
+        self.field_names = field_names
+
+    def row(self, values):
+        record = {'table': self.title}
+        record.update(zip(self.field_names, values))
+        self.stream.write(json.dumps(record, default=str))
+        self.stream.write('\n')
+
+    def close(self):
+        self.stream.flush()
+
+
+class TextWriter:
+    """Fixed-width columns sized on the first sample_size rows of each table."""
+
+    def __init__(self, stream, sample_size=1000):
+        self.stream = stream
+        self.sample_size = sample_size
+        self.title = None
+        self.field_names = None
+        self.sample = []
+        self.widths = None
+
+    def table(self, title, field_names):
+        self.end_table()
+        self.title = title
+        self.field_names = [str(name) for name in field_names]
+        self.sample = []
+        self.widths = None
+
+    def row(self, values):
+        cells = [text_cell(value) for value in values]
+        if self.widths is None:
+            self.sample.append(cells)
+            if len(self.sample) >= self.sample_size:
+                self.flush_sample()
+        else:
+            self.write_line(cells)
+
+    def flush_sample(self):
+        if self.widths is not None:
+            return
+        self.widths = [len(name) for name in self.field_names]
+        for cells in self.sample:
+            for position, cell in enumerate(cells):
+                if len(cell) > self.widths[position]:
+                    self.widths[position] = len(cell)
+        self.stream.write(self.title + ':\n')
+        self.write_line(self.field_names)
+        self.write_line(['-' * width for width in self.widths])
+        for cells in self.sample:
+            self.write_line(cells)
+        self.sample = []
+
+    def write_line(self, cells):
+        self.stream.write('  '.join(cell.ljust(width) for cell, width in zip(cells, self.widths)).rstrip())
+        self.stream.write('\n')
+
+    def end_table(self):
+        if self.field_names is not None:
+            self.flush_sample()
+            self.stream.write('\n')
+
+    def close(self):
+        self.end_table()
+        self.field_names = None
+        self.stream.flush()
+
+
+def text_cell(value):
+    return '' if value is None else str(value)
+
+
+WRITERS = {
+    'csv': CsvWriter,
+    'jsonl': JsonlWriter,
+    'text': TextWriter,
+}
+
+
+def write_tables(writer, tables):
+    """Stream (title, field_names, rows) tables through writer and close it."""
+    for title, field_names, rows in tables:
+        writer.table(title, field_names)
+        for values in rows:
+            writer.row(values)
+    writer.close()
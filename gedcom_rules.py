@@ -0,0 +1,556 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import operator
+from functools import cached_property
+from gedcom_model import years_between, months_between, today_ordinal
+from gedcom_index import FamilyIndex, Relationships
+from gedcom_lineage import LineageIndex, KinshipIndex
+from gedcom_stats import timed_check
+from gedcom_duplicates import find_duplicates
+
+# Registry of user story checks.
+#
+# Every rule declares the scope it runs in and the record fields it reads.
+# run_rules groups the enabled rules by scope and makes a single pass over
+# the individuals and a single pass over the families, calling every rule of
+# that scope on each record, instead of one pass per user story.
+#
+# Scopes:
+#   individual  check(tree, individual)
+#   family      check(tree, family)
+#   marriage    check(tree, family, husband, wife); husband/wife may be None
+#   global      check(tree)
+# Checks yield error messages.
+#
+# A rule may also name a vectorized kernel from gedcom_columns. With
+# run_rules(..., vectorized=True) the kernel marks the offending rows of the
+# whole tree at once and the check only runs on those rows; when every rule
+# of a scope has a kernel, only the marked rows are visited at all.
+# gedcom_columns (and NumPy) are imported the first time a kernel runs.
+
+SCOPES = ('individual', 'family', 'marriage', 'global')
+
+
+class Rule:
+    __slots__ = ('story', 'scope', 'fields', 'check', 'title', 'description', 'kernel')
+
+    def __init__(self, story, scope, fields, check, title, description, kernel=None):
+        self.story = story
+        self.scope = scope
+        self.fields = fields
+        self.check = check
+        self.title = title
+        self.description = description
+        self.kernel = kernel
+
+    def __repr__(self):
+        return f"Rule({self.story!r}, {self.scope!r})"
+
+
+RULES = {}
+
+
+def rule(story, scope, fields=(), title='', description='', kernel=None):
+    """Register the decorated function as the check for a user story scope.
+
+    A story may register one check per scope (US01 checks both individuals
+    and families).
+    """
+    if scope not in SCOPES:
+        raise ValueError(f"unknown rule scope {scope!r}")
+    if kernel is not None and scope not in ('individual', 'family'):
+        raise ValueError(f"kernels are not supported for {scope!r} rules")
+
+    def register(check):
+        RULES.setdefault(story, []).append(Rule(story, scope, tuple(fields), check, title, description, kernel))
+        return check
+    return register
+
+
+def select_rules(stories=None):
+    """Registered rules for the given stories (all stories if None), in registry order."""
+    if stories is None:
+        stories = list(RULES)
+    selected = []
+    for story in stories:
+        if story not in RULES:
+            raise KeyError(f"no rule registered for {story}")
+        selected.extend(RULES[story])
+    return selected
+
+
+# Record fields a rule reads besides its declared ones: family and marriage
+# checks walk the family's spouses and children, and the whole tree indexes
+# are built from the same links.
+LINK_FIELDS = ('husband', 'wife', 'children')
+SCOPE_FIELDS = {'individual': (), 'family': LINK_FIELDS, 'marriage': LINK_FIELDS, 'global': ()}
+
+
+def rule_fields(stories=None):
+    """Record fields the given stories read, for load_gedcom(..., fields=...)."""
+    fields = {'id'}
+    for current in select_rules(stories):
+        fields.update(SCOPE_FIELDS[current.scope])
+        for field in current.fields:
+            if field in WHOLE_TREE_FIELDS:
+                fields.update(LINK_FIELDS)
+            else:
+                fields.add(field)
+    return fields
+
+
+def story_info(story):
+    """(title, description) of a registered story."""
+    first = RULES[story][0]
+    return first.title, first.description
+
+
+class Tree:
+    """Parsed individuals and families with the indexes rules look up.
+
+    The family index is built straight away; the relationship, lineage and
+    kinship indexes are built the first time a rule asks for them. today is
+    the run's as-of day ordinal and should be the one the records' ages were
+    computed on. index is a FamilyIndex already built over families.
+    """
+
+    def __init__(self, individuals, families, today=None, index=None):
+        self.individuals = individuals
+        self.families = families
+        self.today = today if today is not None else today_ordinal()
+        self.index = index if index is not None else FamilyIndex(families)
+
+    @cached_property
+    def relationships(self):
+        return Relationships(self.index)
+
+    @cached_property
+    def lineage(self):
+        return LineageIndex(self.index)
+
+    @cached_property
+    def kinship(self):
+        return KinshipIndex(self.index)
+
+    @cached_property
+    def columns(self):
+        import gedcom_columns
+        return gedcom_columns.DateColumns(self.individuals, self.families)
+
+
+def run_rules(tree, stories=None, vectorized=False, stats=None):
+    """Run the enabled rules over tree and return [(story, message)].
+
+    Rules of the same scope share one loop over the records, so the number of
+    passes does not grow with the number of enabled stories. vectorized=True
+    evaluates rules that have a kernel with NumPy first; the errors are the
+    same either way. With a gedcom_stats.RunStats every rule's time, calls,
+    records and errors are added to stats.
+    """
+    selected = select_rules(stories)
+    if stats is not None:
+        selected = timed_rules(tree, selected, stats)
+    masks = kernel_masks(tree, selected) if vectorized else {}
+    errors = individual_errors(tree, scoped(selected, 'individual'), masks)
+
+    family_rules = list(enumerate(scoped(selected, 'family') + scoped(selected, 'marriage')))
+    if family_rules:
+        rows, flags = checked_rows(tree.families, [current for position, current in family_rules], masks)
+        for row, family in rows:
+            found = family_errors(tree, family, family_rules, flags, row)
+            errors.extend((story, message) for position, story, message in found)
+
+    errors.extend(global_errors(tree, scoped(selected, 'global')))
+    return errors
+
+
+def timed_rules(tree, selected, stats):
+    """Copies of the selected rules whose checks record into stats."""
+    timed = []
+    for current in selected:
+        # a global rule looks at the whole tree in its single call
+        records = len(tree.individuals) + len(tree.families) if current.scope == 'global' else 1
+        check = timed_check(current.check, stats.rule(current.story, current.scope), records)
+        timed.append(Rule(current.story, current.scope, current.fields, check, current.title, current.description, current.kernel))
+    return timed
+
+
+def scoped(selected, scope):
+    return [current for current in selected if current.scope == scope]
+
+
+def kernel_masks(tree, selected):
+    """{rule: bool array of offending rows} for the selected rules with a kernel."""
+    import gedcom_columns
+    return {current: getattr(gedcom_columns, current.kernel)(tree.columns, tree) for current in selected if current.kernel is not None}
+
+
+def checked_rows(records, rules, masks):
+    """(row, record) pairs to run rules on, and {rule: row flags} of the rules with a mask.
+
+    When every rule has a kernel mask only the rows one of them flags are
+    visited; otherwise every row is, and the flags skip the masked rules.
+    """
+    flags = {current: masks[current].tolist() for current in rules if current in masks}
+    if not rules or len(flags) < len(rules):
+        return enumerate(records.values()), flags
+    flagged = functools.reduce(operator.or_, (masks[current] for current in rules)).nonzero()[0].tolist()
+    listed = list(records.values())
+    return ((row, listed[row]) for row in flagged), flags
+
+
+def individual_errors(tree, rules, masks=None):
+    errors = []
+    rows, flags = checked_rows(tree.individuals, rules, masks or {})
+    for row, individual in rows:
+        for current in rules:
+            if current in flags and not flags[current][row]:
+                continue
+            for message in current.check(tree, individual):
+                errors.append((current.story, message))
+    return errors
+
+
+def family_errors(tree, family, positioned_rules, masks=None, row=None):
+    """[(position, story, message)] of the family and marriage rules on one family.
+
+    positioned_rules is a list of (position, rule) with family rules before
+    marriage rules; the position lets results computed in different
+    processes be merged back into serial order. masks maps rules to row
+    flags (see checked_rows); rules flagged False at this family's row are
+    skipped.
+    """
+    masks = masks or {}
+    errors = []
+    husband = wife = None
+    for position, current in positioned_rules:
+        if current in masks and not masks[current][row]:
+            continue
+        if current.scope == 'family':
+            found = current.check(tree, family)
+        else:
+            if husband is None and wife is None:
+                husband = tree.individuals.get(family.husband)
+                wife = tree.individuals.get(family.wife)
+            found = current.check(tree, family, husband, wife)
+        for message in found:
+            errors.append((position, current.story, message))
+    return errors
+
+
+def global_errors(tree, rules):
+    errors = []
+    for current in rules:
+        for message in current.check(tree):
+            errors.append((current.story, message))
+    return errors
+
+
+# Rules reading these fields need indexes over the whole tree, so they cannot
+# run on a shard of families and stay in the parent process.
+WHOLE_TREE_FIELDS = {'relationships', 'lineage', 'kinship'}
+
+
+# Below this many families the pool costs more than it saves.
+PARALLEL_MIN_FAMILIES = 50000
+
+# The tree, its families in order and the kernel row flags, set in the
+# parent just before the pool forks so the workers inherit them instead of
+# receiving them pickled.
+SHARED = None
+
+
+def run_rules_parallel(tree, stories=None, workers=None, shard_size=10000, min_families=PARALLEL_MIN_FAMILIES,
+                       vectorized=False):
+    """run_rules with the family and marriage rules spread over a process pool.
+
+    Workers are forked and read the tree the parent holds; each is sent only
+    the rules and the range of family positions of its shard. Results are
+    merged per family in rule order, so the output is identical to
+    run_rules. Trees with fewer than min_families families, and platforms
+    that cannot fork, are checked serially with run_rules. vectorized is as
+    for run_rules; the kernels run in the parent and the workers inherit
+    their row flags. Rules run in workers cannot be timed, so there is no
+    stats argument.
+    """
+    if len(tree.families) < min_families or 'fork' not in multiprocessing.get_all_start_methods():
+        return run_rules(tree, stories, vectorized)
+
+    selected = select_rules(stories)
+    masks = kernel_masks(tree, selected) if vectorized else {}
+    errors = individual_errors(tree, scoped(selected, 'individual'), masks)
+
+    family_rules = list(enumerate(scoped(selected, 'family') + scoped(selected, 'marriage')))
+    local_rules = [(position, current) for position, current in family_rules if not WHOLE_TREE_FIELDS & set(current.fields)]
+    tree_rules = [(position, current) for position, current in family_rules if WHOLE_TREE_FIELDS & set(current.fields)]
+
+    families = list(tree.families.values())
+    flags = {current: masks[current].tolist() for position, current in family_rules if current in masks}
+    if local_rules:
+        global SHARED
+        SHARED = tree, families, flags
+        rule_keys = [(position, current.story, current.scope) for position, current in local_rules]
+        shards = ((rule_keys, start, start + shard_size) for start in range(0, len(families), shard_size))
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                local_errors = [found for shard_errors in pool.map(check_family_shard, shards) for found in shard_errors]
+        finally:
+            SHARED = None
+    else:
+        local_errors = [[] for family in families]
+
+    for row, (family, found) in enumerate(zip(families, local_errors)):
+        if tree_rules:
+            # stable sort keeps each rule's messages in the order it yielded them
+            found = sorted(found + family_errors(tree, family, tree_rules, flags, row), key=lambda error: error[0])
+        errors.extend((story, message) for position, story, message in found)
+
+    errors.extend(global_errors(tree, scoped(selected, 'global')))
+    return errors
+
+
+def check_family_shard(job):
+    """Worker entry point: [[(position, story, message)] per family] for one shard."""
+    rule_keys, start, stop = job
+    tree, families, flags = SHARED
+    positioned_rules = []
+    for position, story, scope in rule_keys:
+        for current in RULES[story]:
+            if current.scope == scope:
+                positioned_rules.append((position, current))
+    return [family_errors(tree, families[row], positioned_rules, flags, row) for row in range(start, min(stop, len(families)))]
+
+
+def group_errors(errors, stories=None):
+    """{story: [messages]} with every selected story present, in registry order."""
+    grouped = {selected.story: [] for selected in select_rules(stories)}
+    for story, message in errors:
+        grouped.setdefault(story, []).append(message)
+    return grouped
+
+
+def spouses_of(husband, wife):
+    return [spouse for spouse in (husband, wife) if spouse is not None]
+
+def birth_order(tree, child_ids):
+    """Children with a known birth date as (birth, id), oldest first."""
+    return sorted(
+        (tree.individuals[child_id].birth, child_id)
+        for child_id in child_ids
+        if child_id in tree.individuals and tree.individuals[child_id].birth is not None
+    )
+
+
+@rule('US01', 'individual', fields=('birth', 'death', 'birth_date', 'death_date'),
+      kernel='individual_dates_after_today',
+      title="User Story: 01 - Dates before current date",
+      description="These are the details for either of the birthdates, deathdates, marriagedates, and divorcedates that have occurred after the current date.")
+def dates_before_current_date(tree, individual):
+    if individual.birth is not None and individual.birth > tree.today:
+        yield f"ERROR: INDIVIDUAL: US01: {individual.id}: Birthday {individual.birth_date} occurs in the future"
+    if individual.death is not None and individual.death > tree.today:
+        yield f"ERROR: INDIVIDUAL: US01: {individual.id}: Death {individual.death_date} occurs in the future"
+
+@rule('US01', 'family', fields=('married', 'divorced', 'marriage_date', 'divorce_date'),
+      kernel='family_dates_after_today')
+def family_dates_before_current_date(tree, family):
+    if family.married is not None and family.married > tree.today:
+        yield f"ERROR: FAMILY: US01: {family.id}: Marriage date {family.marriage_date} occurs in the future"
+    if family.divorced is not None and family.divorced > tree.today:
+        yield f"ERROR: FAMILY: US01: {family.id}: Divorce date {family.divorce_date} occurs in the future"
+
+
+@rule('US02', 'marriage', fields=('birth', 'birth_date', 'married', 'marriage_date'),
+      title="User Story: 02 - Birth before marriage",
+      description="These are the details for individuals born after their own marriage.")
+def birth_before_marriage(tree, family, husband, wife):
+    if family.married is None:
+        return
+    for spouse in spouses_of(husband, wife):
+        if spouse.birth is not None and family.married < spouse.birth:
+            yield f"ERROR: INDIVIDUAL: US02: {spouse.id}: Birth date {spouse.birth_date} occurs after marriage date {family.marriage_date}"
+
+
+@rule('US03', 'individual', fields=('birth', 'death', 'birth_date', 'death_date'),
+      kernel='death_before_birth',
+      title="User Story: 03 - Birth before death",
+      description="These are the details for individuals whose death date is before their birth date.")
+def birth_before_death(tree, individual):
+    if individual.birth is not None and individual.death is not None and individual.death < individual.birth:
+        yield f"ERROR: INDIVIDUAL: US03: {individual.id}: Birth date {individual.birth_date} occurs after death date {individual.death_date}"
+
+
+@rule('US04', 'marriage', fields=('married', 'divorced', 'marriage_date', 'divorce_date', 'name'),
+      title="User Story: 04 - Marriage before divorce",
+      description="These are the details for families divorced before they married.")
+def marriage_before_divorce(tree, family, husband, wife):
+    if family.married is not None and family.divorced is not None and family.married > family.divorced:
+        husband_name = husband.name if husband else ""
+        wife_name = wife.name if wife else ""
+        yield f"ERROR: FAMILY: US04: {family.id}: {family.husband} ({husband_name}) and {family.wife} ({wife_name}) Married {family.marriage_date} after divorce on {family.divorce_date}"
+
+
+@rule('US05', 'marriage', fields=('death', 'death_date', 'married', 'marriage_date'),
+      title="User Story: 05 - Marriage before death",
+      description="These are the details for individuals who died before their marriage.")
+def marriage_before_death(tree, family, husband, wife):
+    if family.married is None:
+        return
+    for spouse in spouses_of(husband, wife):
+        if spouse.death is not None and spouse.death < family.married:
+            yield f"ERROR: INDIVIDUAL: US05: {spouse.id}: Died {spouse.death_date} before marriage {family.marriage_date}"
+
+
+@rule('US06', 'marriage', fields=('death', 'death_date', 'divorced', 'divorce_date'),
+      title="User Story 06: Divorce before death",
+      description="These are the details for divorce dates that have occurred after the death date of an individual.")
+def divorce_before_death(tree, family, husband, wife):
+    if family.divorced is None:
+        return
+    for spouse in spouses_of(husband, wife):
+        if spouse.death is not None and spouse.death < family.divorced:
+            yield f"ERROR: FAMILY: US06: {family.id}: Divorced {family.divorce_date} after the death of {spouse.id} on {spouse.death_date}"
+
+
+@rule('US07', 'individual', fields=('age', 'birth_date', 'death_date'),
+      kernel='older_than_150',
+      title="User Story: 07 - Death should be less than 150 years after birth for dead people, and current date should be less than 150 years after birth for all living people",
+      description="These are the details for dead people who had age more than 150 years or alive people with current age more than 150 years.")
+def less_than_150_years_old(tree, individual):
+    if individual.age is not None and individual.age > 150:
+        yield f"ERROR: INDIVIDUAL: US07: {individual.id}: More than 150 years old - Birth {individual.birth_date}, Death {individual.death_date}, Age {individual.age}"
+
+
+@rule('US08', 'family', fields=('birth', 'birth_date', 'married', 'divorced', 'marriage_date', 'divorce_date'),
+      title="User Story: 08 - Birth before marriage of parents",
+      description="These are the details for children born before their parents married or more than 9 months after their divorce.")
+def birth_before_marriage_of_parents(tree, family):
+    for birth, child in birth_order(tree, family.children):
+        birth_date = tree.individuals[child].birth_date
+        if family.married is not None and birth < family.married:
+            yield f"ERROR: FAMILY: US08: {child}: Born on {birth_date} before the marriage of their parents on {family.marriage_date}"
+        if family.divorced is not None and months_between(family.divorced, birth) > 9:
+            yield f"ERROR: FAMILY: US08: {child}: Born on {birth_date} more than 9 months after the divorce of their parents on {family.divorce_date}"
+
+
+@rule('US09', 'marriage', fields=('birth', 'birth_date', 'death', 'death_date'),
+      title="User Story: 09 - Birth before death of parents",
+      description="These are the details for children born after their mother's death or more than 9 months after their father's death.")
+def birth_before_death_of_parents(tree, family, husband, wife):
+    for birth, child in birth_order(tree, family.children):
+        birth_date = tree.individuals[child].birth_date
+        if wife and wife.death is not None and wife.death < birth:
+            yield f"ERROR: FAMILY: US09: {child}: Born on {birth_date} after the death of their mom on {wife.death_date}"
+        if husband and husband.death is not None and months_between(husband.death, birth) > 9:
+            yield f"ERROR: FAMILY: US09: {child}: Born on {birth_date} more than 9 months after the death of their dad on {husband.death_date}"
+
+
+@rule('US10', 'marriage', fields=('birth', 'married'),
+      title="User Story: 10 - Marriage should be at least 14 years after birth of both spouses (parents must be at least 14 years old)",
+      description="These are the details for who were married below 14 years.")
+def marriage_after_14(tree, family, husband, wife):
+    if family.married is None:
+        return
+    for spouse in (wife, husband):
+        if spouse is not None and spouse.birth is not None:
+            age_at_marriage = years_between(spouse.birth, family.married)
+            if age_at_marriage < 14:
+                yield f"ERROR: FAMILY: US10: {family.id}: {spouse.id} married at age {age_at_marriage}, before turning 14"
+
+
+@rule('US13', 'family', fields=('birth',),
+      title="User Story: 13 - Birth dates of siblings should be more than 8 months apart or less than 2 days apart (twins may be born one day apart, e.g. 11:59 PM and 12:02 AM the following calendar day)",
+      description="These are the details of siblings who have less difference span greater that 2 days and less than 8 months")
+def sibling_spacing(tree, family):
+    births = birth_order(tree, family.children)
+    for (first_birth, first_id), (next_birth, next_id) in zip(births, births[1:]):
+        days = next_birth - first_birth
+        if not (0 <= days <= 1 or days >= 243):  # 243 days is roughly 8 months
+            yield f"ERROR: FAMILY: US13: {family.id}: {first_id} and {next_id} were born {days} days apart"
+
+
+@rule('US16', 'family', fields=('sex', 'surname', 'given'),
+      title="User Story: 16 - All male members of a family should have the same last name",
+      description="Errors of All male members of a family who don't have the same last name")
+def male_last_names(tree, family):
+    husband = tree.individuals.get(family.husband)
+    if husband is None:
+        return
+    for child_id in family.children:
+        child = tree.individuals.get(child_id)
+        if child and child.sex == 'M' and child.surname != husband.surname:
+            yield f"ERROR: FAMILY: US16: {family.id}: {child.id} ({child.given}) has last name {child.surname}, not {husband.surname}"
+
+
+@rule('US17', 'marriage', fields=('lineage',),
+      title="User Story: 17 - No marriages to descendants",
+      description="These are the details for individuals married to one of their descendants.")
+def married_to_descendants(tree, family, husband, wife):
+    if not family.husband or not family.wife:
+        return
+    if tree.lineage.is_descendant(family.husband, family.wife):
+        yield f"ERROR: FAMILY: US17: {family.husband} is married to their female ancestor, {family.wife}"
+    if tree.lineage.is_descendant(family.wife, family.husband):
+        yield f"ERROR: FAMILY: US17: {family.wife} is married to their male ancestor, {family.husband}"
+
+
+@rule('US18', 'individual', fields=('relationships',),
+      title="User Story: 18 - Siblings should not marry",
+      description="These are the details for individuals married to one of their siblings.")
+def married_to_siblings(tree, individual):
+    for spouse_id in tree.relationships.spouses(individual.id):
+        if tree.relationships.are_siblings(individual.id, spouse_id):
+            yield "ERROR: INDIVIDUAL: US018: " + spouse_id + " married to their sibling"
+
+
+@rule('US19', 'marriage', fields=('kinship',),
+      title="User Story: 19 - First cousins should not marry",
+      description="These are the details for first cousins married to each other.")
+def married_to_first_cousins(tree, family, husband, wife):
+    if family.husband and family.wife and tree.kinship.are_first_cousins(family.husband, family.wife):
+        yield f"ERROR: FAMILY: US19: {family.id}: {family.husband} and {family.wife} are first cousins"
+
+
+@rule('US20', 'marriage', fields=('kinship',),
+      title="User Story: 20 - Aunts and uncles should not marry their nieces or nephews",
+      description="These are the details for aunts and uncles married to a niece or nephew.")
+def married_to_nieces_and_nephews(tree, family, husband, wife):
+    if not family.husband or not family.wife:
+        return
+    for elder_id, younger_id in [(family.husband, family.wife), (family.wife, family.husband)]:
+        if tree.kinship.is_aunt_or_uncle(elder_id, younger_id):
+            yield f"ERROR: FAMILY: US20: {family.id}: {elder_id} is married to their niece or nephew {younger_id}"
+
+
+@rule('US21', 'marriage', fields=('sex',),
+      title="User Story: 21 - Correct gender for role",
+      description="These are the details for families whose husband is female or wife is male.")
+def correct_gender_for_role(tree, family, husband, wife):
+    if (husband and husband.sex == "F") or (wife and wife.sex == "M"):
+        yield f"ERROR: FAMILY: US21: {family.id}: {family.husband} has the incorrect role in the family."
+
+
+def name_birth_groups(individuals):
+    """{(name, birth date): [IDs]} for individuals with a birth date."""
+    groups = {}
+    for individual_id, individual in individuals.items():
+        if individual.birth_date:
+            groups.setdefault((individual.name, individual.birth_date), []).append(individual_id)
+    return groups
+
+@rule('US23', 'global', fields=('name', 'given', 'surname', 'birth', 'birth_date'),
+      title="User Story: 23 - Unique name and birth date",
+      description="These are the details for individuals sharing both name and birth date, or with nearly the same name and birth date.")
+def unique_name_and_birth_date(tree):
+    for (name, birth_date), ids in name_birth_groups(tree.individuals).items():
+        for position, individual_id in enumerate(ids):
+            for same_name_birth_id in ids[:position]:
+                yield f"ERROR: INDIVIDUAL: US23: {individual_id} and {same_name_birth_id}: Have the same name and birth date {name} - {birth_date}"
+
+    # near matches such as a misspelt surname, exact matches are reported above
+    for score, first_id, second_id in find_duplicates(tree.individuals):
+        first = tree.individuals[first_id]
+        second = tree.individuals[second_id]
+        if (first.name, first.birth_date) != (second.name, second.birth_date):
+            yield f"ERROR: INDIVIDUAL: US23: {second_id} and {first_id}: Possible duplicates {second.name} - {second.birth_date} and {first.name} - {first.birth_date} (score {score:.2f})"
@@ -0,0 +1,228 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+from gedcom_model import iso_date, today_ordinal, as_of_ordinal
+from gedcom_parser import load_gedcom
+from gedcom_rules import RULES, WHOLE_TREE_FIELDS, Tree, run_rules
+from gedcom_stats import Entry
+from m2b3_gedcom_code import LIVING_MARRIED_FIELDS, LIVING_SINGLES_FIELDS, living_married_rows, living_singles_over_30_rows
+
+# Local HTTP/JSON validation service.
+#
+#   python gedcom_service.py My-Family.ged --port 8765
+#
+# The file is parsed once into a Snapshot with every index built up front,
+# so request threads only ever read it. POST /reload parses the file again
+# and swaps the new snapshot in; requests already running finish on the one
+# they started with.
+#
+#   GET  /validate?stories=US01,US07   errors of the stories (default: all)
+#   GET  /individuals                  every individual
+#   GET  /individuals/<ID>             one individual, ID with or without @s
+#   GET  /families
+#   GET  /families/<ID>
+#   GET  /living-married               living married people (US30)
+#   GET  /singles-over-30              living people over 30 never married (US31)
+#   GET  /stats                        calls and time per endpoint
+#   POST /reload                       read the file again
+#
+# Every response has the time spent on it in an X-Elapsed-Ms header, and
+# the same time is added to the endpoint's entry in /stats.
+
+DATE_FIELDS = {'birth', 'death', 'married', 'divorced'}
+
+# validation results remembered per snapshot, the oldest forgotten first
+MAX_VALIDATIONS = 32
+
+
+def record_json(record):
+    """The record's fields with day ordinals as ISO dates."""
+    return {field: iso_date(getattr(record, field)) if field in DATE_FIELDS else getattr(record, field)
+            for field in type(record).__slots__}
+
+
+def view_json(field_names, rows):
+    return [dict(zip(field_names, row)) for row in rows]
+
+
+def canonical_stories(stories):
+    """Registered stories among stories, without repeats and in registry order."""
+    requested = set(stories)
+    return [story for story in RULES if story in requested]
+
+
+def record_id(text):
+    """A record ID from a URL, where the @s may be left out."""
+    text = unquote(text)
+    return text if text.startswith('@') else f"@{text}@"
+
+
+class Snapshot:
+    """A parsed GEDCOM file with its indexes, not changed once built.
+
+    Validation results are remembered per set of stories, for the last
+    MAX_VALIDATIONS sets asked for. The kinship index
+    still fills in its ancestor maps as it is queried; two threads filling
+    in the same entry store the same value.
+    """
+
+    def __init__(self, path, as_of=None):
+        as_of = as_of if as_of is not None else today_ordinal()
+        self.tree = Tree(*load_gedcom(path, as_of), as_of)
+        for name in WHOLE_TREE_FIELDS:
+            getattr(self.tree, name)
+        self.validations = {}
+        self.lock = threading.Lock()
+
+    def validate(self, stories):
+        key = tuple(canonical_stories(stories))
+        with self.lock:
+            errors = self.validations.get(key)
+        if errors is None:
+            errors = run_rules(self.tree, key)
+            with self.lock:
+                if key not in self.validations and len(self.validations) >= MAX_VALIDATIONS:
+                    del self.validations[next(iter(self.validations))]
+                self.validations[key] = errors
+        return errors
+
+
+class ValidationService:
+    """Answers requests from the current snapshot of one GEDCOM file."""
+
+    def __init__(self, path, as_of=None):
+        self.path = path
+        self.as_of = as_of
+        self.snapshot = Snapshot(path, as_of)
+        self.latency = {}
+        self.lock = threading.Lock()
+
+    def handle(self, method, path, query):
+        """(status, endpoint, payload) of one request.
+
+        endpoint names the route with IDs left out, for the latency stats.
+        """
+        # one snapshot for the whole request, even if a reload swaps it
+        snapshot = self.snapshot
+        tree = snapshot.tree
+        parts = [part for part in path.split('/') if part]
+        route = parts[0] if parts else ''
+
+        if method == 'POST':
+            if parts == ['reload']:
+                self.snapshot = Snapshot(self.path, self.as_of)
+                return 200, 'POST /reload', self.summary(self.snapshot)
+            return 404, 'POST', {'error': f"no such endpoint {path}"}
+
+        if len(parts) == 1 and route == 'validate':
+            stories = [story for value in query.get('stories', []) for story in value.split(',') if story]
+            unknown = [story for story in stories if story not in RULES]
+            if unknown:
+                return 400, 'GET /validate', {'error': f"no rule registered for {', '.join(unknown)}"}
+            stories = canonical_stories(stories) if stories else list(RULES)
+            errors = snapshot.validate(stories)
+            counts = dict.fromkeys(stories, 0)
+            for story, message in errors:
+                counts[story] += 1
+            return 200, 'GET /validate', {
+                'counts': counts,
+                'errors': [{'story': story, 'message': message} for story, message in errors],
+            }
+
+        if route in ('individuals', 'families') and len(parts) <= 2:
+            records = tree.individuals if route == 'individuals' else tree.families
+            if len(parts) == 1:
+                return 200, f'GET /{route}', {route: [record_json(record) for record in records.values()]}
+            record = records.get(record_id(parts[1]))
+            if record is None:
+                return 404, f'GET /{route}/<id>', {'error': f"no record {parts[1]}"}
+            return 200, f'GET /{route}/<id>', record_json(record)
+
+        if parts == ['living-married']:
+            rows = living_married_rows(tree.individuals, tree.families, tree.index)
+            return 200, 'GET /living-married', {'living_married': view_json(LIVING_MARRIED_FIELDS, rows)}
+
+        if parts == ['singles-over-30']:
+            rows = living_singles_over_30_rows(tree.individuals, tree.index)
+            return 200, 'GET /singles-over-30', {'singles_over_30': view_json(LIVING_SINGLES_FIELDS, rows)}
+
+        if parts == ['stats']:
+            with self.lock:
+                endpoints = [entry.as_dict() for entry in self.latency.values()]
+            return 200, 'GET /stats', {**self.summary(snapshot), 'endpoints': endpoints}
+
+        return 404, 'GET', {'error': f"no such endpoint {path}"}
+
+    def summary(self, snapshot):
+        return {'file': self.path, 'individuals': len(snapshot.tree.individuals), 'families': len(snapshot.tree.families)}
+
+    def record(self, endpoint, seconds):
+        with self.lock:
+            entry = self.latency.setdefault(endpoint, Entry(endpoint))
+            entry.calls += 1
+            entry.seconds += seconds
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.respond('GET')
+
+    def do_POST(self):
+        self.respond('POST')
+
+    def respond(self, method):
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        service = self.server.service
+        try:
+            status, endpoint, payload = service.handle(method, url.path, parse_qs(url.query))
+        except Exception as error:
+            status, endpoint, payload = 500, method, {'error': f"{type(error).__name__}: {error}"}
+        body = json.dumps(payload).encode()
+        self.elapsed = time.perf_counter() - started
+        service.record(endpoint, self.elapsed)
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Elapsed-Ms', f"{self.elapsed * 1000:.3f}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_request(self, code='-', size='-'):
+        self.log_message('"%s" %s %.3f ms', self.requestline, code, self.elapsed * 1000)
+
+
+def make_server(service, host='127.0.0.1', port=8765):
+    """A threading HTTP server for service; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve validation results of a GEDCOM file over HTTP")
+    parser.add_argument("gedcom_file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--as-of", type=as_of_ordinal, default=None, metavar="YYYY-MM-DD",
+                        help="day ages are taken on (default: the day the file is loaded)")
+    args = parser.parse_args()
+
+    server = make_server(ValidationService(args.gedcom_file, args.as_of), args.host, args.port)
+    print(f"Serving {args.gedcom_file} on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
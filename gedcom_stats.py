@@ -0,0 +1,96 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Run instrumentation.
+#
+# A RunStats collects one entry per pipeline stage (parse, rules, report,
+# ...) and one per rule. Stage entries are timed as a whole and, when memory
+# tracing is on, get the tracemalloc peak reached during the stage. Rules
+# run interleaved in one fused loop, so a rule entry adds up the time of
+# every call to its check instead; their memory is part of the rules stage.
+#
+# Nothing is recorded unless a RunStats is passed in, so normal runs pay no
+# timing overhead.
+
+
+class Entry:
+    __slots__ = ('name', 'seconds', 'calls', 'records', 'errors', 'peak_bytes')
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.calls = 0
+        self.records = 0
+        self.errors = 0
+        self.peak_bytes = None
+
+    def as_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class RunStats:
+    """Stage and rule measurements of one run."""
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stages = {}
+        self.rules = {}
+
+    @contextmanager
+    def stage(self, name, records=0):
+        """Time the body as stage name; the body may add to the entry's counts."""
+        entry = self.stages.setdefault(name, Entry(name))
+        entry.calls += 1
+        entry.records += records
+        started_tracing = False
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry.seconds += time.perf_counter() - started
+            if self.memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                entry.peak_bytes = max(entry.peak_bytes or 0, peak)
+                if started_tracing:
+                    tracemalloc.stop()
+
+    def rule(self, story, scope):
+        name = f"{story} {scope}"
+        return self.rules.setdefault(name, Entry(name))
+
+    def as_dict(self):
+        return {
+            'stages': [entry.as_dict() for entry in self.stages.values()],
+            'rules': [entry.as_dict() for entry in self.rules.values()],
+        }
+
+    def write_json(self, path):
+        with open(path, 'w') as output:
+            json.dump(self.as_dict(), output, indent=2)
+
+
+def stage(stats, name, records=0):
+    """stats.stage(name, records), or a throwaway entry when stats is None."""
+    if stats is None:
+        return nullcontext(Entry(name))
+    return stats.stage(name, records)
+
+
+def timed_check(check, entry, records=1):
+    """check wrapped to add its time, calls, records and errors to entry."""
+    def timed(*args):
+        started = time.perf_counter()
+        messages = list(check(*args))
+        entry.seconds += time.perf_counter() - started
+        entry.calls += 1
+        entry.records += records
+        entry.errors += len(messages)
+        return messages
+    return timed
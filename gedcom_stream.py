@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import sys
+from gedcom_model import Individual, Family, today_ordinal, as_of_ordinal
+from gedcom_parser import RecordBuilder
+from gedcom_reader import ENCODING, LineSplitter
+from gedcom_rules import RULES, WHOLE_TREE_FIELDS, Tree, select_rules, scoped, family_errors, global_errors
+
+# Streaming validation of a GEDCOM upload read from an asyncio byte stream.
+#
+#   python gedcom_stream.py < My-Family.ged
+#   python gedcom_stream.py --listen 127.0.0.1:8766
+#
+# Records are built as their lines arrive, and every error is reported as
+# soon as it can be decided:
+#
+#   on arrival           US22 (ID not unique), individual rules and family
+#                        rules reading only the family itself (US01, US03,
+#                        US07, ...)
+#   references resolved  other family and marriage rules, once every
+#                        individual the family names has arrived
+#   end of stream        rules over the whole tree (US17 - US20, US23) and
+#                        families still naming an individual never sent
+#
+# The stream ends at EOF or at the TRLR record, so a client can keep its
+# connection open for the answer.
+#
+# A repeated ID is checked each time it arrives, where load_gedcom only
+# keeps the last record of it, and families are checked against the records
+# of their members present when their references resolved.
+
+CHUNK_SIZE = 1 << 16
+
+
+def whole_tree(current):
+    return current.scope == 'global' or bool(WHOLE_TREE_FIELDS.intersection(current.fields))
+
+
+def reads_own_record(current):
+    """True if the rule's check only reads the record it is called on."""
+    if current.scope == 'individual':
+        return True
+    return current.scope == 'family' and set(current.fields) <= set(Family.__slots__)
+
+
+def positioned(rules):
+    """Family rules before marriage rules, numbered as family_errors wants them."""
+    return list(enumerate(scoped(rules, 'family') + scoped(rules, 'marriage')))
+
+
+class StreamValidator:
+    """Checks records one at a time, in the order they are read.
+
+    stories defaults to every registered story and US22. add() returns the
+    errors decided by a new record; finish() returns the rest once the last
+    record has been added. in_rule_order() gives every error decided so far
+    in the order run_rules reports them (US22 errors first, in the order
+    they were read).
+    """
+
+    def __init__(self, stories=None, as_of=None):
+        stories = [*RULES, 'US22'] if stories is None else list(stories)
+        self.unique_ids = 'US22' in stories
+        selected = select_rules([story for story in stories if story != 'US22'])
+        # positions of the rules in run_rules' loops, which errors are sorted on
+        self.individual_positions = {current: position for position, current in enumerate(scoped(selected, 'individual'))}
+        self.global_positions = {current: position for position, current in enumerate(scoped(selected, 'global'))}
+        family_rules = positioned(selected)
+
+        local = [current for current in selected if not whole_tree(current)]
+        self.own_individual_rules = [current for current in local if current.scope == 'individual']
+        self.own_family_rules = [(position, current) for position, current in family_rules
+                                 if not whole_tree(current) and reads_own_record(current)]
+        self.linked_rules = [(position, current) for position, current in family_rules
+                             if not whole_tree(current) and not reads_own_record(current)]
+        self.whole_tree_rules = [current for current in selected if whole_tree(current)]
+        self.whole_tree_family_rules = [(position, current) for position, current in family_rules if whole_tree(current)]
+
+        self.individuals = {}
+        self.families = {}
+        # record ID -> row of the record in run_rules' loop over its dict
+        self.individual_rows = {}
+        self.family_rows = {}
+        # checks before finish() only read the records and today; the indexes
+        # are built over the whole tree there
+        self.tree = Tree(self.individuals, self.families, as_of if as_of is not None else today_ordinal())
+        # individual ID -> families waiting for it, family -> IDs it still waits for
+        self.waiting = {}
+        self.missing = {}
+        # (sort key, story, message) of every error decided; see in_rule_order
+        self.decided = []
+
+    def add(self, record):
+        if type(record) is Individual:
+            return self.add_individual(record)
+        return self.add_family(record)
+
+    def add_individual(self, individual):
+        errors = []
+        if self.unique_ids and individual.id in self.individuals:
+            errors.append(self.keep((-1,), 'US22', f"ERROR: INDIVIDUAL: US22: {individual.id}: Individual ID is not unique"))
+        self.individual_rows.setdefault(individual.id, len(self.individual_rows))
+        self.individuals[individual.id] = individual
+        errors.extend(self.check_individual(individual, self.own_individual_rules))
+
+        for family in self.waiting.pop(individual.id, ()):
+            self.missing[family] -= 1
+            if not self.missing[family]:
+                del self.missing[family]
+                errors.extend(self.check_family(family, self.linked_rules))
+        return errors
+
+    def add_family(self, family):
+        errors = []
+        if self.unique_ids and family.id in self.families:
+            errors.append(self.keep((-1,), 'US22', f"ERROR: FAMILY: US22: {family.id}: Family ID is not unique"))
+        self.family_rows.setdefault(family.id, len(self.family_rows))
+        self.families[family.id] = family
+        errors.extend(self.check_family(family, self.own_family_rules))
+
+        members = {member for member in (family.husband, family.wife, *family.children)
+                   if member and member not in self.individuals}
+        if not members:
+            errors.extend(self.check_family(family, self.linked_rules))
+        elif self.linked_rules:
+            self.missing[family] = len(members)
+            for member in members:
+                self.waiting.setdefault(member, []).append(family)
+        return errors
+
+    def keep(self, key, story, message):
+        self.decided.append((key, story, message))
+        return story, message
+
+    def check_individual(self, individual, rules, tree=None):
+        row = self.individual_rows[individual.id]
+        return [self.keep((0, row, self.individual_positions[current]), current.story, message)
+                for current in rules for message in current.check(tree or self.tree, individual)]
+
+    def check_family(self, family, rules, tree=None):
+        row = self.family_rows[family.id]
+        return [self.keep((1, row, position), story, message)
+                for position, story, message in family_errors(tree or self.tree, family, rules)]
+
+    def finish(self):
+        tree = Tree(self.individuals, self.families, self.tree.today)
+        errors = []
+        for family in self.missing:
+            errors.extend(self.check_family(family, self.linked_rules, tree))
+        self.waiting.clear()
+        self.missing.clear()
+
+        individual_rules = scoped(self.whole_tree_rules, 'individual')
+        if individual_rules:
+            for individual in tree.individuals.values():
+                errors.extend(self.check_individual(individual, individual_rules, tree))
+        if self.whole_tree_family_rules:
+            for family in tree.families.values():
+                errors.extend(self.check_family(family, self.whole_tree_family_rules, tree))
+        for current in scoped(self.whole_tree_rules, 'global'):
+            errors.extend(self.keep((2, self.global_positions[current]), story, message)
+                          for story, message in global_errors(tree, [current]))
+        self.tree = tree
+        return errors
+
+    def in_rule_order(self):
+        """[(story, message)] decided so far, in run_rules order."""
+        # the sort is stable, so one rule's messages on one record keep their order
+        return [(story, message) for key, story, message in sorted(self.decided, key=lambda error: error[0])]
+
+
+async def iter_chunks(stream):
+    """Yield the byte chunks of an asyncio.StreamReader or of an async iterable of bytes."""
+    if hasattr(stream, 'read'):
+        while True:
+            chunk = await stream.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        async for chunk in stream:
+            yield chunk
+
+
+async def stream_fields(stream):
+    """Yield the split fields of every line of stream as soon as the line is complete."""
+    splitter = LineSplitter()
+    async for chunk in iter_chunks(stream):
+        for fields in splitter.feed(chunk):
+            yield fields
+    for fields in splitter.close():
+        yield fields
+
+
+async def stream_records(stream, as_of=None):
+    """Yield Individual and Family records as they complete, up to EOF or TRLR."""
+    builder = RecordBuilder(as_of)
+    async for level, xref, tag, value in stream_fields(stream):
+        record = builder.feed(level, xref, tag, value)
+        if record is not None:
+            yield record
+        if level == 0 and tag == b'TRLR':
+            return
+    record = builder.close()
+    if record is not None:
+        yield record
+
+
+async def stream_errors(stream, stories=None, as_of=None):
+    """Yield (story, message) for the upload on stream as each error is decided."""
+    validator = StreamValidator(stories, as_of)
+    async for record in stream_records(stream, validator.tree.today):
+        for error in validator.add(record):
+            yield error
+    for error in validator.finish():
+        yield error
+
+
+def upload_handler(stories=None, as_of=None):
+    """asyncio.start_server callback writing back the error messages of each upload, one per line."""
+    async def upload(reader, writer):
+        try:
+            async for story, message in stream_errors(reader, stories, as_of):
+                writer.write(message.encode(ENCODING) + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+            await writer.wait_closed()
+    return upload
+
+
+async def read_stdin():
+    # regular files cannot be watched by the event loop, so stdin is read in a thread
+    while True:
+        chunk = await asyncio.to_thread(sys.stdin.buffer.read1, CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def print_errors(stream, stories=None, as_of=None):
+    async for story, message in stream_errors(stream, stories, as_of):
+        print(message, flush=True)
+
+
+async def serve(host, port, stories=None, as_of=None):
+    server = await asyncio.start_server(upload_handler(stories, as_of), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate a GEDCOM upload as it streams in, printing errors as they are found")
+    parser.add_argument("--listen", metavar="HOST:PORT",
+                        help="accept uploads on a TCP socket instead of reading standard input")
+    parser.add_argument("--stories", default=None, metavar="US01,US07,...",
+                        help="user stories to check (default: all of them)")
+    parser.add_argument("--as-of", type=as_of_ordinal, default=None, metavar="YYYY-MM-DD",
+                        help="day ages and future dates are measured against (default: today)")
+    args = parser.parse_args()
+    stories = args.stories.split(',') if args.stories else None
+
+    try:
+        if args.listen:
+            host, port = args.listen.rsplit(':', 1)
+            asyncio.run(serve(host, int(port), stories, args.as_of))
+        else:
+            asyncio.run(print_errors(read_stdin(), stories, args.as_of))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
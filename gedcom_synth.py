@@ -0,0 +1,459 @@
+import argparse
+import random
+from datetime import date
+from gedcom_model import Individual, Family
+
+# Seeded generator of synthetic family trees for tests and benchmarks.
+#
+# Trees grow from founder couples one family at a time: every family gets a
+# few children, and children of marrying age marry a spouse from outside the
+# tree, starting a family of the next generation. Some marriages end in
+# divorce and one partner remarries. New founder couples are added whenever
+# the generation limit stops the tree growing before it has enough people.
+#
+# A clean tree breaks no user story except, possibly, US23: names come from
+# short lists, so big "clean" trees can still hold people with near
+# duplicate names and birth dates. Violations are injected on request, e.g.
+# {'US02': 3, 'US17': 1}, by editing randomly chosen records, and the same
+# seed always gives the same file.
+
+MALE_NAMES = ['Raj', 'Allen', 'Joseph', 'Lewis', 'Pratik', 'Bhupendra', 'Arjun', 'Samuel', 'Omar', 'Hiro',
+              'Daniel', 'Mateo', 'Ivan', 'Kwame', 'Luca', 'Noah', 'Vikram', 'Elias', 'Tomas', 'Ravi']
+FEMALE_NAMES = ['Julie', 'Jenifer', 'Agatha', 'Laura', 'Santosh', 'Reenku', 'Priya', 'Maria', 'Amara', 'Yuki',
+                'Sofia', 'Elena', 'Fatima', 'Grace', 'Nadia', 'Ana', 'Meera', 'Clara', 'Ines', 'Zara']
+SURNAMES = ['Palival', 'Roberts', 'Jefferson', 'Reynolds', 'Murray', 'Julliet', 'Rawal', 'Sharma', 'Garcia',
+            'Nakamura', 'Okafor', 'Novak', 'Rossi', 'Schmidt', 'Kowalski', 'Haddad', 'Silva', 'Ivanova',
+            'Mensah', 'Larsen', 'Dubois', 'Costa', 'Khan', 'Brennan', 'Lindqvist']
+
+MONTH_NAMES = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+
+YEAR = 365
+
+
+class TreeGenerator:
+    """Builds the Individual and Family records of one synthetic tree."""
+
+    def __init__(self, seed=0, generations=6, branching=3, remarriage_rate=0.1,
+                 missing_date_rate=0.02, start_year=1800, end_year=2020):
+        self.random = random.Random(seed)
+        self.generations = generations
+        self.branching = branching
+        self.remarriage_rate = remarriage_rate
+        self.missing_date_rate = missing_date_rate
+        self.start = date(start_year, 1, 1).toordinal()
+        self.end = date(end_year, 1, 1).toordinal()
+        self.individuals = {}
+        self.families = {}
+        self.generation = {}
+        # (given name, surname, birth year) already used, so relatives do not
+        # come out as near duplicates for US23
+        self.names = set()
+
+    def person(self, sex, surname, birth, generation):
+        individual = Individual(f"@I{len(self.individuals) + 1}@")
+        individual.sex = sex
+        year = date.fromordinal(birth).year
+        for _ in range(5):
+            individual.given = self.random.choice(MALE_NAMES if sex == 'M' else FEMALE_NAMES)
+            if (individual.given, surname, year) not in self.names:
+                break
+        self.names.add((individual.given, surname, year))
+        individual.surname = surname
+        individual.birth = birth
+        self.individuals[individual.id] = individual
+        self.generation[individual.id] = generation
+        return individual
+
+    def family(self, husband, wife, married):
+        family = Family(f"@F{len(self.families) + 1}@")
+        family.husband = husband.id
+        family.wife = wife.id
+        family.married = married
+        husband.fams.append(family.id)
+        wife.fams.append(family.id)
+        self.families[family.id] = family
+        return family
+
+    def founders(self):
+        birth = self.start + self.random.randint(0, 20 * YEAR)
+        husband = self.person('M', self.random.choice(SURNAMES), birth, 0)
+        family = self.marry(husband, birth + self.random.randint(20 * YEAR, 30 * YEAR))
+        if family is None:
+            raise ValueError("start_year must be at least 50 years before end_year")
+        return family
+
+    def build(self, size):
+        """Grow the tree until it has size individuals."""
+        pending = []
+        position = 0
+        while len(self.individuals) < size:
+            if position == len(pending):
+                pending.append(self.founders())
+            family = pending[position]
+            position += 1
+            pending.extend(self.grow(family, size))
+        self.finish()
+        return self.individuals, self.families
+
+    def grow(self, family, size):
+        """Add the children of family and return the families they start."""
+        husband = self.individuals[family.husband]
+        wife = self.individuals[family.wife]
+        generation = self.generation[husband.id] if self.generation[husband.id] is not None else self.generation[wife.id]
+        end = family.divorced - YEAR if family.divorced else family.married + 20 * YEAR
+        wife_fertile = wife.birth + 45 * YEAR
+        children = self.random.randint(0, 2 * self.branching)
+
+        new_families = []
+        born = family.married + self.random.randint(YEAR, 3 * YEAR)
+        for _ in range(children):
+            if len(self.individuals) >= size or born > min(end, wife_fertile, self.end):
+                break
+            sex = self.random.choice('MF')
+            child = self.person(sex, husband.surname, born, generation + 1)
+            child.famc.append(family.id)
+            family.children.append(child.id)
+            born += self.random.randint(YEAR, 4 * YEAR)
+
+            if generation + 1 < self.generations and len(self.individuals) < size:
+                first = self.marry(child, child.birth + self.random.randint(20 * YEAR, 35 * YEAR))
+                if first is not None:
+                    new_families.append(first)
+                    divorced = first.married + self.random.randint(5 * YEAR, 15 * YEAR)
+                    if self.random.random() < self.remarriage_rate and divorced < self.end:
+                        first.divorced = divorced
+                        if len(self.individuals) < size:
+                            second = self.marry(child, divorced + self.random.randint(YEAR, 5 * YEAR))
+                            if second is not None:
+                                new_families.append(second)
+        return new_families
+
+    def marry(self, individual, married):
+        """A new family of individual and an outside spouse, or None if it would be after end_year."""
+        spouse_birth = individual.birth + self.random.randint(-5 * YEAR, 5 * YEAR)
+        married = max(married, spouse_birth + 18 * YEAR)
+        if married >= self.end:
+            return None
+        spouse = self.person('F' if individual.sex == 'M' else 'M', self.random.choice(SURNAMES), spouse_birth, None)
+        couple = (individual, spouse) if individual.sex == 'M' else (spouse, individual)
+        return self.family(*couple, married)
+
+    def finish(self):
+        """Give people a death date after all their own events, unless still living."""
+        last_event = {}
+        for family in self.families.values():
+            events = [family.married, family.divorced or 0]
+            events.extend(self.individuals[child].birth for child in family.children)
+            latest = max(events)
+            for spouse_id in (family.husband, family.wife):
+                last_event[spouse_id] = max(last_event.get(spouse_id, 0), latest)
+
+        for individual in self.individuals.values():
+            death = individual.birth + self.random.randint(40 * YEAR, 95 * YEAR)
+            death = max(death, last_event.get(individual.id, 0) + YEAR)
+            if death < self.end:
+                individual.death = death
+                individual.alive = False
+
+
+# Injections: each edits one randomly chosen record so that it breaks the
+# story, and returns False when the tree has no suitable record.
+
+def married_families(generator):
+    return [family for family in generator.families.values() if family.married is not None]
+
+def families_with_children(generator, count=1):
+    return [family for family in generator.families.values() if len(family.children) >= count]
+
+def inject_future_birth(generator, rng):
+    individual = rng.choice(list(generator.individuals.values()))
+    individual.birth = generator.end + rng.randint(YEAR, 900 * YEAR)
+    return True
+
+def inject_birth_after_marriage(generator, rng):
+    family = rng.choice(married_families(generator))
+    generator.individuals[family.husband].birth = family.married + rng.randint(1, 5 * YEAR)
+    return True
+
+def inject_death_before_birth(generator, rng):
+    individual = rng.choice(list(generator.individuals.values()))
+    individual.death = individual.birth - rng.randint(1, 10 * YEAR)
+    individual.alive = False
+    return True
+
+def inject_divorce_before_marriage(generator, rng):
+    family = rng.choice(married_families(generator))
+    family.divorced = family.married - rng.randint(1, 5 * YEAR)
+    return True
+
+def inject_death_before_marriage(generator, rng):
+    family = rng.choice(married_families(generator))
+    wife = generator.individuals[family.wife]
+    wife.death = family.married - rng.randint(1, YEAR)
+    wife.alive = False
+    return True
+
+def inject_divorce_after_death(generator, rng):
+    family = rng.choice(married_families(generator))
+    husband = generator.individuals[family.husband]
+    husband.death = family.married + rng.randint(1, 5 * YEAR)
+    husband.alive = False
+    family.divorced = husband.death + rng.randint(1, 5 * YEAR)
+    return True
+
+def inject_over_150(generator, rng):
+    individual = rng.choice(list(generator.individuals.values()))
+    individual.death = individual.birth + rng.randint(151 * YEAR, 170 * YEAR)
+    individual.alive = False
+    return True
+
+def inject_birth_before_parents_marriage(generator, rng):
+    candidates = families_with_children(generator)
+    if not candidates:
+        return False
+    family = rng.choice(candidates)
+    generator.individuals[family.children[0]].birth = family.married - rng.randint(30, 5 * YEAR)
+    return True
+
+def inject_birth_after_mothers_death(generator, rng):
+    candidates = families_with_children(generator)
+    if not candidates:
+        return False
+    family = rng.choice(candidates)
+    wife = generator.individuals[family.wife]
+    wife.death = generator.individuals[family.children[-1]].birth - rng.randint(1, YEAR)
+    wife.alive = False
+    return True
+
+def inject_marriage_before_14(generator, rng):
+    family = rng.choice(married_families(generator))
+    generator.individuals[family.wife].birth = family.married - rng.randint(5 * YEAR, 13 * YEAR)
+    return True
+
+def inject_close_siblings(generator, rng):
+    candidates = families_with_children(generator, 2)
+    if not candidates:
+        return False
+    family = rng.choice(candidates)
+    first, second = (generator.individuals[child] for child in family.children[:2])
+    second.birth = first.birth + rng.randint(10, 200)
+    return True
+
+def inject_male_surname(generator, rng):
+    candidates = [child for family in generator.families.values() for child in family.children
+                  if generator.individuals[child].sex == 'M']
+    if not candidates:
+        return False
+    child = generator.individuals[rng.choice(candidates)]
+    child.surname = rng.choice([surname for surname in SURNAMES if surname != child.surname])
+    return True
+
+def add_marriage(generator, husband_id, wife_id):
+    husband = generator.individuals[husband_id]
+    wife = generator.individuals[wife_id]
+    generator.family(husband, wife, max(husband.birth, wife.birth) + 20 * YEAR)
+
+def inject_married_to_descendant(generator, rng):
+    candidates = [family for family in families_with_children(generator)
+                  if any(generator.individuals[child].sex == 'F' for child in family.children)]
+    if not candidates:
+        return False
+    family = rng.choice(candidates)
+    daughter = next(child for child in family.children if generator.individuals[child].sex == 'F')
+    add_marriage(generator, family.husband, daughter)
+    return True
+
+def inject_married_to_sibling(generator, rng):
+    candidates = [family for family in families_with_children(generator, 2)
+                  if {generator.individuals[child].sex for child in family.children} == {'M', 'F'}]
+    if not candidates:
+        return False
+    family = rng.choice(candidates)
+    brother = next(child for child in family.children if generator.individuals[child].sex == 'M')
+    sister = next(child for child in family.children if generator.individuals[child].sex == 'F')
+    add_marriage(generator, brother, sister)
+    return True
+
+def grandchildren(generator, family):
+    """Grandchildren of family, grouped by the child they descend from."""
+    groups = []
+    for child_id in family.children:
+        found = [grandchild for family_id in generator.individuals[child_id].fams
+                 for grandchild in generator.families[family_id].children]
+        if found:
+            groups.append((child_id, found))
+    return groups
+
+def inject_married_to_first_cousin(generator, rng):
+    candidates = []
+    for family in generator.families.values():
+        groups = grandchildren(generator, family)
+        for position, (first_parent, first_group) in enumerate(groups):
+            for second_parent, second_group in groups[position + 1:]:
+                for first in first_group:
+                    for second in second_group:
+                        if generator.individuals[first].sex != generator.individuals[second].sex:
+                            candidates.append((first, second))
+                            break
+    if not candidates:
+        return False
+    first, second = rng.choice(candidates)
+    if generator.individuals[first].sex == 'F':
+        first, second = second, first
+    add_marriage(generator, first, second)
+    return True
+
+def inject_married_to_niece_or_nephew(generator, rng):
+    candidates = []
+    for family in generator.families.values():
+        for parent, group in grandchildren(generator, family):
+            for sibling in family.children:
+                if sibling == parent:
+                    continue
+                for grandchild in group:
+                    if generator.individuals[sibling].sex != generator.individuals[grandchild].sex:
+                        candidates.append((sibling, grandchild))
+                        break
+    if not candidates:
+        return False
+    first, second = rng.choice(candidates)
+    if generator.individuals[first].sex == 'F':
+        first, second = second, first
+    add_marriage(generator, first, second)
+    return True
+
+def inject_wrong_role(generator, rng):
+    family = rng.choice(list(generator.families.values()))
+    generator.individuals[family.husband].sex = 'F'
+    return True
+
+def inject_duplicate_person(generator, rng):
+    original = rng.choice(list(generator.individuals.values()))
+    copy = generator.person(original.sex, original.surname, original.birth, None)
+    copy.given = original.given
+    return True
+
+
+INJECTIONS = {
+    'US01': inject_future_birth,
+    'US02': inject_birth_after_marriage,
+    'US03': inject_death_before_birth,
+    'US04': inject_divorce_before_marriage,
+    'US05': inject_death_before_marriage,
+    'US06': inject_divorce_after_death,
+    'US07': inject_over_150,
+    'US08': inject_birth_before_parents_marriage,
+    'US09': inject_birth_after_mothers_death,
+    'US10': inject_marriage_before_14,
+    'US13': inject_close_siblings,
+    'US16': inject_male_surname,
+    'US17': inject_married_to_descendant,
+    'US18': inject_married_to_sibling,
+    'US19': inject_married_to_first_cousin,
+    'US20': inject_married_to_niece_or_nephew,
+    'US21': inject_wrong_role,
+    'US23': inject_duplicate_person,
+}
+
+
+def generate_tree(size=1000, seed=0, violations=None, **options):
+    """(individuals, families) of a synthetic tree with size individuals.
+
+    options are the TreeGenerator settings; violations maps user stories to
+    the number of violations of that story to inject.
+    """
+    generator = TreeGenerator(seed, **options)
+    generator.build(size)
+    rng = random.Random(seed + 1)
+    for story, count in sorted((violations or {}).items()):
+        if story not in INJECTIONS:
+            raise KeyError(f"no injection for {story}")
+        for _ in range(count):
+            INJECTIONS[story](generator, rng)
+
+    # missing dates are dropped last so injected dates are never lost
+    if generator.missing_date_rate:
+        for individual in generator.individuals.values():
+            if individual.birth is not None and rng.random() < generator.missing_date_rate:
+                individual.birth = None
+            if individual.death is not None and rng.random() < generator.missing_date_rate:
+                individual.death = None
+    return generator.individuals, generator.families
+
+
+def gedcom_date(ordinal):
+    day = date.fromordinal(ordinal)
+    return f"{day.day} {MONTH_NAMES[day.month - 1]} {day.year}"
+
+
+def gedcom_lines(individuals, families):
+    """Yield the GEDCOM text lines of the records."""
+    yield "0 HEAD"
+    yield "1 CHAR UTF-8"
+    for individual in individuals.values():
+        yield f"0 {individual.id} INDI"
+        yield f"1 NAME {individual.given} /{individual.surname}/"
+        yield f"1 SEX {individual.sex}"
+        yield "1 BIRT"
+        if individual.birth is not None:
+            yield f"2 DATE {gedcom_date(individual.birth)}"
+        if not individual.alive:
+            yield "1 DEAT Y"
+            if individual.death is not None:
+                yield f"2 DATE {gedcom_date(individual.death)}"
+        for family_id in individual.famc:
+            yield f"1 FAMC {family_id}"
+        for family_id in individual.fams:
+            yield f"1 FAMS {family_id}"
+    for family in families.values():
+        yield f"0 {family.id} FAM"
+        yield f"1 HUSB {family.husband}"
+        yield f"1 WIFE {family.wife}"
+        for child_id in family.children:
+            yield f"1 CHIL {child_id}"
+        if family.married is not None:
+            yield "1 MARR"
+            yield f"2 DATE {gedcom_date(family.married)}"
+        if family.divorced is not None:
+            yield "1 DIV"
+            yield f"2 DATE {gedcom_date(family.divorced)}"
+    yield "0 TRLR"
+
+
+def write_gedcom(path, size=1000, seed=0, violations=None, **options):
+    """Write a synthetic tree to path and return its (individuals, families)."""
+    individuals, families = generate_tree(size, seed, violations, **options)
+    with open(path, 'w', encoding='utf-8') as gedcomfile:
+        for line in gedcom_lines(individuals, families):
+            gedcomfile.write(line)
+            gedcomfile.write('\n')
+    return individuals, families
+
+
+def parse_violations(text):
+    """{story: count} from "US02=3,US17=1"."""
+    violations = {}
+    for item in filter(None, text.split(',')):
+        story, _, count = item.partition('=')
+        violations[story.strip()] = int(count or 1)
+    return violations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic GEDCOM file")
+    parser.add_argument("path", help="GEDCOM file to write")
+    parser.add_argument("--size", type=int, default=1000, help="number of individuals")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--generations", type=int, default=6)
+    parser.add_argument("--branching", type=int, default=3, help="average children per family")
+    parser.add_argument("--remarriage-rate", type=float, default=0.1)
+    parser.add_argument("--missing-date-rate", type=float, default=0.02)
+    parser.add_argument("--violations", type=parse_violations, default={}, help='e.g. "US02=3,US17=1"')
+    args = parser.parse_args(argv)
+    write_gedcom(args.path, args.size, args.seed, args.violations, generations=args.generations,
+                 branching=args.branching, remarriage_rate=args.remarriage_rate,
+                 missing_date_rate=args.missing_date_rate)
+
+
+if __name__ == "__main__":
+    main()
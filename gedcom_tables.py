@@ -0,0 +1,52 @@
+from gedcom_model import iso_date
+
+# Rows of the Individuals and Families tables of the Gedcom_All_Sprints
+# report, shared by every report that lists the records that way (the
+# script itself, gedcom_batch and gedcom_bench). IDs are shown without
+# their @s and missing values as 'NA'.
+
+
+def display_id(xref):
+    return xref.strip('@') if xref else 'NA'
+
+def display_families(family_ids):
+    return "{" + ", ".join(display_id(fam_id) for fam_id in family_ids) + "}" if family_ids else 'NA'
+
+
+def individual_row(individual):
+    return [
+        display_id(individual.id),
+        individual.given or 'Unknown',
+        individual.surname or 'NA',
+        individual.sex or 'NA',
+        iso_date(individual.birth) or 'NA',
+        iso_date(individual.death) or 'NA',
+        individual.alive,
+        display_families(individual.famc),
+        display_families(individual.fams),
+        individual.age if individual.age is not None else 'NA',
+    ]
+
+def family_row(fam, individuals):
+    husband = individuals.get(fam.husband)
+    wife = individuals.get(fam.wife)
+    return [
+        display_id(fam.id),
+        display_id(fam.husband),
+        (husband.given or 'Unknown') if husband else 'Unknown',
+        (husband.surname or 'NA') if husband else 'Unknown',
+        display_id(fam.wife),
+        (wife.given or 'Unknown') if wife else 'Unknown',
+        (wife.surname or 'NA') if wife else 'Unknown',
+        iso_date(fam.married) or 'NA',
+        iso_date(fam.divorced) or 'NA',
+        [display_id(child) for child in fam.children],
+    ]
+
+INDIVIDUAL_FIELDS = ['ID', 'Name', 'Lastname', 'Gender', 'Birthday', 'Death', 'Alive', 'Child', 'Spouse', 'Age']
+FAMILY_FIELDS = ['ID', 'Husband ID', 'Husband Name', 'Husband Lastname', 'Wife ID', 'Wife Name', 'Wife Lastname', 'Married', 'Divorced', 'Children']
+
+def report_tables(individuals, family):
+    """(title, field names, rows) of each table, with rows produced lazily."""
+    yield 'Individuals', INDIVIDUAL_FIELDS, (individual_row(individual) for individual in individuals.values())
+    yield 'Families', FAMILY_FIELDS, (family_row(fam, individuals) for fam in family.values())
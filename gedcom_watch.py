@@ -0,0 +1,36 @@
+import os
+import time
+
+# Polling file watcher for the long-running validation mode.
+#
+# The standard library has no portable change notification, so the file's
+# inode, modification time and size are polled. A change is reported only
+# once they have held still for one interval, so a file an editor is still
+# writing is not read half saved.
+
+
+def file_state(path):
+    """(inode, modification time, size) of the file at path, None if it is missing."""
+    try:
+        status = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return status.st_ino, status.st_mtime_ns, status.st_size
+
+
+def settled_changes(path, interval=0.5, sleep=time.sleep):
+    """Yield the state of the file at path every time it has changed and settled.
+
+    The first state is yielded as soon as the file exists and has settled.
+    The generator never ends on its own.
+    """
+    reported = None
+    while True:
+        state = file_state(path)
+        if state is not None and state != reported:
+            sleep(interval)
+            if file_state(path) == state:
+                reported = state
+                yield state
+                continue
+        sleep(interval)
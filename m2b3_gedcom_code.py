@@ -1,419 +1,270 @@
+import argparse
+import sys
 from prettytable import PrettyTable
-from datetime import datetime
-import dateutil.relativedelta
-
-individuals = {}
-families = {}
-
-error_messages = []
-
-current_individual = None
-current_family = None
-
-individual_ids = set()
-family_ids = set()
-
-
-# Process a GEDCOM line and update data structures
-def process_gedcom_line(line):
-    global current_individual, current_family
-    
-    tokens = line.strip().split()
-    #print(tokens)
-    if len(tokens) < 2:
-        return
-    
-    tag = tokens[1]
-
-    if tag.startswith('@I'):
-        individual_id = tokens[1]
-        if individual_id in individual_ids:
-            error_msg = f"ERROR: INDIVIDUAL: US22: {individual_id}: Individual ID is not unique"
-            error_messages.append(error_msg)
-        else:
-            individual_ids.add(individual_id)
-        individuals[individual_id] = {"name": "", "birth_date": None, "death_date": None, "gender": None, "siblings": [], "spouse": None}
-        current_individual = individuals[individual_id]
-    elif tag == "NAME" and current_individual:
-        name = " ".join(tokens[2:])
-        current_individual["name"] = name
-
-    elif tag == "BIRT" and current_individual:
-        birth_date = None
-        for line in file:
-            inner_tokens = line.strip().split()
-            if len(inner_tokens) < 2:
-                break
-            inner_tag = inner_tokens[1]
-            if inner_tag == "DATE":
-                birth_date = " ".join(inner_tokens[2:])
-                break
-        current_individual["birth_date"] = birth_date
-
-    elif tag == "SEX" and current_individual:
-        current_individual["gender"] = tokens[2]
-
-    elif tag == "DEAT" and current_individual:
-        death_date = None
-        for line in file:
-            tokens = line.strip().split()
-            if len(tokens) < 2:
-                break
-            tag = tokens[1]
-            if tag == "DATE":
-                death_date = " ".join(tokens[2:])
-                break
-        current_individual["death_date"] = death_date
-    
-    elif tag.startswith('@F'):
-        family_id = tokens[1]
-        if family_id in family_ids:
-            error_msg = f"ERROR: FAMILY: US22: {family_id}: Family ID is not unique"
-            error_messages.append(error_msg)
-        else:
-            family_ids.add(family_id)
-        families[family_id] = {"husband_id": "", "wife_id": "", "marriage_date": None, "divorce_date": None}
-        current_family = families[family_id]
-
-    elif tag == "CHIL" and current_family:
-        childId = tokens[2]
-        if "Children" not in current_family:
-            current_family.update({"Children": [childId]})
-        else:
-            current_family["Children"].append(childId)
-
-        #add children as a field to the individual table for their dad
-        if "Children" not in individuals[current_family["husband_id"]]:
-            individuals[current_family["husband_id"]].update({"Children": [childId]})
-        else:
-            individuals[current_family["husband_id"]]["Children"].append(childId)
-        
-        #add children as a field to the individual table for their mom
-        if "Children" not in individuals[current_family['wife_id']]:
-            individuals[current_family["wife_id"]].update({"Children": [childId]})
-        else:
-            individuals[current_family["wife_id"]]["Children"].append(childId)
-
-    elif tag == "HUSB" and current_family:
-        husband_id = tokens[2]
-        current_family["husband_id"] = husband_id
-        # Populate husband's name from individuals dictionary
-        husband_name = individuals.get(husband_id, {}).get("name", "")
-        current_family["husband_name"] = husband_name
-
-    elif tag == "WIFE" and current_family:
-        wife_id = tokens[2]
-        current_family["wife_id"] = wife_id
-        # Populate wife's name from individuals dictionary
-        wife_name = individuals.get(wife_id, {}).get("name", "")
-        current_family["wife_name"] = wife_name
-
-    elif tag == "MARR" and current_family:
-        # Check if there is a DATE tag on the next line to get the marriage date
-        marriage_date = None
-        for line in file:
-            inner_tokens = line.strip().split()
-            if len(inner_tokens) < 2:
-                break
-            inner_tag = inner_tokens[1]
-            if inner_tag == "DATE":
-                marriage_date = " ".join(inner_tokens[2:])
-                break
-        current_family["marriage_date"] = marriage_date
-
-    elif tag == "DIV" and current_family:
-        # Check if there is a DATE tag on the next line to get the divorce date
-        divorce_date = None
-        for line in file:
-            inner_tokens = line.strip().split()
-            if len(inner_tokens) < 2:
-                break
-            inner_tag = inner_tokens[1]
-            if inner_tag == "DATE":
-                divorce_date = " ".join(inner_tokens[2:])
-                break
-        current_family["divorce_date"] = divorce_date
-
-#recursive function for #US17 to identify any marriages to descendants
-def marriedToDescendants(patriarch, matriarch, individual, individuals):
-
-    if individuals[individual]["gender"] ==  'M' and individual == patriarch:
-        error_msg = f"ERROR: FAMILY: US17: {individual} is married to their female ancestor, {matriarch}"
-        error_messages.append(error_msg)
-        return
-    elif  individuals[individual]["gender"] == 'F' and individual == matriarch:
-        error_msg = f"ERROR: FAMILY: US17: {individual} is married to their male ancestor, {patriarch}"
-        error_messages.append(error_msg)
-        return
-    elif individuals[individual]["Children"] is None:
-        return
-    else: 
-        for child in individuals[individual]["Children"]:
-            if child == individual:
-                continue
+from gedcom_model import Individual, Family, today_ordinal, as_of_ordinal
+from gedcom_parser import RecordBuilder
+from gedcom_index import FamilyIndex
+from gedcom_reader import iter_gedcom_lines, split_gedcom_line
+from gedcom_report import WRITERS, write_tables
+from gedcom_stats import RunStats, stage
+
+# user stories checked by this script, run together by the rule registry
+USER_STORIES = ["US02", "US03", "US04", "US05", "US08", "US09", "US17", "US18", "US19", "US20", "US21", "US23"]
+
+
+class GedcomSession:
+    """All the state of one parse and validation run.
+
+    Sessions share nothing, so several can run at once in different threads.
+    as_of is the day ordinal ages (US27, US29, US31) and the US07 check are
+    measured against, fixed for the whole run so reruns give the same results.
+    With a gedcom_stats.RunStats, reading, validating and printing the report
+    are recorded as stages and every rule is timed.
+    """
+
+    def __init__(self, as_of=None, stats=None):
+        self.as_of = as_of if as_of is not None else today_ordinal()
+        self.stats = stats
+        self.individuals = {}
+        self.families = {}
+        self.error_messages = []
+        # US22 errors found while reading, kept when validate() rebuilds error_messages
+        self.duplicate_id_errors = []
+        self.individual_ids = set()
+        self.family_ids = set()
+        # individuals with the same name and birth date, filled in by validate()
+        self.name_birth_dict = {}
+        # builds the Individual/Family records as lines are processed
+        self.builder = RecordBuilder(self.as_of)
+        self.tree = None
+
+    # Process a GEDCOM line and update data structures
+    def process_gedcom_line(self, line):
+        fields = split_gedcom_line(line.encode())
+        if fields is not None:
+            self.process_gedcom_fields(*fields)
+
+    # Process the split fields of one line as produced by gedcom_reader
+    def process_gedcom_fields(self, level, xref, tag, value):
+        self.builder.feed(level, xref, tag, value)
+        if level != 0:
+            return
+
+        record = self.builder.current
+        if type(record) is Individual:
+            individual_id = record.id
+            if individual_id in self.individual_ids:
+                error_msg = f"ERROR: INDIVIDUAL: US22: {individual_id}: Individual ID is not unique"
+                self.duplicate_id_errors.append(error_msg)
+                self.error_messages.append(error_msg)
             else:
-                return marriedToDescendants(patriarch, matriarch, child, individuals)
-
-# Read the GEDCOM file line by line and process each line
-with open('My-Family.ged', 'r') as file:
-    for line in file:
-        process_gedcom_line(line)
-
-
-# Create PrettyTable for individuals
-individual_table = PrettyTable()
-individual_table.field_names = ["ID", "Name", "Gender", "Birth Date", "Death Date", "Spouse", "Children", "Siblings", "Current Age"] #included current age for US27. also added spuse children and siblings for US17 and #US18
-
-# Create PrettyTable for families
-family_table = PrettyTable()
-family_table.field_names = ["ID", "Husband ID", "Husband", "Wife ID", "Wife", "Marriage Date", "Divorce Date", "Children"]
-
-# Create PrettyTable for deceased individuals US29
-deceased_individuals_table = PrettyTable()
-deceased_individuals_table.field_names = ["ID", "Name", "Birth Date", "Death Date", "Age at Death"]
-
-# Populate PrettyTable for deceased individuals
-for individual_id, individual in individuals.items():
-    name = individual["name"]
-    birth_date = individual["birth_date"]
-    death_date = individual["death_date"]
-    
-    if death_date:
-        birth_date_obj = datetime.strptime(birth_date, "%d %b %Y")
-        death_date_obj = datetime.strptime(death_date, "%d %b %Y")
-        age_at_death = death_date_obj.year - birth_date_obj.year - ((death_date_obj.month, death_date_obj.day) < (birth_date_obj.month, birth_date_obj.day))
-        
-        deceased_individuals_table.add_row([individual_id, name, birth_date, death_date, age_at_death])
-
-
-# a dictionary to track individuals with the same name and birth date
-name_birth_dict = {}
-
-# Populate PrettyTables
-for individual_id, individual in individuals.items():
-    name = individual["name"]
-    birth_date = individual["birth_date"]
-    death_date = individual["death_date"]
-
-    name_birth_key = (name, birth_date)
-
-    current_age = "N/A"
-
-    if name_birth_key in name_birth_dict:
-        name_birth_dict[name_birth_key].append(individual_id)
-    else:
-        name_birth_dict[name_birth_key] = [individual_id]
-
-    if death_date:
-        death_date_obj = datetime.strptime(death_date, "%d %b %Y")
-        for family_id, family in families.items():
-            husband_id = family["husband_id"]
-            wife_id = family["wife_id"]
-            if individual_id == husband_id or individual_id == wife_id:
-                marriage_date = family["marriage_date"]
-                if marriage_date:
-                    marriage_date_obj = datetime.strptime(marriage_date, "%d %b %Y")
-                    if death_date_obj < marriage_date_obj:
-                        error_msg = f"ERROR: INDIVIDUAL: US05: {individual_id}: Died {death_date} before marriage {marriage_date}"
-                        error_messages.append(error_msg)
-
-    if birth_date:
-        for same_name_birth_id in name_birth_dict[name_birth_key]:
-            if same_name_birth_id != individual_id:
-                error_msg = f"ERROR: INDIVIDUAL: US23: {individual_id} and {same_name_birth_id}: Have the same name and birth date {name} - {birth_date}"
-                error_messages.append(error_msg)
-
+                self.individual_ids.add(individual_id)
+            self.individuals[individual_id] = record
+
+        elif type(record) is Family:
+            family_id = record.id
+            if family_id in self.family_ids:
+                error_msg = f"ERROR: FAMILY: US22: {family_id}: Family ID is not unique"
+                self.duplicate_id_errors.append(error_msg)
+                self.error_messages.append(error_msg)
+            else:
+                self.family_ids.add(family_id)
+            self.families[family_id] = record
+
+    def read(self, path):
+        """Read the GEDCOM file line by line and process each line."""
+        with stage(self.stats, "parse") as entry:
+            records = len(self.individuals) + len(self.families)
+            for fields in iter_gedcom_lines(path):
+                self.process_gedcom_fields(*fields)
+            self.builder.close()
+            entry.records += len(self.individuals) + len(self.families) - records
+
+    def validate(self, stories=USER_STORIES, workers=None, vectorized=False):
+        """Run the user story rules over what has been read and return the error messages.
+
+        With workers the family rules of big trees are spread over that many
+        processes (see gedcom_rules.run_rules_parallel); rules are then not
+        timed one by one. vectorized runs the rules that have a NumPy kernel
+        on whole columns first (see gedcom_columns). Calling it again
+        replaces the previous results.
+        """
+        # the rule registry pulls in every rule's dependencies, so importing
+        # this module stays cheap until something is validated
+        from gedcom_rules import Tree, run_rules, run_rules_parallel, name_birth_groups
+
+        with stage(self.stats, "rules", len(self.individuals) + len(self.families)) as entry:
+            self.tree = Tree(self.individuals, self.families, self.as_of)
+            if workers:
+                errors = run_rules_parallel(self.tree, stories, workers, vectorized=vectorized)
+            else:
+                errors = run_rules(self.tree, stories, vectorized, self.stats)
+            # updated in place, the module level names alias the default session's
+            self.error_messages[:] = self.duplicate_id_errors + [message for story, message in errors]
+            self.name_birth_dict.clear()
+            self.name_birth_dict.update(name_birth_groups(self.individuals))
+            entry.errors += len(errors)
+        return self.error_messages
+
+    def report_tables(self):
+        """(title, field names, rows) of each table, in the order they are printed."""
+        index = self.tree.index
+        relationships = self.tree.relationships
+        yield "Individuals", INDIVIDUAL_FIELDS, individual_rows(self.individuals, index, relationships)
+        yield "Deceased Individuals", DECEASED_FIELDS, deceased_rows(self.individuals)
+        yield "Families", FAMILY_FIELDS, family_rows(self.individuals, self.families)
+        yield "Living Married Individuals", LIVING_MARRIED_FIELDS, living_married_rows(self.individuals, self.families, index)
+        yield "Living Singles Over 30", LIVING_SINGLES_FIELDS, living_singles_over_30_rows(self.individuals, index)
+        yield "Errors", ["Error"], ([error_msg] for error_msg in self.error_messages)
+
+    def print_report(self, output_format="table", stream=None):
+        """Print the tables and errors as PrettyTables or through a streaming writer."""
+        if stream is None:
+            stream = sys.stdout
+        with stage(self.stats, "report", len(self.individuals) + len(self.families)):
+            self.write_report(output_format, stream)
+
+    def write_report(self, output_format, stream):
+        if output_format != "table":
+            write_tables(WRITERS[output_format](stream), self.report_tables())
+            return
+
+        tables = {title: pretty_table(field_names, rows) for title, field_names, rows in self.report_tables() if title != "Errors"}
+        print("Individuals:", file=stream)
+        print(tables["Individuals"], file=stream)
+        print(file=stream)
+        print("Deceased Individuals:", file=stream)
+        print(tables["Deceased Individuals"], file=stream)
+
+        print("\nFamilies:", file=stream)
+        print(tables["Families"], file=stream)
+        print("\nLiving Married Individuals:", file=stream)
+        print(tables["Living Married Individuals"], file=stream)
+        print(file=stream)
+        print("Living Singles Over 30:", file=stream)
+        print(tables["Living Singles Over 30"], file=stream)
+
+        print("\n" * 2, file=stream)
+
+        for error_msg in self.error_messages:
+            print(error_msg, file=stream)
+
+
+INDIVIDUAL_FIELDS = ["ID", "Name", "Gender", "Birth Date", "Death Date", "Spouse", "Children", "Siblings", "Current Age"] #included current age for US27. also added spuse children and siblings for US17 and #US18
+FAMILY_FIELDS = ["ID", "Husband ID", "Husband", "Wife ID", "Wife", "Marriage Date", "Divorce Date", "Children"]
+DECEASED_FIELDS = ["ID", "Name", "Birth Date", "Death Date", "Age at Death"]
+LIVING_MARRIED_FIELDS = ["ID", "Name", "Spouse ID", "Spouse Name", "Marriage Date"]
+LIVING_SINGLES_FIELDS = ["ID", "Name", "Birth Date", "Age"]
+
+
+def pretty_table(field_names, rows):
+    table = PrettyTable()
+    table.field_names = field_names
+    for row in rows:
+        table.add_row(row)
+    return table
+
+# Rows of each table are generated one at a time so they can be streamed to
+# a report writer as well as collected into a PrettyTable
+
+def individual_rows(individuals, index, relationships):
+    for individual_id, individual in individuals.items():
         #below logic is to list individuals current age for US27
-        birth_date_obj = datetime.strptime(birth_date, "%d %b %Y")
-        today = datetime.now()
-        current_age = today.year - birth_date_obj.year - ((today.month, today.day) < (birth_date_obj.month, birth_date_obj.day))
-
-        if "age" not in individual:
-            individual.update({"age": current_age})
-        else:
-            individual["age"] = current_age
-
-        for family_id, family in families.items():
-            husband_id = family.get("husband_id")
-            wife_id = family.get("wife_id")
-            marriage_date = family.get("marriage_date")
-
-            if individual_id == husband_id or individual_id == wife_id:
-                if marriage_date:
-                    marriage_date_obj = datetime.strptime(marriage_date, "%d %b %Y")
-                    if marriage_date_obj < birth_date_obj:
-                        error_msg = f"ERROR: INDIVIDUAL: US02: {individual_id}: Birth date {birth_date} occurs after marriage date {marriage_date}"
-                        error_messages.append(error_msg)
-
-                if death_date:
-                    death_date_obj = datetime.strptime(death_date, "%d %b %Y")
-                    if death_date_obj < birth_date_obj:
-                        error_msg = f"ERROR: INDIVIDUAL: US03: {individual_id}: Birth date {birth_date} occurs after death date {death_date}"
-                        error_messages.append(error_msg)
-
-    #add null value to children array if the individual doesnt have any children
-    if "Children" not in individual:
-        individual.update({"Children": None})
-
-    #ZD added for sprint 3
-    for family_id, family in families.items():
-        husband_id = family["husband_id"]
-        wife_id = family["wife_id"]
-    
-        #for help with US18, adding spouse and siblings to the individuals table
-        individuals[husband_id]["spouse"] = wife_id
-        individuals[wife_id]["spouse"] = husband_id
-
-        if "Children" in family:
-            for x in range(len(family["Children"])):
-                for kid in family["Children"]:
-                    if family["Children"][x] == kid:
-                        continue
-                    else:
-                        if kid not in individuals[family["Children"][x]]["siblings"]:
-                            individuals[family["Children"][x]]["siblings"].append(kid) 
-
-    individual_table.add_row([individual_id, individual["name"], individual["gender"], individual["birth_date"], individual["death_date"], individual["spouse"], individual["Children"], individual["siblings"], current_age])
-
-
-for family_id, family in families.items():
-    husband_id = family["husband_id"]
-    wife_id = family["wife_id"]
-    husband_name = individuals.get(family["husband_id"], {}).get("name", "")
-    wife_name = individuals.get(family["wife_id"], {}).get("name", "")
-
-    marriage_date = family["marriage_date"]
-    divorce_date = family["divorce_date"]
-
-
-    #user story 08, 09 and 17
-    if "Children" in family:
-
-        for x in range(len(family["Children"])):
-            for y in range(len(family["Children"]) - x - 1):
-                if individuals[family["Children"][y]]["age"] < individuals[family["Children"][y+1]]["age"]:
-                    temp = family["Children"][y] 
-                    family["Children"][y] = family["Children"][y+1]
-                    family["Children"][y+1] = temp
-
-
-        for child in family["Children"]:
-            marriage_date_obj = datetime.strptime(marriage_date, "%d %b %Y")
-            birth_date_obj = datetime.strptime(individuals[child]["birth_date"], "%d %b %Y")
-
-            if individuals[wife_id]["death_date"]:
-                mom_death_date_obj = datetime.strptime(individuals[wife_id]["death_date"], "%d %b %Y")
-
-            if individuals[husband_id]["death_date"]:
-                dad_death_date_obj = datetime.strptime(individuals[husband_id]["death_date"], "%d %b %Y")
-
-
-            #08
-            if birth_date_obj < marriage_date_obj:
-                error_msg = f"ERROR: FAMILY: US08: {child}: Born on {birth_date_obj} before the marriage of their parents on {marriage_date_obj}"
-                error_messages.append(error_msg)   
+        current_age = individual.age if individual.birth is not None else "N/A"
+        yield [individual_id, individual.name, individual.sex, individual.birth_date, individual.death_date, ", ".join(relationships.spouses(individual_id)) or None, index.children_of(individual_id) or None, relationships.siblings(individual_id), current_age]
 
-            if divorce_date:
-                divorce_date_obj = datetime.strptime(divorce_date, "%d %b %Y") 
-                difference = dateutil.relativedelta.relativedelta(birth_date_obj, divorce_date_obj)
-
-                if difference.months > 9:
-                    error_msg = f"ERROR: FAMILY: US08: {child}: Born on {birth_date_obj} more than 9 months after the divorce of their parents on {divorce_date_obj}"
-                    error_messages.append(error_msg) 
-
-            #09
-            if individuals[wife_id]["death_date"]:
-                if mom_death_date_obj < birth_date_obj:
-                    error_msg = f"ERROR: FAMILY: US09: {child}: Born on {birth_date_obj} after the death of their mom on {mom_death_date_obj}"
-                    error_messages.append(error_msg)   
-
-            if individuals[husband_id]["death_date"]:
-                difference = dateutil.relativedelta.relativedelta(birth_date_obj, dad_death_date_obj)
-
-                if difference.months > 9:
-                    error_msg = f"ERROR: FAMILY: US09: {child}: Born on {birth_date_obj} more than 9 months after the death of their dad on {dad_death_date_obj}"
-                    error_messages.append(error_msg) 
-
-            #User Story 17
-            marriedToDescendants(husband_id, wife_id, child, individuals)
-
-    if "Children" in family:
-        children = family["Children"]
-    else:
-        children = []
+# deceased individuals US29
+def deceased_rows(individuals):
+    for individual_id, individual in individuals.items():
+        if individual.death_date:
+            yield [individual_id, individual.name, individual.birth_date, individual.death_date, individual.age]
 
-    if marriage_date and divorce_date:
-        marriage_date_obj = datetime.strptime(marriage_date, "%d %b %Y")
-        divorce_date_obj = datetime.strptime(divorce_date, "%d %b %Y")
-        if marriage_date_obj > divorce_date_obj:
-            error_msg = f"ERROR: FAMILY: US04: {family_id}: {husband_id} ({husband_name}) and {wife_id} ({wife_name}) Married {marriage_date} after divorce on {divorce_date}"
-            error_messages.append(error_msg)  
+def family_rows(individuals, families):
+    def birth_order(child_id):
+        # children without a known birth date are listed last
+        birth = individuals[child_id].birth if child_id in individuals else None
+        return (birth is None, birth or 0)
 
-    #US21
-    if individuals[husband_id]["gender"] == "F" or individuals[wife_id]["gender"] == "M":
-        error_msg = f"ERROR: FAMILY: US21: {family_id}: {husband_id} has the incorrect role in the family."
-        error_messages.append(error_msg)  
+    for family_id, family in families.items():
+        husband = individuals.get(family.husband)
+        wife = individuals.get(family.wife)
+        husband_name = husband.name if husband else ""
+        wife_name = wife.name if wife else ""
 
-    
-    family_table.add_row([family_id, husband_id, husband_name, wife_id, wife_name, marriage_date, divorce_date, children])
+        # oldest child first
+        family_children = sorted(family.children, key=birth_order)
 
-#User Story 18
-for id in individuals:
-    if individuals[id]["spouse"] in individuals[id]["siblings"]:
-        error_msg = "ERROR: INDIVIDUAL: US018: " + individuals[id]["spouse"] + " married to their sibling"
-        error_messages.append(error_msg)
+        yield [family_id, family.husband, husband_name, family.wife, wife_name, family.marriage_date, family.divorce_date, family_children]
 
 #US 30: List all living married people in a GEDCOM file
-def populate_living_married_table(individuals, families):
-    living_married_table = PrettyTable()
-    living_married_table.field_names = ["ID", "Name", "Spouse ID", "Spouse Name", "Marriage Date"]
-
+def living_married_rows(individuals, families, index):
     for individual_id, individual in individuals.items():
-        if individual["spouse"] and not individual["death_date"]:  # Check if married and alive
-            spouse_id = individual["spouse"]
-            spouse_name = individuals.get(spouse_id, {}).get("name", "")
-            marriage_date = None
-            for family_id, family in families.items():
-                if spouse_id in [family["husband_id"], family["wife_id"]]:
-                    marriage_date = family["marriage_date"]
-                    break
-            living_married_table.add_row([individual_id, individual["name"], spouse_id, spouse_name, marriage_date])
-
-    return living_married_table
+        if not individual.alive:  # Check if married and alive
+            continue
+        for family_id, spouse_id in index.partners(individual_id):
+            if not spouse_id:
+                continue
+            spouse = individuals.get(spouse_id)
+            spouse_name = spouse.name if spouse else ""
+            yield [individual_id, individual.name, spouse_id, spouse_name, families[family_id].marriage_date]
 
-#US 31: List all living people over 30 who have never been married in a GEDCOM file
-def populate_living_singles_over_30_table(individuals):
-    living_singles_over_30_table = PrettyTable()
-    living_singles_over_30_table.field_names = ["ID", "Name", "Birth Date", "Age"]
+def populate_living_married_table(individuals, families, index=None):
+    if index is None:
+        index = FamilyIndex(families)
+    return pretty_table(LIVING_MARRIED_FIELDS, living_married_rows(individuals, families, index))
 
+#US 31: List all living people over 30 who have never been married in a GEDCOM file
+def living_singles_over_30_rows(individuals, index):
     for individual_id, individual in individuals.items():
-        age = individual.get("age", 0)
-        death_date = individual.get("death_date", None)
-        spouse = individual.get("spouse", None)
+        age = individual.age or 0
 
         # Check if the individual is over 30, alive, and never married
-        if age > 30 and not death_date and not spouse:
-            living_singles_over_30_table.add_row([individual_id, individual["name"], individual["birth_date"], age])
-
-    return living_singles_over_30_table
-
-
-
-print("Individuals:")
-print(individual_table)
-print()
-print("Deceased Individuals:")
-print(deceased_individuals_table)
-
-print("\nFamilies:")
-print(family_table)
-print("\nLiving Married Individuals:")
-print(populate_living_married_table(individuals, families))
-print()
-print("Living Singles Over 30:")
-print(populate_living_singles_over_30_table(individuals))
-
-print("\n" * 2)
-
-for error_msg in error_messages:
-    print(error_msg)
+        if age > 30 and individual.alive and not index.is_married(individual_id):
+            yield [individual_id, individual.name, individual.birth_date, age]
+
+def populate_living_singles_over_30_table(individuals, families, index=None):
+    if index is None:
+        index = FamilyIndex(families)
+    return pretty_table(LIVING_SINGLES_FIELDS, living_singles_over_30_rows(individuals, index))
+
+
+# The module level names below belong to a default session so existing
+# callers of process_gedcom_line keep working; nothing is parsed on import.
+default_session = GedcomSession()
+individuals = default_session.individuals
+families = default_session.families
+error_messages = default_session.error_messages
+individual_ids = default_session.individual_ids
+family_ids = default_session.family_ids
+name_birth_dict = default_session.name_birth_dict
+process_gedcom_line = default_session.process_gedcom_line
+process_gedcom_fields = default_session.process_gedcom_fields
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate a GEDCOM file and print the tables and errors")
+    parser.add_argument("gedcom_file", nargs="?", default="My-Family.ged", help="GEDCOM file to read (default: My-Family.ged)")
+    parser.add_argument("--as-of", type=as_of_ordinal, default=today_ordinal(), metavar="YYYY-MM-DD",
+                        help="date that ages are measured against (default: today)")
+    parser.add_argument("--format", choices=["table", *WRITERS], default="table",
+                        help="table: PrettyTables (default); text, csv, jsonl: rows are streamed as they are produced")
+    parser.add_argument("--stats", metavar="JSON_FILE", help="write the time and memory of every stage and rule to this file")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="check the family rules of big files in this many processes (default: in this process)")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="check the date rules on whole columns with NumPy first (needs numpy)")
+    args = parser.parse_args(argv)
+    if args.workers and args.stats:
+        parser.error("rules checked by --workers processes cannot be timed; drop --stats or --workers")
+
+    session = GedcomSession(args.as_of, RunStats(memory=True) if args.stats else None)
+    session.read(args.gedcom_file)
+    session.validate(workers=args.workers, vectorized=args.vectorized)
+    session.print_report(args.format)
+    if args.stats:
+        session.stats.write_json(args.stats)
+    return session
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from gedcom_parser import iter_records
+from gedcom_rules import Tree, run_rules
+from gedcom_tables import individual_row, family_row
+from Gedcom_All_Sprints import get_ind_fam_details, watch_gedcom
+
+
+GEDCOM_LINES = [
+    "0 HEAD",
+    "1 CHAR UTF-8",
+    "0 @F1@ FAM",
+    "1 HUSB @I1@",
+    "1 WIFE @I2@",
+    "1 CHIL @I3@",
+    "1 MARR",
+    "2 DATE 8 OCT 1970",
+    "1 DIV",
+    "2 DATE 8 OCT 1980",
+    "0 @I1@ INDI",
+    "1 NAME Allen /Roberts/",
+    "2 GIVN Allen",
+    "2 SURN Roberts",
+    "1 SEX M",
+    "1 BIRT",
+    "2 DATE 1 JAN 1940",
+    "1 DEAT Y",
+    "2 DATE 6 MAY 2011",
+    "1 FAMS @F1@",
+    "0 @I2@ INDI",
+    "2 GIVN Julie",
+    "1 SEX F",
+    "1 BIRT",
+    "1 DEAT Y",
+    "2 DATE 6 MAY 2011",
+    "0 @I3@ INDI",
+    "2 GIVN Jenifer",
+    "1 BIRT",
+    "2 DATE 1 MAY 1975",
+    "1 FAMC @F1@",
+    "0 TRLR",
+]
+
+
+class TestStreamingParser(unittest.TestCase):
+
+    def test_records_are_yielded_in_file_order(self):
+        records = list(iter_records(iter(GEDCOM_LINES)))
+        self.assertEqual([(type(record).__name__, record.id) for record in records],
+                         [('Family', '@F1@'), ('Individual', '@I1@'), ('Individual', '@I2@'), ('Individual', '@I3@')])
+
+    def test_dates_follow_their_own_event(self):
+        individuals, families = get_ind_fam_details(GEDCOM_LINES)
+        self.assertEqual(individuals['@I1@'].birth, date(1940, 1, 1).toordinal())
+        self.assertEqual(individuals['@I1@'].death_date, '6 MAY 2011')
+        self.assertEqual(individuals['@I1@'].age, 71)
+        self.assertFalse(individuals['@I1@'].alive)
+        # BIRT without a DATE must not pick up the DEAT date that follows it
+        self.assertIsNone(individuals['@I2@'].birth)
+        self.assertEqual(individuals['@I2@'].death, date(2011, 5, 6).toordinal())
+        self.assertIsNone(individuals['@I2@'].age)
+        self.assertEqual(families['@F1@'].married, date(1970, 10, 8).toordinal())
+        self.assertEqual(families['@F1@'].divorced, date(1980, 10, 8).toordinal())
+
+    def test_family_before_individuals_gets_names(self):
+        individuals, families = get_ind_fam_details(GEDCOM_LINES)
+        row = family_row(families['@F1@'], individuals)
+        self.assertEqual(row[:7], ['F1', 'I1', 'Allen', 'Roberts', 'I2', 'Julie', 'NA'])
+        self.assertEqual(row[9], ['I3'])
+        self.assertEqual(individual_row(individuals['@I3@'])[7], '{F1}')
+
+    def test_names_fall_back_to_name_line(self):
+        individuals, families = get_ind_fam_details(["0 @I1@ INDI", "1 NAME Raj /Palival/"])
+        self.assertEqual(individuals['@I1@'].given, 'Raj')
+        self.assertEqual(individuals['@I1@'].surname, 'Palival')
+
+    def test_ages_use_the_as_of_date(self):
+        as_of = date(2000, 4, 30).toordinal()
+        individuals, families = get_ind_fam_details(GEDCOM_LINES, as_of)
+        self.assertEqual(individuals['@I3@'].age, 24)
+        # age at death does not depend on the as-of date
+        self.assertEqual(individuals['@I1@'].age, 71)
+        future = [message.split(': ')[3] for story, message in run_rules(Tree(individuals, families, as_of), ['US01'])]
+        self.assertEqual(future, ['@I1@', '@I2@'])
+
+
+class TestWatchMode(unittest.TestCase):
+
+    def test_output_follows_each_save(self):
+        with tempfile.TemporaryDirectory() as directory:
+            gedcomfile = os.path.join(directory, 'family.ged')
+            output_path = os.path.join(directory, 'Output.jsonl')
+            outputs = []
+
+            def saves():
+                for lines in (GEDCOM_LINES, [line.replace('8 OCT 1980', '8 OCT 3000') for line in GEDCOM_LINES]):
+                    with open(gedcomfile, 'w') as saved:
+                        saved.write("\n".join(lines))
+                    yield
+                    with open(output_path) as output:
+                        outputs.append([json.loads(line) for line in output])
+
+            printed = io.StringIO()
+            with contextlib.redirect_stdout(printed):
+                watch_gedcom(gedcomfile, saves(), date(2020, 1, 1).toordinal(), 'jsonl', output_path)
+
+        errors = [[record['Error'] for record in output if record['table'] == 'Errors'] for output in outputs]
+        self.assertFalse(any('Divorce date' in error for error in errors[0]))
+        self.assertIn("ERROR: FAMILY: US01: @F1@: Divorce date 8 OCT 3000 occurs in the future", errors[1])
+        self.assertIn("(0 added, 1 changed, 0 removed records)", printed.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+import gedcom_batch
+from gedcom_batch import expand_paths, report_names, validate_files
+
+
+class TestBatchValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        os.makedirs(os.path.join(self.directory, 'in', 'late'))
+        shutil.copy('My-Family.ged', os.path.join(self.directory, 'in', 'family.ged'))
+        shutil.copy('Test_file.ged', os.path.join(self.directory, 'in', 'late', 'family.ged'))
+
+    def test_expand_directories_and_globs(self):
+        found = expand_paths([os.path.join(self.directory, 'in'), os.path.join(self.directory, 'in', '*.ged')])
+        self.assertEqual([os.path.relpath(path, self.directory) for path in found],
+                         [os.path.join('in', 'family.ged'), os.path.join('in', 'late', 'family.ged')])
+        self.assertEqual(report_names(found, '.csv'), ['family.csv', 'family-2.csv'])
+
+    def test_summary_adds_up_every_file(self):
+        paths = expand_paths([os.path.join(self.directory, 'in')]) + [os.path.join(self.directory, 'missing.ged')]
+        output_dir = os.path.join(self.directory, 'out')
+        summary = validate_files(paths, output_dir, 'jsonl', ['US01', 'US21'], date(2023, 12, 1).toordinal(), workers=2)
+
+        self.assertEqual((summary['files'], summary['files_with_errors'], summary['unreadable_files']), (3, 2, 1))
+        self.assertEqual(summary['errors_per_story'], {'US01': 1, 'US21': 1})
+        self.assertEqual([entry['report'] for entry in summary['results']], ['family.jsonl', 'family-2.jsonl', None])
+        with open(os.path.join(output_dir, 'family.jsonl')) as report:
+            errors = [record for record in map(json.loads, report) if record['table'] == 'Errors']
+        self.assertEqual([error['Story'] for error in errors], ['US21'])
+
+    def test_failing_file_does_not_stop_the_batch(self):
+        write_tables = gedcom_batch.write_tables
+
+        def failing_writer(writer, tables):
+            write_tables(writer, tables)
+            if writer.stream.name.endswith('family-2.jsonl'):
+                raise RuntimeError("writer broke")
+
+        paths = expand_paths([os.path.join(self.directory, 'in')]) + [os.path.join(self.directory, 'missing.ged')]
+        output_dir = os.path.join(self.directory, 'out')
+        # the workers are forked and inherit the patch
+        with mock.patch.object(gedcom_batch, 'write_tables', failing_writer):
+            summary = validate_files(paths, output_dir, 'jsonl', ['US01', 'US21'], date(2023, 12, 1).toordinal(), workers=2)
+
+        self.assertEqual((summary['unreadable_files'], summary['failed_files']), (1, 1))
+        self.assertEqual(summary['errors_per_story'], {'US01': 0, 'US21': 1})
+        failed = summary['results'][1]
+        self.assertEqual((failed['report'], failed['problem'], failed['failed']), (None, 'RuntimeError: writer broke', True))
+        self.assertEqual(os.listdir(output_dir), ['family.jsonl'])
+
+    def test_errors_only_reports(self):
+        paths = expand_paths([os.path.join(self.directory, 'in')])
+        output_dir = os.path.join(self.directory, 'out')
+        as_of = date(2023, 12, 1).toordinal()
+        full = validate_files(paths, output_dir, 'jsonl', ['US01', 'US21'], as_of, workers=1)
+        projected = validate_files(paths, output_dir, 'jsonl', ['US01', 'US21'], as_of, workers=1, errors_only=True)
+        self.assertEqual(projected, full)
+        with open(os.path.join(output_dir, 'family.jsonl')) as report:
+            self.assertEqual({record['table'] for record in map(json.loads, report)}, {'Errors'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+import gedcom_cache
+from gedcom_cache import load_tree, snapshot_path
+from gedcom_parser import load_gedcom
+from gedcom_rules import Tree, run_rules
+
+AS_OF = date(2023, 12, 1).toordinal()
+
+
+class TestSnapshotCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'family.ged')
+        shutil.copy('My-Family.ged', self.path)
+        self.cache_dir = os.path.join(self.directory, 'cache')
+
+    def test_second_load_reads_the_snapshot(self):
+        tree, cached = load_tree(self.path, AS_OF, self.cache_dir)
+        self.assertFalse(cached)
+        self.assertTrue(os.path.exists(snapshot_path(self.path, self.cache_dir)))
+
+        tree, cached = load_tree(self.path, AS_OF, self.cache_dir)
+        self.assertTrue(cached)
+        self.assertIn('lineage', vars(tree))
+        parsed = Tree(*load_gedcom(self.path, AS_OF), AS_OF)
+        self.assertEqual(run_rules(tree), run_rules(parsed))
+
+    def test_ages_follow_the_as_of_date(self):
+        load_tree(self.path, AS_OF, self.cache_dir)
+        later = date(2043, 12, 1).toordinal()
+        tree, cached = load_tree(self.path, later, self.cache_dir)
+        self.assertTrue(cached)
+        parsed, families = load_gedcom(self.path, later)
+        self.assertEqual([individual.age for individual in tree.individuals.values()],
+                         [individual.age for individual in parsed.values()])
+
+    def test_changed_file_is_parsed_again(self):
+        load_tree(self.path, AS_OF, self.cache_dir)
+        with open(self.path, 'a') as gedcom:
+            gedcom.write("0 @I999@ INDI\n1 NAME New /Person/\n")
+        tree, cached = load_tree(self.path, AS_OF, self.cache_dir)
+        self.assertFalse(cached)
+        self.assertIn('@I999@', tree.individuals)
+
+    def test_broken_snapshot_is_replaced(self):
+        os.makedirs(self.cache_dir)
+        with open(snapshot_path(self.path, self.cache_dir), 'wb') as snapshot:
+            snapshot.write(b'not a pickle')
+        self.assertFalse(load_tree(self.path, AS_OF, self.cache_dir)[1])
+        self.assertTrue(load_tree(self.path, AS_OF, self.cache_dir)[1])
+
+    def test_unreadable_snapshot_is_a_miss_and_deleted(self):
+        os.makedirs(self.cache_dir)
+        snapshot = snapshot_path(self.path, self.cache_dir)
+        # a class that no longer exists makes pickle raise AttributeError
+        with open(snapshot, 'wb') as output:
+            output.write(b'cgedcom_model\nRemovedRecord\n.')
+        with mock.patch.object(gedcom_cache, 'save_snapshot'):
+            self.assertFalse(load_tree(self.path, AS_OF, self.cache_dir)[1])
+        self.assertFalse(os.path.exists(snapshot))
+
+    def test_snapshot_version_is_part_of_the_key(self):
+        load_tree(self.path, AS_OF, self.cache_dir)
+        with mock.patch.object(gedcom_cache, 'SNAPSHOT_VERSION', gedcom_cache.SNAPSHOT_VERSION + 1):
+            self.assertFalse(load_tree(self.path, AS_OF, self.cache_dir)[1])
+            self.assertTrue(load_tree(self.path, AS_OF, self.cache_dir)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import subprocess
+import sys
+import unittest
+from datetime import date
+from gedcom_columns import numpy, individual_dates_after_today, death_before_birth, older_than_150
+from gedcom_parser import load_gedcom
+from gedcom_rules import Tree, run_rules
+
+GEDCOM_LINES = [
+    "0 @I1@ INDI",
+    "1 BIRT",
+    "2 DATE 1 JAN 1950",
+    "1 DEAT",
+    "2 DATE 1 JAN 1940",
+    "0 @I2@ INDI",
+    "1 BIRT",
+    "2 DATE 1 MAR 1700",
+    "0 @I3@ INDI",
+    "1 BIRT",
+    "2 DATE 1 JAN 3000",
+    "0 @I4@ INDI",
+    "1 DEAT",
+    "0 @F1@ FAM",
+    "1 HUSB @I1@",
+    "1 MARR",
+    "2 DATE 1 JAN 2990",
+]
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestDateColumns(unittest.TestCase):
+
+    def setUp(self):
+        individuals, families = load_gedcom(GEDCOM_LINES)
+        self.tree = Tree(individuals, families)
+
+    def test_missing_dates_are_masked(self):
+        columns = self.tree.columns
+        self.assertEqual(columns.has_birth.tolist(), [True, True, True, False])
+        self.assertEqual(columns.has_death.tolist(), [True, False, False, False])
+        self.assertEqual(columns.alive.tolist(), [False, True, True, False])
+        self.assertEqual(columns.has_divorce.tolist(), [False])
+
+    def test_ages_are_the_records_own(self):
+        # parsed in 1840, validated as of 2023: US07 reads the parse-time ages in both modes
+        individuals, families = load_gedcom(GEDCOM_LINES, date(1840, 1, 1).toordinal())
+        tree = Tree(individuals, families, date(2023, 12, 1).toordinal())
+        self.assertEqual(tree.columns.age.tolist()[:2], [-10, 139])
+        self.assertEqual(run_rules(tree, ['US07'], vectorized=True), run_rules(tree, ['US07']))
+        self.assertEqual(tree.columns.violating_ids(older_than_150(tree.columns, tree)), [])
+
+    def test_kernels_find_violating_ids(self):
+        columns = self.tree.columns
+        self.assertEqual(columns.violating_ids(individual_dates_after_today(columns, self.tree)), ['@I3@'])
+        self.assertEqual(columns.violating_ids(death_before_birth(columns, self.tree)), ['@I1@'])
+        self.assertEqual(columns.violating_ids(older_than_150(columns, self.tree)), ['@I2@'])
+
+    def test_vectorized_run_matches_python_run(self):
+        for tree in [self.tree, Tree(*load_gedcom('My-Family.ged'))]:
+            self.assertEqual(run_rules(tree, vectorized=True), run_rules(tree))
+        self.assertEqual([story for story, message in run_rules(self.tree, ['US01', 'US03', 'US07'], vectorized=True)],
+                         ['US03', 'US07', 'US01', 'US01'])
+
+    def test_rules_import_numpy_only_when_vectorized(self):
+        code = "import sys, gedcom_rules; print('numpy' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+
+if __name__ == '__main__':
+    unittest.main()
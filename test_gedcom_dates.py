@@ -0,0 +1,64 @@
+import unittest
+from datetime import date
+from gedcom_dates import parse_date, date_day
+from gedcom_parser import load_gedcom
+
+
+def day(year, month, day_of_month):
+    return date(year, month, day_of_month).toordinal()
+
+
+class TestGedcomDates(unittest.TestCase):
+
+    def test_exact_and_partial_dates(self):
+        self.assertEqual(parse_date('12 JUN 1998'), (day(1998, 6, 12), day(1998, 6, 12)))
+        self.assertEqual(parse_date('Feb 2000'), (day(2000, 2, 1), day(2000, 2, 29)))
+        self.assertEqual(parse_date('1850'), (day(1850, 1, 1), day(1850, 12, 31)))
+        self.assertEqual(parse_date('@#DGREGORIAN@ 1 JAN 1900'), (day(1900, 1, 1), day(1900, 1, 1)))
+        self.assertEqual(parse_date('1749/50'), (day(1750, 1, 1), day(1750, 12, 31)))
+
+    def test_qualified_dates_and_periods(self):
+        self.assertEqual(parse_date('ABT 1850'), parse_date('1850'))
+        self.assertEqual(parse_date('INT 3 MAR 1901 (from the register)'), parse_date('3 MAR 1901'))
+        self.assertEqual(parse_date('BEF 1900'), (None, day(1899, 12, 31)))
+        self.assertEqual(parse_date('AFT MAR 1901'), (day(1901, 4, 1), None))
+        self.assertEqual(parse_date('BET 1850 AND JUN 1860'), (day(1850, 1, 1), day(1860, 6, 30)))
+        self.assertEqual(parse_date('FROM 1900 TO 1910'), (day(1900, 1, 1), day(1910, 12, 31)))
+        self.assertEqual(parse_date('FROM 1900'), (day(1900, 1, 1), None))
+
+    def test_unplaceable_dates(self):
+        for text in ['', '31 FEB 1900', '1 FOO 1900', 'BET 1850', '(about the war)', '@#DJULIAN@ 1 JAN 1700', '44 BC']:
+            self.assertIsNone(parse_date(text), text)
+
+    def test_calendar_edges(self):
+        self.assertIsNone(parse_date('BEF 1'))
+        self.assertIsNone(parse_date('BEF JAN 1'))
+        self.assertIsNone(parse_date('AFT 9999'))
+        self.assertIsNone(parse_date('AFT 31 DEC 9999'))
+        self.assertEqual(parse_date('BEF 2'), (None, day(1, 12, 31)))
+        self.assertEqual(parse_date('DEC 9999'), (day(9999, 12, 1), day(9999, 12, 31)))
+        self.assertEqual(parse_date('AFT NOV 9999'), (day(9999, 12, 1), None))
+
+    def test_edge_dates_load(self):
+        individuals, families = load_gedcom(["0 @I1@ INDI", "1 BIRT", "2 DATE BEF 1",
+                                             "0 @I2@ INDI", "1 BIRT", "2 DATE 1 JAN 1900", "1 DEAT", "2 DATE AFT 9999",
+                                             "0 @F1@ FAM", "1 HUSB @I1@", "1 MARR", "2 DATE AFT 9999"])
+        self.assertIsNone(individuals['@I1@'].birth)
+        self.assertEqual(individuals['@I1@'].birth_date, 'BEF 1')
+        self.assertIsNone(individuals['@I2@'].death)
+        self.assertIsNone(families['@F1@'].married)
+
+    def test_comparison_day(self):
+        self.assertEqual(date_day('ABT 1850'), day(1850, 1, 1))
+        self.assertEqual(date_day('BEF 1900'), day(1899, 12, 31))
+        self.assertIsNone(date_day('unknown'))
+
+    def test_partial_dates_load(self):
+        individuals, families = load_gedcom(["0 @I1@ INDI", "1 BIRT", "2 DATE ABT 1850", "1 DEAT", "2 DATE BEF 1900"])
+        self.assertEqual(individuals['@I1@'].birth, day(1850, 1, 1))
+        self.assertEqual(individuals['@I1@'].birth_date, 'ABT 1850')
+        self.assertEqual(individuals['@I1@'].age, 49)
+
+
+if __name__ == '__main__':
+    unittest.main()
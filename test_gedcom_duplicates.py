@@ -0,0 +1,66 @@
+import unittest
+from gedcom_duplicates import THRESHOLD, soundex, candidate_pairs, can_reach, similarity, find_duplicates, duplicate_clusters
+from gedcom_parser import load_gedcom
+from gedcom_rules import Tree, run_rules
+from gedcom_synth import generate_tree
+
+
+def person_lines(xref, name, birth_date):
+    return [f"0 {xref} INDI", f"1 NAME {name}", "1 BIRT", f"2 DATE {birth_date}"]
+
+GEDCOM_LINES = (
+    person_lines("@I1@", "Raj /Palival/", "21 FEB 1998")
+    + person_lines("@I2@", "Ravi /Palival/", "30 DEC 1998")
+    + person_lines("@I13@", "Raj /Paliwal/", "21 FEB 1998")
+    + person_lines("@I14@", "Raj /Palival/", "22 FEB 1998")
+    + person_lines("@I20@", "Santosh /Rawal/", "24 OCT 1970")
+    + person_lines("@I21@", "Santosh /Rawal/", "24 OCT 1970")
+)
+
+
+class TestDuplicates(unittest.TestCase):
+
+    def setUp(self):
+        self.individuals, families = load_gedcom(GEDCOM_LINES)
+
+    def test_soundex(self):
+        codes = [soundex(name) for name in ['Robert', 'Rupert', 'Ashcraft', 'Tymczak', 'Pfister', 'Lee', '']]
+        self.assertEqual(codes, ['R163', 'R163', 'A261', 'T522', 'P236', 'L000', ''])
+
+    def test_near_matches_ranked_by_later_record(self):
+        found = [(first, second) for score, first, second in find_duplicates(self.individuals)]
+        # siblings born in the same year with different names are not duplicates
+        self.assertEqual(found, [('@I1@', '@I13@'), ('@I1@', '@I14@'), ('@I20@', '@I21@')])
+
+    def test_clusters(self):
+        clusters = duplicate_clusters(find_duplicates(self.individuals))
+        self.assertEqual(clusters[0], (1.0, ['@I20@', '@I21@']))
+        # @I13@ and @I14@ share no block but are linked through @I1@
+        self.assertEqual(clusters[1][1], ['@I1@', '@I13@', '@I14@'])
+
+    def test_big_blocks_use_a_window(self):
+        lines = []
+        for number in range(300):
+            lines += person_lines(f"@I{number}@", f"Name{number:03d} /Palival/", "1 JAN 1900")
+        individuals, families = load_gedcom(lines)
+        self.assertEqual(len(candidate_pairs(individuals, max_block=1000)), 300 * 299 // 2)
+        self.assertEqual(len(candidate_pairs(individuals, max_block=100, window=5)), 300 * 5 - 15)
+
+    def test_prefilter_keeps_every_match(self):
+        individuals, families = generate_tree(3000, seed=1, violations={'US23': 5})
+        records = list(individuals.values())
+        pairs = [(records[first], records[second]) for first, second in candidate_pairs(individuals)]
+        matches = [pair for pair in pairs if similarity(*pair) >= THRESHOLD]
+        self.assertTrue(matches)
+        self.assertTrue(all(can_reach(*pair, THRESHOLD) for pair in matches))
+        self.assertLess(sum(can_reach(*pair, THRESHOLD) for pair in pairs), len(pairs) / 2)
+
+    def test_us23_messages(self):
+        messages = [message for story, message in run_rules(Tree(self.individuals, {}), ['US23'])]
+        self.assertEqual(messages[0], "ERROR: INDIVIDUAL: US23: @I21@ and @I20@: Have the same name and birth date Santosh /Rawal/ - 24 OCT 1970")
+        self.assertIn("ERROR: INDIVIDUAL: US23: @I13@ and @I1@: Possible duplicates Raj /Paliwal/ - 21 FEB 1998 and Raj /Palival/ - 21 FEB 1998 (score 0.95)", messages)
+        self.assertEqual(len(messages), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from gedcom_incremental import IncrementalValidator
+from gedcom_parser import load_gedcom
+from gedcom_rules import Tree, run_rules
+from gedcom_synth import INJECTIONS, gedcom_lines, generate_tree
+
+AS_OF = date(2023, 12, 1).toordinal()
+
+
+class TestIncrementalValidator(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'family.ged')
+        with open('My-Family.ged') as original:
+            self.lines = original.read().splitlines()
+        self.validator = IncrementalValidator(as_of=AS_OF)
+
+    def save(self):
+        with open(self.path, 'w') as gedcom:
+            gedcom.write("\n".join(self.lines) + "\n")
+
+    def check(self):
+        """Update the validator and compare with a full run over the file."""
+        self.save()
+        errors = self.validator.update(self.path)
+        self.assertEqual(errors, run_rules(Tree(*load_gedcom(self.path, AS_OF), AS_OF)))
+        return self.validator.last_update
+
+    def record_start(self, xref, tag):
+        return self.lines.index(f"0 {xref} {tag}")
+
+    def test_first_update_checks_everything(self):
+        update = self.check()
+        self.assertEqual(update['added'], len(self.validator.tree.individuals) + len(self.validator.tree.families))
+        self.assertEqual(update['individuals_checked'], len(self.validator.tree.individuals))
+
+    def test_unchanged_file_checks_nothing(self):
+        self.check()
+        update = self.check()
+        self.assertEqual((update['changed'], update['individuals_checked'], update['families_checked']), (0, 0, 0))
+
+    def test_changed_date_rechecks_the_individual_and_their_families(self):
+        self.check()
+        individual_id = next(iter(self.validator.tree.individuals))
+        start = self.record_start(individual_id, 'INDI')
+        date_line = next(number for number in range(start + 1, len(self.lines)) if self.lines[number].startswith('2 DATE'))
+        self.lines[date_line] = "2 DATE 1 JAN 2999"
+        update = self.check()
+        self.assertEqual((update['changed'], update['individuals_checked']), (1, 1))
+        index = self.validator.tree.index
+        self.assertEqual(update['families_checked'], len(set(index.fams(individual_id)) | set(index.famc(individual_id))))
+
+    def test_new_marriage_rechecks_descendant_families(self):
+        self.check()
+        tree = self.validator.tree
+        # marry a founder to someone further down the tree
+        founder = next(individual_id for individual_id in tree.individuals
+                       if not tree.index.famc(individual_id) and tree.index.children_of(individual_id))
+        descendant = tree.index.children_of(founder)[0]
+        self.lines[-1:-1] = ["0 @F900@ FAM", f"1 HUSB {founder}", f"1 WIFE {descendant}"]
+        update = self.check()
+        self.assertEqual(update['added'], 1)
+        self.assertTrue(any(story == 'US17' for story, message in self.validator.errors()))
+
+    def test_removed_records(self):
+        self.check()
+        family_id = next(iter(self.validator.tree.families))
+        start = self.record_start(family_id, 'FAM')
+        end = next(number for number in range(start + 1, len(self.lines)) if self.lines[number].startswith('0 '))
+        del self.lines[start:end]
+        individual_id = list(self.validator.tree.individuals)[-1]
+        start = self.record_start(individual_id, 'INDI')
+        end = next(number for number in range(start + 1, len(self.lines)) if self.lines[number].startswith('0 '))
+        del self.lines[start:end]
+        self.assertEqual(self.check()['removed'], 2)
+
+    def test_random_edits_on_a_synthetic_tree(self):
+        self.lines = list(gedcom_lines(*generate_tree(600, seed=4, violations=dict.fromkeys(INJECTIONS, 1))))
+        self.check()
+        shuffle = random.Random(4)
+        for round in range(10):
+            for edit in range(3):
+                number = shuffle.randrange(len(self.lines))
+                line = self.lines[number]
+                if line.startswith('2 DATE'):
+                    self.lines[number] = f"2 DATE {shuffle.randint(1, 28)} JAN {shuffle.randint(1800, 2030)}"
+                elif line.startswith(('1 CHIL', '1 HUSB', '1 WIFE')):
+                    del self.lines[number]
+                elif line.startswith('1 NAME'):
+                    self.lines[number] = "1 NAME Same /Person/"
+            self.check()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from gedcom_index import FamilyIndex, Relationships
+from gedcom_parser import load_gedcom
+
+
+GEDCOM_LINES = [
+    "0 @I1@ INDI",
+    "0 @I2@ INDI",
+    "0 @I3@ INDI",
+    "0 @I4@ INDI",
+    "0 @I5@ INDI",
+    "0 @I6@ INDI",
+    "0 @F1@ FAM",
+    "1 HUSB @I1@",
+    "1 WIFE @I2@",
+    "1 CHIL @I3@",
+    "1 CHIL @I4@",
+    "0 @F2@ FAM",
+    "1 HUSB @I3@",
+    "1 WIFE @I5@",
+    "0 @F3@ FAM",
+    "1 WIFE @I5@",
+    "0 @F4@ FAM",
+    "1 HUSB @I1@",
+    "1 CHIL @I5@",
+    "0 @F5@ FAM",
+    "1 HUSB @I4@",
+    "1 WIFE @I5@",
+]
+
+
+class TestFamilyIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.individuals, self.families = load_gedcom(GEDCOM_LINES)
+        self.index = FamilyIndex(self.families)
+
+    def test_person_to_families(self):
+        self.assertEqual(list(self.index.fams('@I5@')), ['@F2@', '@F3@', '@F5@'])
+        self.assertEqual(list(self.index.famc('@I3@')), ['@F1@'])
+        self.assertEqual(list(self.index.fams('@I4@')), ['@F5@'])
+
+    def test_family_to_people(self):
+        self.assertEqual(self.index.spouses('@F3@'), ('@I5@',))
+        self.assertEqual(self.index.children('@F1@'), ('@I3@', '@I4@'))
+
+    def test_derived_relations(self):
+        self.assertEqual(list(self.index.partners('@I5@')), [('@F2@', '@I3@'), ('@F3@', None), ('@F5@', '@I4@')])
+        self.assertEqual(self.index.children_of('@I2@'), ['@I3@', '@I4@'])
+        self.assertEqual(self.index.parents_of('@I4@'), ['@I1@', '@I2@'])
+        self.assertTrue(self.index.is_married('@I3@'))
+        self.assertFalse(self.index.is_married('@I6@'))
+
+
+class TestRelationships(unittest.TestCase):
+
+    def setUp(self):
+        individuals, families = load_gedcom(GEDCOM_LINES)
+        self.relationships = Relationships(FamilyIndex(families))
+
+    def test_spouses(self):
+        self.assertEqual(self.relationships.spouses('@I5@'), ['@I3@', '@I4@'])
+        self.assertEqual(self.relationships.spouses('@I2@'), ['@I1@'])
+
+    def test_siblings_include_half_siblings(self):
+        self.assertEqual(self.relationships.siblings('@I3@'), ['@I4@'])
+        self.assertEqual(self.relationships.siblings('@I5@'), [])
+        self.assertTrue(self.relationships.are_siblings('@I4@', '@I3@'))
+        self.assertFalse(self.relationships.are_siblings('@I4@', '@I5@'))
+        self.assertFalse(self.relationships.are_siblings('@I4@', '@I4@'))
+
+
+if __name__ == '__main__':
+    unittest.main()
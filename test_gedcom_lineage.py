@@ -0,0 +1,139 @@
+import random
+import unittest
+from gedcom_index import FamilyIndex
+from gedcom_lineage import LineageIndex, KinshipIndex
+from gedcom_parser import load_gedcom
+
+
+def family_lines(family_id, husband=None, wife=None, children=()):
+    lines = [f"0 {family_id} FAM"]
+    if husband:
+        lines.append(f"1 HUSB {husband}")
+    if wife:
+        lines.append(f"1 WIFE {wife}")
+    lines.extend(f"1 CHIL {child}" for child in children)
+    return lines
+
+
+def build_lineage(lines):
+    individuals, families = load_gedcom(lines)
+    return LineageIndex(FamilyIndex(families))
+
+
+class TestLineageIndex(unittest.TestCase):
+
+    def test_descendants_through_both_parents(self):
+        # @I1@ + @I2@ -> @I3@; @I3@ + @I4@ -> @I5@; @I6@ + @I7@ -> @I4@
+        lineage = build_lineage(
+            family_lines("@F1@", "@I1@", "@I2@", ["@I3@"])
+            + family_lines("@F2@", "@I3@", "@I4@", ["@I5@"])
+            + family_lines("@F3@", "@I6@", "@I7@", ["@I4@"])
+        )
+        for ancestor in ["@I1@", "@I2@", "@I3@", "@I4@", "@I6@", "@I7@"]:
+            self.assertTrue(lineage.is_descendant("@I5@", ancestor), ancestor)
+        self.assertTrue(lineage.is_ancestor("@I7@", "@I4@"))
+        self.assertFalse(lineage.is_descendant("@I3@", "@I6@"))
+        self.assertFalse(lineage.is_descendant("@I1@", "@I5@"))
+        self.assertFalse(lineage.is_descendant("@I5@", "@I5@"))
+        self.assertFalse(lineage.is_descendant("@I5@", "@I99@"))
+
+    def test_later_children_are_followed(self):
+        lineage = build_lineage(
+            family_lines("@F1@", "@I1@", "@I2@", ["@I3@", "@I4@", "@I5@"])
+            + family_lines("@F2@", "@I5@", None, ["@I6@"])
+        )
+        self.assertTrue(lineage.is_descendant("@I6@", "@I1@"))
+        self.assertFalse(lineage.is_descendant("@I6@", "@I4@"))
+
+    def test_deep_pedigree_does_not_recurse(self):
+        lines = []
+        for generation in range(5000):
+            lines += family_lines(f"@F{generation}@", f"@I{generation}@", None, [f"@I{generation + 1}@"])
+        lineage = build_lineage(lines)
+        self.assertTrue(lineage.is_descendant("@I5000@", "@I0@"))
+        self.assertFalse(lineage.is_descendant("@I0@", "@I5000@"))
+
+    def test_cycles_in_bad_data_do_not_hang(self):
+        lineage = build_lineage(
+            family_lines("@F1@", "@I1@", "@I2@", ["@I2@", "@I3@"])
+        )
+        self.assertTrue(lineage.is_descendant("@I3@", "@I1@"))
+        self.assertTrue(lineage.is_descendant("@I2@", "@I1@"))
+
+    def test_pedigree_collapse_matches_a_walk(self):
+        # every generation marries within the one before, so descendants are
+        # scattered over the numbering and the interval lists hit the cap
+        rng = random.Random(7)
+        lines, children, generation = [], {}, [f"@I{i}@" for i in range(40)]
+        for depth in range(8):
+            couples = [rng.sample(generation, 2) for i in range(20)]
+            born = [f"@I{depth}_{i}@" for i in range(40)]
+            for number, (husband, wife) in enumerate(couples):
+                family = born[number::20]
+                lines += family_lines(f"@F{depth}_{number}@", husband, wife, family)
+                for parent in (husband, wife):
+                    children.setdefault(parent, []).extend(family)
+            generation = born
+        lineage = LineageIndex(FamilyIndex(load_gedcom(lines)[1]), max_intervals=4)
+        self.assertTrue(lineage.bits)
+
+        for ancestor in rng.sample(sorted(children), 40):
+            descendants, stack = set(), list(children[ancestor])
+            while stack:
+                person = stack.pop()
+                if person not in descendants:
+                    descendants.add(person)
+                    stack.extend(children.get(person, ()))
+            for person in lineage.post:
+                self.assertEqual(lineage.is_descendant(person, ancestor), person in descendants, (person, ancestor))
+
+
+
+class TestKinshipIndex(unittest.TestCase):
+
+    def setUp(self):
+        # grandparents @G1@ + @G2@ have children @P1@, @P2@ and @P3@;
+        # @P1@ -> @C1@, @P2@ -> @C2@, @P3@ is a half-sibling through @G1@ only
+        lines = (
+            family_lines("@F1@", "@G1@", "@G2@", ["@P1@", "@P2@"])
+            + family_lines("@F2@", "@G1@", "@G3@", ["@P3@"])
+            + family_lines("@F3@", "@P1@", "@S1@", ["@C1@"])
+            + family_lines("@F4@", "@S2@", "@P2@", ["@C2@"])
+            + family_lines("@F5@", "@C1@", None, ["@D1@"])
+        )
+        individuals, families = load_gedcom(lines)
+        self.kinship = KinshipIndex(FamilyIndex(families))
+
+    def test_degrees(self):
+        self.assertEqual(self.kinship.kinship("@P1@", "@P2@"), (1, 1))
+        self.assertEqual(self.kinship.kinship("@C1@", "@C2@"), (2, 2))
+        self.assertEqual(self.kinship.kinship("@P3@", "@C2@"), (1, 2))
+        self.assertEqual(self.kinship.kinship("@G1@", "@C1@"), (0, 2))
+        self.assertIsNone(self.kinship.kinship("@S1@", "@S2@"))
+        # great-grandparent is beyond the default two generations
+        self.assertIsNone(self.kinship.kinship("@D1@", "@C2@"))
+
+    def test_marriage_checks(self):
+        self.assertTrue(self.kinship.are_first_cousins("@C2@", "@C1@"))
+        self.assertFalse(self.kinship.are_first_cousins("@P1@", "@P2@"))
+        self.assertTrue(self.kinship.is_aunt_or_uncle("@P2@", "@C1@"))
+        self.assertTrue(self.kinship.is_aunt_or_uncle("@P3@", "@C1@"))
+        self.assertFalse(self.kinship.is_aunt_or_uncle("@C1@", "@P2@"))
+        self.assertFalse(self.kinship.is_aunt_or_uncle("@P1@", "@C1@"))
+
+    def test_pedigree_collapse(self):
+        # @C1@ and @C2@ (first cousins) have a child together
+        lines = (
+            family_lines("@F1@", "@G1@", "@G2@", ["@P1@", "@P2@"])
+            + family_lines("@F2@", "@P1@", None, ["@C1@"])
+            + family_lines("@F3@", None, "@P2@", ["@C2@"])
+            + family_lines("@F4@", "@C1@", "@C2@", ["@K1@"])
+        )
+        individuals, families = load_gedcom(lines)
+        kinship = KinshipIndex(FamilyIndex(families), max_generations=3)
+        self.assertEqual(kinship.ancestors("@K1@")["@G1@"], 3)
+        self.assertEqual(kinship.ancestors("@K1@")["@P2@"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import io
+import random
+import threading
+import time
+import unittest
+from collections import Counter
+from datetime import date
+from gedcom_parser import load_gedcom
+from gedcom_pipeline import pipelined_records, run_pipeline
+from gedcom_rules import RULES, Tree, run_rules
+from gedcom_synth import INJECTIONS, gedcom_lines, generate_tree
+
+AS_OF = date(2023, 12, 1).toordinal()
+
+
+class CountingReads(io.BytesIO):
+    """A file object that counts how much has been read from it."""
+
+    def __init__(self, data, fail_after=None):
+        super().__init__(data)
+        self.blocks = 0
+        self.fail_after = fail_after
+
+    def read(self, size=-1):
+        self.blocks += 1
+        if self.fail_after is not None and self.blocks > self.fail_after:
+            raise OSError("connection reset")
+        return super().read(size)
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = list(gedcom_lines(*generate_tree(500, seed=5, violations=dict.fromkeys(INJECTIONS, 1))))
+        self.data = ("\n".join(self.lines) + "\n").encode()
+        self.threads = threading.active_count()
+
+    def test_same_records_and_errors_as_a_batch_run(self):
+        tree, errors = run_pipeline(io.BytesIO(self.data), ['US01', 'US07', 'US08', 'US17'], AS_OF, block_size=1000, batch_size=7)
+        individuals, families = load_gedcom(self.lines, AS_OF)
+        self.assertEqual(list(tree.individuals), list(individuals))
+        self.assertEqual(list(tree.families), list(families))
+        self.assertEqual(Counter(errors), Counter(run_rules(Tree(individuals, families, AS_OF), ['US01', 'US07', 'US08', 'US17'])))
+
+    def test_errors_in_run_rules_order_on_shuffled_records(self):
+        records = []
+        for line in self.lines:
+            if line.startswith('0 '):
+                records.append([])
+            records[-1].append(line)
+        head, *body, trailer = records
+        random.Random(3).shuffle(body)
+        lines = [line for record in [head, *body, trailer] for line in record]
+        self.assertNotEqual(lines, self.lines)
+
+        data = ("\n".join(lines) + "\n").encode()
+        tree, errors = run_pipeline(io.BytesIO(data), list(RULES), AS_OF, block_size=1000)
+        expected = run_rules(Tree(*load_gedcom(lines, AS_OF), AS_OF))
+        self.assertGreater(len(expected), len(INJECTIONS))
+        self.assertEqual(errors, expected)
+
+    def test_file_path(self):
+        tree, errors = run_pipeline('My-Family.ged', as_of=AS_OF)
+        self.assertEqual(len(errors), len(run_rules(Tree(*load_gedcom('My-Family.ged', AS_OF), AS_OF))) + 1)
+
+    def test_reading_waits_for_a_slow_consumer(self):
+        source = CountingReads(self.data)
+        records = pipelined_records(source, AS_OF, block_size=100, queue_size=2, batch_size=1)
+        next(records)
+        time.sleep(0.3)
+        # two queues of two items, one item in each stage and the one taken
+        self.assertLessEqual(source.blocks, 10)
+        records.close()
+        self.assertEqual(threading.active_count(), self.threads)
+
+    def test_read_errors_reach_the_caller(self):
+        with self.assertRaises(OSError):
+            run_pipeline(CountingReads(self.data, fail_after=3), as_of=AS_OF, block_size=100)
+        self.assertEqual(threading.active_count(), self.threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
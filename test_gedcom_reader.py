@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from gedcom_reader import LineSplitter, split_gedcom_line, split_record, split_records, iter_gedcom_lines, iter_gedcom_text
+
+
+class TestGedcomReader(unittest.TestCase):
+
+    def write_file(self, data):
+        handle, path = tempfile.mkstemp(suffix='.ged')
+        with os.fdopen(handle, 'wb') as gedcomfile:
+            gedcomfile.write(data)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_split_record_line(self):
+        self.assertEqual(split_gedcom_line(b'0 @I1@ INDI'), (0, b'@I1@', b'INDI', b''))
+        self.assertEqual(split_gedcom_line(b'1 NAME Raj /Palival/'), (1, None, b'NAME', b'Raj /Palival/'))
+        self.assertEqual(split_gedcom_line(b'1 BIRT'), (1, None, b'BIRT', b''))
+        self.assertIsNone(split_gedcom_line(b''))
+        self.assertIsNone(split_gedcom_line(b'NAME only'))
+
+    def test_mapped_file_matches_text_lines(self):
+        text = '﻿0 @I1@ INDI\r\n1 NAME José /Núñez/\r\n1 BIRT\r\n2 DATE 1 JAN 1900\r\n\r\n0 TRLR'
+        path = self.write_file(text.encode('utf-8'))
+        mapped = list(iter_gedcom_lines(path))
+        self.assertEqual(mapped, list(iter_gedcom_text(text.split('\r\n'))))
+        self.assertEqual(mapped[1][3].decode('utf-8'), 'José /Núñez/')
+        self.assertEqual(mapped[-1], (0, None, b'TRLR', b''))
+
+    def test_records_hold_their_lines(self):
+        data = b'\xef\xbb\xbf0 HEAD\r\n0 @I1@ INDI\r\n1 NAME A /B/\r\n0 @F1@ FAM\r\n1 HUSB @I1@\r\n0 TRLR'
+        records = list(split_records(data))
+        self.assertEqual([(offset, xref, tag) for offset, xref, tag, record in records],
+                         [(3, None, b'HEAD'), (11, b'@I1@', b'INDI'), (38, b'@F1@', b'FAM'), (63, None, b'TRLR')])
+        path = self.write_file(data)
+        self.assertEqual([line for offset, xref, tag, record in records for line in split_record(record)], list(iter_gedcom_lines(path)))
+        self.assertEqual([xref for offset, xref, tag, record in split_records(data, 11, 63)], [b'@I1@', b'@F1@'])
+
+    def test_blocks_cut_inside_lines(self):
+        data = b'\xef\xbb\xbf0 @I1@ INDI\r\n1 NAME A /B/\r\n\r\n1 BIRT\n2 DATE 1 JAN 1900'
+        path = self.write_file(data)
+        for size in (1, 2, 5, len(data)):
+            splitter = LineSplitter()
+            fields = [line for start in range(0, len(data), size) for line in splitter.feed(data[start:start + size])]
+            self.assertEqual(fields + splitter.close(), list(iter_gedcom_lines(path)))
+
+    def test_empty_file(self):
+        self.assertEqual(list(iter_gedcom_lines(self.write_file(b''))), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import io
+import json
+import unittest
+from gedcom_report import CsvWriter, JsonlWriter, TextWriter, write_tables
+
+
+TABLES = [
+    ("Individuals", ["ID", "Name", "Children"], [["@I1@", "Raj /Palival/", None], ["@I2@", "Santosh /Palival/", ["@I1@"]]]),
+    ("Errors", ["Error"], [["ERROR: FAMILY: US21: @F1@: @I1@ has the incorrect role in the family."]]),
+]
+
+
+def render(writer_class, tables=TABLES, **options):
+    stream = io.StringIO()
+    write_tables(writer_class(stream, **options), tables)
+    return stream.getvalue()
+
+
+class TestReportWriters(unittest.TestCase):
+
+    def test_csv_sections(self):
+        lines = render(CsvWriter).split('\n')
+        self.assertEqual(lines[:4], ["Individuals", "ID,Name,Children", "@I1@,Raj /Palival/,", "@I2@,Santosh /Palival/,['@I1@']"])
+        self.assertEqual(lines[5:7], ["Errors", "Error"])
+
+    def test_jsonl_rows_are_tagged_with_their_table(self):
+        records = [json.loads(line) for line in render(JsonlWriter).splitlines()]
+        self.assertEqual(records[0], {"table": "Individuals", "ID": "@I1@", "Name": "Raj /Palival/", "Children": None})
+        self.assertEqual(records[1]["Children"], ["@I1@"])
+        self.assertEqual(records[2]["table"], "Errors")
+
+    def test_text_columns_sized_on_the_sample(self):
+        rows = (["@I%d@" % number, "x" * number] for number in range(1, 6))
+        lines = render(TextWriter, [("Names", ["ID", "Name"], rows)], sample_size=2).splitlines()
+        self.assertEqual(lines[:3], ["Names:", "ID    Name", "----  ----"])
+        self.assertEqual(lines[3:5], ["@I1@  x", "@I2@  xx"])
+        # rows after the sample are streamed with the sampled widths
+        self.assertEqual(lines[7], "@I5@  xxxxx")
+
+    def test_text_writes_short_tables_on_close(self):
+        lines = render(TextWriter).splitlines()
+        self.assertEqual(lines[0], "Individuals:")
+        self.assertEqual(lines[1], "ID    Name               Children")
+        self.assertEqual(lines[5], "")
+        self.assertEqual(lines[6], "Errors:")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+from unittest import mock
+from datetime import date
+from gedcom_columns import numpy
+from gedcom_parser import load_gedcom
+from gedcom_rules import RULES, Tree, rule, rule_fields, run_rules, run_rules_parallel, group_errors, select_rules
+
+
+GEDCOM_LINES = [
+    "0 @I1@ INDI",
+    "1 NAME Tom /Smith/",
+    "1 SEX M",
+    "1 BIRT",
+    "2 DATE 1 JAN 1950",
+    "1 DEAT",
+    "2 DATE 1 JAN 1940",
+    "0 @I2@ INDI",
+    "1 NAME Ann /Smith/",
+    "1 SEX F",
+    "1 BIRT",
+    "2 DATE 1 JAN 1960",
+    "0 @I3@ INDI",
+    "1 NAME Bob /Jones/",
+    "1 SEX M",
+    "1 BIRT",
+    "2 DATE 1 JAN 3000",
+    "0 @F1@ FAM",
+    "1 HUSB @I1@",
+    "1 WIFE @I2@",
+    "1 CHIL @I3@",
+    "1 MARR",
+    "2 DATE 1 JAN 1970",
+    "1 DIV",
+    "2 DATE 1 JAN 1965",
+]
+
+
+class TestRuleRegistry(unittest.TestCase):
+
+    def setUp(self):
+        individuals, families = load_gedcom(GEDCOM_LINES)
+        self.tree = Tree(individuals, families, today=date(2020, 1, 1).toordinal())
+
+    def test_rules_declare_scope_and_fields(self):
+        for rules in RULES.values():
+            for registered in rules:
+                self.assertIn(registered.scope, ('individual', 'family', 'marriage', 'global'))
+                self.assertIsInstance(registered.fields, tuple)
+        self.assertEqual([r.scope for r in select_rules(['US01'])], ['individual', 'family'])
+
+    def test_selected_stories_only(self):
+        errors = run_rules(self.tree, ['US03', 'US04', 'US16'])
+        # family rules run before marriage rules on each family
+        self.assertEqual([story for story, message in errors], ['US03', 'US16', 'US04'])
+        self.assertIn("@I1@: Birth date 1 JAN 1950 occurs after death date 1 JAN 1940", errors[0][1])
+
+    def test_group_errors_keeps_empty_stories(self):
+        stories = ['US01', 'US21']
+        grouped = group_errors(run_rules(self.tree, stories), stories)
+        self.assertEqual(list(grouped), stories)
+        self.assertEqual(grouped['US21'], [])
+        self.assertEqual(len(grouped['US01']), 1)
+
+    def test_each_record_visited_once_per_scope(self):
+        visits = []
+        try:
+            rule('TEST1', 'individual')(lambda tree, individual: visits.append(('a', individual.id)) or ())
+            rule('TEST2', 'individual')(lambda tree, individual: visits.append(('b', individual.id)) or ())
+            run_rules(self.tree, ['TEST1', 'TEST2'])
+        finally:
+            RULES.pop('TEST1', None)
+            RULES.pop('TEST2', None)
+        # both rules run on a record before the loop moves to the next one
+        self.assertEqual(visits[:4], [('a', '@I1@'), ('b', '@I1@'), ('a', '@I2@'), ('b', '@I2@')])
+
+    def test_unknown_story_and_scope(self):
+        with self.assertRaises(KeyError):
+            run_rules(self.tree, ['US99'])
+        with self.assertRaises(ValueError):
+            rule('US99', 'household')
+
+
+class TestParallelRules(unittest.TestCase):
+
+    def test_same_errors_in_same_order_as_serial(self):
+        individuals, families = load_gedcom('My-Family.ged')
+        tree = Tree(individuals, families, today=date(2020, 1, 1).toordinal())
+        serial = run_rules(tree)
+        self.assertTrue(serial)
+        self.assertEqual(run_rules_parallel(tree, workers=2, shard_size=3, min_families=0), serial)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_vectorized_matches_serial(self):
+        tree = Tree(*load_gedcom('My-Family.ged'), today=date(2020, 1, 1).toordinal())
+        self.assertEqual(run_rules_parallel(tree, workers=2, shard_size=3, min_families=0, vectorized=True), run_rules(tree))
+
+    def test_small_trees_run_serially(self):
+        tree = Tree(*load_gedcom('My-Family.ged'), today=date(2020, 1, 1).toordinal())
+        with mock.patch('gedcom_rules.ProcessPoolExecutor') as pool:
+            self.assertEqual(run_rules_parallel(tree, workers=2), run_rules(tree))
+        pool.assert_not_called()
+
+
+class TestProjection(unittest.TestCase):
+
+    def test_only_requested_fields_are_parsed(self):
+        individuals, families = load_gedcom(GEDCOM_LINES, fields=rule_fields(['US03']))
+        tom = individuals['@I1@']
+        self.assertEqual((tom.birth_date, tom.death_date), ('1 JAN 1950', '1 JAN 1940'))
+        self.assertEqual((tom.name, tom.sex), ('', None))
+        self.assertEqual((families['@F1@'].husband, families['@F1@'].married), (None, None))
+        with self.assertRaises(ValueError):
+            load_gedcom(GEDCOM_LINES, fields=['relationships'])
+
+    def test_every_story_finds_the_same_errors(self):
+        today = date(2020, 1, 1).toordinal()
+        full = Tree(*load_gedcom('My-Family.ged', today), today)
+        for story in RULES:
+            projected = Tree(*load_gedcom('My-Family.ged', today, rule_fields([story])), today)
+            self.assertEqual(run_rules(projected, [story]), run_rules(full, [story]), story)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import itertools
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from datetime import date
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from gedcom_parser import load_gedcom
+from gedcom_rules import RULES, Tree, run_rules
+from gedcom_service import MAX_VALIDATIONS, RequestHandler, Snapshot, ValidationService, make_server
+from m2b3_gedcom_code import living_married_rows, living_singles_over_30_rows
+
+AS_OF = date(2023, 12, 1).toordinal()
+
+
+class TestValidationService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.service = ValidationService('My-Family.ged', AS_OF)
+        cls.tree = Tree(*load_gedcom('My-Family.ged', AS_OF), AS_OF)
+
+    def get(self, path, query=None):
+        status, endpoint, payload = self.service.handle('GET', path, query or {})
+        return status, payload
+
+    def test_validate_chosen_stories(self):
+        status, payload = self.get('/validate', {'stories': ['US01,US07']})
+        self.assertEqual(status, 200)
+        expected = run_rules(self.tree, ['US01', 'US07'])
+        self.assertEqual([(error['story'], error['message']) for error in payload['errors']], expected)
+        self.assertEqual(sum(payload['counts'].values()), len(expected))
+
+    def test_validate_all_stories(self):
+        status, payload = self.get('/validate')
+        self.assertEqual(len(payload['errors']), len(run_rules(self.tree)))
+
+    def test_repeated_and_reordered_stories(self):
+        status, payload = self.get('/validate', {'stories': ['US07,US01,US07', 'US01']})
+        self.assertEqual(status, 200)
+        self.assertEqual(list(payload['counts']), ['US01', 'US07'])
+        expected = run_rules(self.tree, ['US01', 'US07'])
+        self.assertEqual([(error['story'], error['message']) for error in payload['errors']], expected)
+
+    def test_remembered_validations_are_bounded(self):
+        snapshot = Snapshot('My-Family.ged', AS_OF)
+        snapshot.validate(['US01', 'US07', 'US01'])
+        snapshot.validate(['US07', 'US01'])
+        self.assertEqual(list(snapshot.validations), [('US01', 'US07')])
+        for pair in itertools.islice(itertools.combinations(RULES, 2), MAX_VALIDATIONS + 5):
+            snapshot.validate(pair)
+        self.assertEqual(len(snapshot.validations), MAX_VALIDATIONS)
+
+    def test_unknown_story(self):
+        status, payload = self.get('/validate', {'stories': ['US99']})
+        self.assertEqual(status, 400)
+        self.assertIn('US99', payload['error'])
+
+    def test_point_lookups(self):
+        individual_id = next(iter(self.tree.individuals))
+        status, payload = self.get(f'/individuals/{individual_id}')
+        self.assertEqual((status, payload['name']), (200, self.tree.individuals[individual_id].name))
+        self.assertEqual(self.get(f'/individuals/{individual_id.strip("@")}')[1], payload)
+        family_id = next(iter(self.tree.families))
+        self.assertEqual(self.get(f'/families/{family_id}')[1]['husband'], self.tree.families[family_id].husband)
+        self.assertEqual(self.get('/individuals/@NOBODY@')[0], 404)
+
+    def test_views(self):
+        status, payload = self.get('/living-married')
+        rows = list(living_married_rows(self.tree.individuals, self.tree.families, self.tree.index))
+        self.assertEqual([list(row.values()) for row in payload['living_married']], [list(row) for row in rows])
+        status, payload = self.get('/singles-over-30')
+        rows = list(living_singles_over_30_rows(self.tree.individuals, self.tree.index))
+        self.assertEqual(len(payload['singles_over_30']), len(rows))
+        self.assertEqual(len(self.get('/individuals')[1]['individuals']), len(self.tree.individuals))
+
+    def test_unknown_endpoint(self):
+        self.assertEqual(self.get('/nowhere')[0], 404)
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = make_server(ValidationService('My-Family.ged', AS_OF), port=0)
+        quiet = mock.patch.object(RequestHandler, 'log_message')
+        quiet.start()
+        self.addCleanup(quiet.stop)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def fetch(self, path, method='GET'):
+        with urlopen(Request(self.url + path, method=method)) as response:
+            self.assertIsNotNone(response.headers['X-Elapsed-Ms'])
+            return json.load(response)
+
+    def test_concurrent_requests(self):
+        paths = ['/validate?stories=US01,US07', '/living-married', '/individuals', '/validate'] * 10
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(self.fetch, paths))
+        for path, result in zip(paths, results):
+            self.assertEqual(result, results[paths.index(path)])
+
+        stats = {entry['name']: entry for entry in self.fetch('/stats')['endpoints']}
+        self.assertEqual(stats['GET /validate']['calls'], 20)
+        self.assertGreater(stats['GET /individuals']['seconds'], 0)
+
+    def test_reload_and_errors(self):
+        self.assertEqual(self.fetch('/reload', 'POST')['file'], 'My-Family.ged')
+        with self.assertRaises(HTTPError) as raised:
+            self.fetch('/families/@NOPE@')
+        self.assertEqual(raised.exception.code, 404)
+        raised.exception.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import contextlib
+import io
+import subprocess
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import m2b3_gedcom_code
+from gedcom_columns import numpy
+from m2b3_gedcom_code import GedcomSession
+
+AS_OF = date(2023, 12, 1).toordinal()
+
+
+def run_session(path):
+    session = GedcomSession(AS_OF)
+    session.read(path)
+    session.validate()
+    output = io.StringIO()
+    session.print_report("text", output)
+    return output.getvalue()
+
+
+class TestGedcomSession(unittest.TestCase):
+
+    def test_import_does_not_parse(self):
+        self.assertIsNone(m2b3_gedcom_code.default_session.tree)
+
+    def test_sessions_do_not_share_state(self):
+        first = GedcomSession(AS_OF)
+        second = GedcomSession(AS_OF)
+        first.process_gedcom_line("0 @I1@ INDI")
+        first.process_gedcom_line("0 @I1@ INDI")
+        second.process_gedcom_line("0 @I1@ INDI")
+        self.assertEqual(first.error_messages, ["ERROR: INDIVIDUAL: US22: @I1@: Individual ID is not unique"])
+        self.assertEqual(second.error_messages, [])
+
+    def test_import_does_not_load_the_rules(self):
+        code = "import sys, m2b3_gedcom_code; print('gedcom_rules' in sys.modules, 'numpy' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.split(), ['False', 'False'])
+
+    def test_validating_twice_does_not_repeat_errors(self):
+        session = GedcomSession(AS_OF)
+        session.read("My-Family.ged")
+        first = list(session.validate())
+        self.assertIn("ERROR: INDIVIDUAL: US22: @I1@: Individual ID is not unique", first)
+        self.assertEqual(session.validate(), first)
+        self.assertEqual(len(session.error_messages), len(first))
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_vectorized_validation_matches(self):
+        session = GedcomSession(AS_OF)
+        session.read("My-Family.ged")
+        expected = list(session.validate())
+        self.assertEqual(session.validate(vectorized=True), expected)
+
+    def test_workers_cannot_be_timed(self):
+        with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()) as errors:
+            m2b3_gedcom_code.main(["My-Family.ged", "--workers", "2", "--stats", "stats.json"])
+        self.assertIn("--stats", errors.getvalue())
+
+    def test_threaded_sessions_match_serial_runs(self):
+        paths = ["My-Family.ged", "Test_file.ged"] * 4
+        serial = [run_session(path) for path in paths]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            self.assertEqual(list(pool.map(run_session, paths)), serial)
+        self.assertIn("US17: @I5@ is married to their male ancestor, @I10@", serial[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from gedcom_parser import load_gedcom
+from gedcom_rules import Tree, run_rules
+from gedcom_stats import RunStats, stage
+
+
+class TestRunStats(unittest.TestCase):
+
+    def setUp(self):
+        individuals, families = load_gedcom('My-Family.ged')
+        self.tree = Tree(individuals, families, date(2023, 12, 1).toordinal())
+
+    def test_rule_counts(self):
+        stats = RunStats()
+        errors = run_rules(self.tree, ['US03', 'US08', 'US23'], stats=stats)
+        self.assertEqual(errors, run_rules(self.tree, ['US03', 'US08', 'US23']))
+
+        rules = {name: entry.as_dict() for name, entry in stats.rules.items()}
+        self.assertEqual(list(rules), ['US03 individual', 'US08 family', 'US23 global'])
+        self.assertEqual(rules['US03 individual']['calls'], len(self.tree.individuals))
+        self.assertEqual(rules['US08 family']['records'], len(self.tree.families))
+        self.assertEqual(rules['US23 global']['records'], len(self.tree.individuals) + len(self.tree.families))
+        for story in ['US03', 'US08', 'US23']:
+            self.assertEqual(sum(entry['errors'] for name, entry in rules.items() if name.startswith(story)),
+                             sum(1 for found, message in errors if found == story))
+
+    def test_stages_record_time_and_memory(self):
+        stats = RunStats(memory=True)
+        with stats.stage('build', records=3) as entry:
+            data = [str(number) for number in range(10000)]
+            entry.errors += 1
+        self.assertEqual(len(data), 10000)
+        build = stats.stages['build']
+        self.assertEqual((build.calls, build.records, build.errors), (1, 3, 1))
+        self.assertGreater(build.seconds, 0)
+        self.assertGreater(build.peak_bytes, 100000)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stats.json')
+            stats.write_json(path)
+            with open(path) as written:
+                self.assertEqual(json.load(written)['stages'][0]['name'], 'build')
+
+    def test_stage_without_stats(self):
+        with stage(None, 'parse', 5) as entry:
+            entry.records += 1
+        self.assertEqual(entry.records, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
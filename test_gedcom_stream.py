@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+from collections import Counter
+from datetime import date
+from gedcom_parser import load_gedcom
+from gedcom_reader import BOM
+from gedcom_rules import Tree, run_rules
+from gedcom_stream import stream_errors, upload_handler
+from gedcom_synth import INJECTIONS, gedcom_lines, generate_tree
+
+AS_OF = date(2023, 12, 1).toordinal()
+
+
+async def chunks(data, size, sent=None):
+    for start in range(0, len(data), size):
+        if sent is not None:
+            sent.append(start + size)
+        yield data[start:start + size]
+
+
+class TestStreamErrors(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.lines = list(gedcom_lines(*generate_tree(300, seed=2, violations=dict.fromkeys(INJECTIONS, 1))))
+
+    async def collect(self, data, size=4096, stories=None, sent=None):
+        return [error async for error in stream_errors(chunks(data, size, sent), stories, AS_OF)]
+
+    def batch_errors(self, lines, stories=None):
+        return Counter(run_rules(Tree(*load_gedcom(lines, AS_OF), AS_OF), stories))
+
+    async def test_same_errors_as_a_batch_run(self):
+        with open('My-Family.ged', 'rb') as gedcom:
+            data = gedcom.read()
+        errors = await self.collect(BOM + data, size=7)
+        self.assertEqual(errors.count(('US22', "ERROR: INDIVIDUAL: US22: @I1@: Individual ID is not unique")), 1)
+        expected = Counter(run_rules(Tree(*load_gedcom('My-Family.ged', AS_OF), AS_OF)))
+        self.assertEqual(Counter(error for error in errors if error[0] != 'US22'), expected)
+
+    async def test_families_sent_before_their_members(self):
+        families = [number for number, line in enumerate(self.lines) if line.endswith(' FAM')]
+        records_end = self.lines.index("0 TRLR")
+        reordered = self.lines[:1] + self.lines[families[0]:records_end] + self.lines[1:families[0]] + ["0 TRLR"]
+        errors = await self.collect("\n".join(reordered).encode())
+        self.assertEqual(Counter(errors), self.batch_errors(self.lines))
+
+    async def test_first_error_before_the_upload_ends(self):
+        data = "\n".join(self.lines).encode()
+        sent = []
+        async for story, message in stream_errors(chunks(data, 256, sent), None, AS_OF):
+            break
+        self.assertLess(sent[-1], len(data) // 2)
+
+    async def test_chosen_stories(self):
+        errors = await self.collect("\n".join(self.lines).encode(), stories=['US01', 'US07'])
+        self.assertTrue(errors)
+        self.assertEqual(Counter(errors), self.batch_errors(self.lines, ['US01', 'US07']))
+
+    async def test_socket_upload_ends_at_the_trailer(self):
+        server = await asyncio.start_server(upload_handler(['US03'], AS_OF), '127.0.0.1', 0)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        # the connection stays open for writing; TRLR marks the end of the upload
+        writer.write(("\n".join(self.lines) + "\n").encode())
+        answer = await asyncio.wait_for(reader.read(), 10)
+        writer.close()
+        await writer.wait_closed()
+        expected = [message for story, message in run_rules(Tree(*load_gedcom(self.lines, AS_OF), AS_OF), ['US03'])]
+        self.assertTrue(expected)
+        self.assertEqual(answer.decode().splitlines(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import tempfile
+import unittest
+from datetime import date
+from gedcom_bench import benchmark_size
+from gedcom_parser import load_gedcom
+from gedcom_rules import RULES, Tree, run_rules
+from gedcom_synth import INJECTIONS, generate_tree, gedcom_lines
+
+AS_OF = date(2023, 12, 1).toordinal()
+
+
+def validate(individuals, families):
+    parsed_individuals, parsed_families = load_gedcom(list(gedcom_lines(individuals, families)), AS_OF)
+    return run_rules(Tree(parsed_individuals, parsed_families, AS_OF))
+
+
+class TestSyntheticTrees(unittest.TestCase):
+
+    def test_same_seed_same_file(self):
+        first = list(gedcom_lines(*generate_tree(500, seed=7)))
+        self.assertEqual(first, list(gedcom_lines(*generate_tree(500, seed=7))))
+        self.assertNotEqual(first, list(gedcom_lines(*generate_tree(500, seed=8))))
+
+    def test_tree_shape(self):
+        individuals, families = generate_tree(2000, seed=1, generations=4, remarriage_rate=0.3)
+        self.assertEqual(len(individuals), 2000)
+        self.assertTrue(any(family.divorced for family in families.values()))
+        parsed, parsed_families = load_gedcom(list(gedcom_lines(individuals, families)), AS_OF)
+        self.assertEqual(len(parsed), 2000)
+        self.assertEqual(len(parsed_families), len(families))
+
+    def test_clean_tree_has_no_errors(self):
+        self.assertEqual(validate(*generate_tree(3000, seed=2, missing_date_rate=0.1)), [])
+
+    def test_injected_violations_are_found(self):
+        errors = validate(*generate_tree(3000, seed=2, violations=dict.fromkeys(INJECTIONS, 1)))
+        self.assertEqual({story for story, message in errors}, set(INJECTIONS))
+
+    def test_unknown_story(self):
+        with self.assertRaises(KeyError):
+            generate_tree(10, violations={'US99': 1})
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_every_stage_is_timed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            stages = benchmark_size(300, directory, memory=True)
+        names = [stage['stage'] for stage in stages]
+        self.assertEqual(names[:3], ['generate', 'parse', 'indexes'])
+        self.assertEqual(names[3:-2], [f'rule {story}' for story in RULES])
+        self.assertEqual(names[-2:], ['all rules', 'report'])
+        self.assertTrue(all(stage['peak_bytes'] > 0 for stage in stages))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+from gedcom_watch import file_state, settled_changes
+
+
+class TestSettledChanges(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.ged')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def write(self, text):
+        with open(self.path, 'w') as gedcomfile:
+            gedcomfile.write(text)
+
+    def test_changes_are_reported_once_settled(self):
+        # each sleep runs the next scripted edit, standing in for time passing
+        edits = iter([
+            None,
+            # a save in progress that goes on while the watcher checks it
+            lambda: self.write('0 HEAD\n0 @I1@'),
+            lambda: self.write('0 HEAD\n0 @I1@ INDI\n'),
+            None,
+        ])
+
+        def sleep(interval):
+            edit = next(edits, None)
+            if edit:
+                edit()
+
+        self.write('0 HEAD\n')
+        changes = settled_changes(self.path, 0.5, sleep)
+        self.assertEqual(next(changes), file_state(self.path))
+        self.assertEqual(next(changes)[2], len('0 HEAD\n0 @I1@ INDI\n'))
+
+    def test_missing_file(self):
+        self.assertIsNone(file_state(self.path + '.missing'))
+
+
+if __name__ == '__main__':
+    unittest.main()